@@ -0,0 +1,251 @@
+"""
+Offscreen animations for Auraeon Crystal Lattice Simulator.
+
+render_animation() draws a scripted path of frames with plot_3d_lattice
+on the Agg backend, without a window, and saves them as a PNG sequence
+or a GIF. A frame is a crystal (CrystalParams) plus a camera angle, so
+orbit_path() turns the camera around one crystal and parameter_path()
+steps a parameter such as the lattice constant.
+
+Every distinct crystal of the path is built once, in this process, and
+its positions, colors, sizes and bonds are put in shared memory. Frames
+render in worker processes, each taking a run of consecutive frames: a
+worker plots a crystal once and then only moves the camera for every
+frame that shows the same crystal, so a long orbit costs one plot plus
+one rasterization per frame.
+"""
+
+import dataclasses
+import os
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+
+import numpy as np
+
+from crystal import CrystalParams, build_crystal, crystal_dim
+from sharing import attach_array, release, share_array
+
+# matplotlib's default 3D camera
+DEFAULT_ELEVATION = 30.0
+DEFAULT_AZIMUTH = -60.0
+
+
+@dataclass
+class AnimationFrame:
+    """One frame: the crystal to show, the camera angles (degrees) and an optional caption."""
+    params: CrystalParams
+    elevation: float = DEFAULT_ELEVATION
+    azimuth: float = DEFAULT_AZIMUTH
+    label: str = ""
+
+
+def orbit_path(params, frames=36, elevation=DEFAULT_ELEVATION, azimuth=DEFAULT_AZIMUTH, turns=1.0):
+    """frames camera positions turning turns times around the crystal at a fixed elevation."""
+    angles = azimuth + 360.0 * turns * np.arange(frames) / frames
+    return [AnimationFrame(params, elevation, float(angle)) for angle in angles]
+
+
+def parameter_path(params, field, values, elevation=DEFAULT_ELEVATION, azimuth=DEFAULT_AZIMUTH):
+    """One frame per value of CrystalParams field, captioned with the value, from a fixed camera."""
+    if field not in {f.name for f in dataclasses.fields(CrystalParams)}:
+        raise ValueError(f"Unknown parameter: {field}")
+    return [
+        AnimationFrame(dataclasses.replace(params, **{field: value}), elevation, azimuth, f"{field} = {value}")
+        for value in values
+    ]
+
+
+def _scene_arrays(crystal):
+    """(coords, colors, sizes, bonds) as plot_3d_lattice takes them; coords are always (N, 3)."""
+    coords = np.zeros((crystal.num_atoms, 3))
+    coords[:, :crystal.dim] = crystal.atom_positions()
+    species = crystal.atom_species()
+    table = crystal.element_table()
+    bonds = crystal.bonds if crystal.bonds is not None else np.empty((0, 2), dtype=np.int64)
+    return coords, table.colors[species], table.radii[species] * 80, bonds
+
+
+def _share_scenes(frames):
+    """
+    Builds every distinct crystal of frames once into shared memory.
+    Returns (blocks, scenes, scene_of_frame, limits): scenes holds the
+    array descriptors and title of each crystal, and limits the bounds
+    of all of them, so the camera frames every crystal the same way.
+    """
+    keys, scene_of_frame = {}, []
+    for frame in frames:
+        scene_of_frame.append(keys.setdefault(dataclasses.astuple(frame.params), len(keys)))
+    params_of_scene = {}
+    for frame, scene in zip(frames, scene_of_frame):
+        params_of_scene.setdefault(scene, frame.params)
+
+    blocks, scenes = [], []
+    low, high = np.full(3, np.inf), np.full(3, -np.inf)
+    try:
+        for scene in range(len(keys)):
+            params = params_of_scene[scene]
+            arrays = _scene_arrays(build_crystal(params))
+            if len(arrays[0]):
+                low = np.minimum(low, arrays[0].min(axis=0))
+                high = np.maximum(high, arrays[0].max(axis=0))
+            descriptors = []
+            for array in arrays:
+                block, descriptor = share_array(array)
+                blocks.append(block)
+                descriptors.append(descriptor)
+            scenes.append({
+                "arrays": tuple(descriptors),
+                "title": f"{params.lattice_type.upper()} Lattice",
+                "cell": (params.a, params.b, params.c),
+                "dim": crystal_dim(params),
+            })
+    except BaseException:
+        release(blocks)
+        raise
+    if not np.all(np.isfinite(low)):
+        low, high = np.zeros(3), np.ones(3)
+    pad = 0.05 * max(float((high - low).max()), 1.0)
+    return blocks, scenes, scene_of_frame, np.column_stack((low - pad, high + pad))
+
+
+# Per-process state of render workers, set once by _init_worker
+_WORKER = {}
+
+
+def _init_worker(scenes, limits, figsize, dpi):
+    """Opens an offscreen figure for this worker."""
+    import matplotlib
+    matplotlib.use("Agg")  # must come before pyplot is imported
+    import matplotlib.pyplot as plt
+
+    fig = plt.figure(figsize=figsize, dpi=dpi)
+    _WORKER.update(scenes=scenes, limits=limits, fig=fig, ax=fig.add_subplot(projection="3d"), shown=None)
+
+
+def _show_scene(index):
+    """Plots scene index on the worker's axes, unless it is already there."""
+    from visualization import plot_3d_lattice
+
+    if _WORKER["shown"] == index:
+        return
+    scene = _WORKER["scenes"][index]
+    arrays = []
+    for descriptor in scene["arrays"]:
+        # Copied out, since the artists keep references to the arrays they are given
+        block, array = attach_array(descriptor)
+        arrays.append(np.array(array))
+        del array
+        block.close()
+    coords, colors, sizes, bonds = arrays
+    ax = _WORKER["ax"]
+    plot_3d_lattice(
+        ax, coords[:, 0], coords[:, 1], coords[:, 2], *scene["cell"], title=scene["title"],
+        colors=colors, marker_sizes=sizes, elements=None, element_colors=None, bonds=bonds,
+    )
+    (x0, x1), (y0, y1), (z0, z1) = _WORKER["limits"]
+    ax.set_xlim(x0, x1)
+    ax.set_ylim(y0, y1)
+    ax.set_zlim(z0, z1)
+    _WORKER["shown"] = index
+
+
+def _render_run(run):
+    """Renders a run of (frame index, scene index, elevation, azimuth, label, path). Returns the frame indices."""
+    ax = _WORKER["ax"]
+    done = []
+    for index, scene, elevation, azimuth, label, path in run:
+        _show_scene(scene)
+        ax.view_init(elev=elevation, azim=azimuth)
+        title = _WORKER["scenes"][scene]["title"]
+        ax.set_title(f"{title}\n{label}" if label else title)
+        _WORKER["fig"].savefig(path)
+        done.append(index)
+    return done
+
+
+def _runs(jobs, workers):
+    """Splits jobs into runs of consecutive frames of one scene, about len(jobs) / (4 * workers) long."""
+    length = max(1, -(-len(jobs) // (4 * max(workers, 1))))
+    runs = []
+    for job in jobs:
+        if runs and runs[-1][-1][1] == job[1] and len(runs[-1]) < length:
+            runs[-1].append(job)
+        else:
+            runs.append([job])
+    return runs
+
+
+def render_animation(frames, output, workers=None, figsize=(8, 6), dpi=100, fps=12, callback=None):
+    """
+    Renders frames (see orbit_path, parameter_path) to output and returns
+    the paths written.
+
+    output ending in .gif is assembled into one GIF at fps frames per
+    second; any other output is a directory that receives a PNG sequence
+    (frame_00000.png, ...). workers defaults to every core; 0 or 1 renders
+    in this process, switching pyplot to the Agg backend. callback(done,
+    total) follows every finished run.
+    """
+    if not frames:
+        raise ValueError("No frames to render")
+    for frame in frames:
+        if crystal_dim(frame.params) != 3:
+            raise ValueError("Animations need a 3D lattice type")
+    gif = os.path.splitext(output)[1].lower() == ".gif"
+    directory = tempfile.mkdtemp(prefix="auraeon-frames-") if gif else output
+    os.makedirs(directory, exist_ok=True)
+    paths = [os.path.join(directory, f"frame_{index:05d}.png") for index in range(len(frames))]
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+    blocks, scenes, scene_of_frame, limits = _share_scenes(frames)
+    try:
+        jobs = [
+            (index, scene_of_frame[index], frame.elevation, frame.azimuth, frame.label, paths[index])
+            for index, frame in enumerate(frames)
+        ]
+        runs = _runs(jobs, workers)
+        finished = 0
+        if workers <= 1 or len(runs) <= 1:
+            _init_worker(scenes, limits, figsize, dpi)
+            try:
+                for run in runs:
+                    finished += len(_render_run(run))
+                    if callback is not None:
+                        callback(finished, len(frames))
+            finally:
+                import matplotlib.pyplot as plt
+                plt.close(_WORKER.pop("fig"))
+                _WORKER.clear()
+        else:
+            initargs = (scenes, limits, figsize, dpi)
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=initargs) as pool:
+                for future in as_completed([pool.submit(_render_run, run) for run in runs]):
+                    finished += len(future.result())
+                    if callback is not None:
+                        callback(finished, len(frames))
+    finally:
+        release(blocks)
+
+    if not gif:
+        return paths
+    try:
+        save_gif(paths, output, fps)
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+    return [output]
+
+
+def save_gif(paths, output, fps=12, loop=0):
+    """Assembles PNG frames into a GIF (loop=0 repeats forever)."""
+    from PIL import Image  # installed with matplotlib
+
+    images = [Image.open(path) for path in paths]
+    try:
+        frames = [image.convert("P", palette=Image.Palette.ADAPTIVE) for image in images]
+        frames[0].save(output, save_all=True, append_images=frames[1:], duration=int(round(1000 / fps)), loop=loop)
+    finally:
+        for image in images:
+            image.close()
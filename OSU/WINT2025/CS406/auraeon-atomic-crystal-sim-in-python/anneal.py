@@ -0,0 +1,225 @@
+"""
+Monte Carlo dopant annealing for Auraeon Crystal Lattice Simulator.
+
+DopantAnnealer rearranges dopants over the lattice sites by swapping the
+species of a host atom and a dopant atom, accepted under the Metropolis
+criterion while the temperature follows a cooling schedule. Atoms do not
+move, so the neighbor shells and pair distances are found once. For every
+atom the annealer keeps its field: the pair energy it would have with its
+neighbors as each species. A swap's energy change is then a few lookups
+into the two atoms' fields, and an accepted swap only updates the fields
+of their neighbors, so the cost of a trial does not depend on the size of
+the crystal.
+
+Trials run in batches whose neighbor shells do not touch one another's
+swapped atoms, so a whole batch is evaluated and accepted with array
+operations and gives the same result as trying its swaps one by one.
+"""
+
+import numpy as np
+
+from crystal import supercell_matrix
+from md import BOLTZMANN
+from neighbors import VerletList
+from potentials import PairPotential
+
+# A batch holds about this fraction of (crystal size / neighbor shell size) swaps,
+# which keeps most of its swaps clear of each other
+BATCH_FILL = 0.125
+
+
+def temperature_schedule(start, stop, stages, kind="geometric"):
+    """stages temperatures (K) from start down to stop, evenly ("linear") or by a constant ratio ("geometric")."""
+    if kind == "linear":
+        return np.linspace(start, stop, stages)
+    if kind == "geometric":
+        if start <= 0 or stop <= 0:
+            raise ValueError("A geometric schedule needs positive temperatures")
+        return np.geomspace(start, stop, stages)
+    raise ValueError(f"Unknown schedule: {kind} (expected linear or geometric)")
+
+
+class DopantAnnealer:
+    """Metropolis swaps of host and dopant species on a crystal's fixed atom positions."""
+
+    def __init__(self, crystal, potential="lj", host=None, dopant=None, cutoff=None, periodic=None, seed=None):
+        """
+        host and dopant are element symbols (element 1 and element 2 by
+        default); only their atoms trade species. potential is "lj",
+        "morse" or a PairPotential over crystal.symbols. periodic defaults
+        to crystal.params.periodic.
+        """
+        params = crystal.params
+        host = params.element_1 if host is None else host
+        dopant = params.element_2 if dopant is None else dopant
+        for symbol in (host, dopant):
+            if symbol not in crystal.symbols:
+                raise ValueError(f"{symbol} is not in the crystal ({', '.join(crystal.symbols)})")
+        if host == dopant:
+            raise ValueError("Host and dopant must be different elements")
+        if periodic is None:
+            periodic = params.periodic
+        if not isinstance(potential, PairPotential):
+            potential = PairPotential(crystal.symbols, potential, cutoff)
+
+        self.crystal = crystal
+        self.potential = potential
+        self.rng = np.random.default_rng(seed)
+        self.species = crystal.atom_species().astype(np.intp)
+        self.codes = (crystal.symbols.index(host), crystal.symbols.index(dopant))
+        num_atoms = len(self.species)
+        num_species = len(crystal.symbols)
+
+        # Neighbor shells as a CSR table: neighbors of atom a are neighbor[start[a]:start[a + 1]]
+        neighbors = VerletList(potential.cutoff, 0.0, supercell_matrix(params),
+                               (True, True, crystal.dim == 3) if periodic else None)
+        coords = np.asarray(crystal.atom_positions(), dtype=float)
+        neighbors.build(coords)
+        diff = neighbors.vectors(coords)
+        distance = np.sqrt(np.einsum("ij,ij->i", diff, diff))
+        rows = np.concatenate((neighbors.i, neighbors.j)).astype(np.intp)
+        order = np.argsort(rows, kind="stable")
+        self.neighbor = np.concatenate((neighbors.j, neighbors.i)).astype(np.intp)[order]
+        self.distance = np.concatenate((distance, distance))[order]
+        self.start = np.concatenate(([0], np.cumsum(np.bincount(rows, minlength=num_atoms))))
+
+        # field[a, s]: pair energy of atom a with its neighbors if a were species s
+        self.field = np.zeros((num_atoms, num_species))
+        rows = rows[order]
+        for s in range(num_species):
+            energy, _ = potential.pair_terms(self.distance, np.full(len(rows), s), self.species[self.neighbor])
+            self.field[:, s] = np.bincount(rows, weights=energy, minlength=num_atoms)
+        self.energy = 0.5 * float(self.field[np.arange(num_atoms), self.species].sum())
+
+        # Current atoms of each of the two species, and every atom's slot in its list
+        self.members = [np.flatnonzero(self.species == code) for code in self.codes]
+        self.slot = np.zeros(num_atoms, dtype=np.intp)
+        for members in self.members:
+            self.slot[members] = np.arange(len(members))
+        mean_shell = max(len(self.neighbor) / max(num_atoms, 1), 1.0)
+        self.batch_size = max(1, int(BATCH_FILL * num_atoms / (2 * mean_shell + 2)))
+        self.tried = 0
+        self.accepted = 0
+
+    def _shells(self, centers):
+        """(swap, neighbor, distance) for every neighbor of every center; swap indexes centers."""
+        counts = self.start[centers + 1] - self.start[centers]
+        swap = np.repeat(np.arange(len(centers)), counts)
+        first = np.repeat(self.start[centers], counts)
+        entry = first + np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        return swap, self.neighbor[entry], self.distance[entry]
+
+    def _independent(self, a, b):
+        """
+        Mask of the swaps (a[m], b[m]) to try. A swap is dropped when an
+        earlier swap of the batch changes an atom its energy change depends
+        on, or changes an atom that an earlier swap depends on.
+        """
+        num_swaps = len(a)
+        centers = np.concatenate((a, b))
+        swap, atoms, _ = self._shells(centers)
+        swap %= num_swaps
+        region_swap = np.concatenate((swap, np.arange(num_swaps), np.arange(num_swaps)))
+        region_atom = np.concatenate((atoms, a, b))
+
+        # Earliest swap that changes each atom, and earliest swap whose region holds it
+        changed_by = np.full(len(self.species), num_swaps)
+        np.minimum.at(changed_by, centers, np.concatenate((np.arange(num_swaps),) * 2))
+        seen_by = np.full(len(self.species), num_swaps)
+        np.minimum.at(seen_by, region_atom, region_swap)
+
+        clash = changed_by[region_atom] < region_swap
+        keep = np.bincount(region_swap[clash], minlength=num_swaps) == 0
+        keep &= (seen_by[a] >= np.arange(num_swaps)) & (seen_by[b] >= np.arange(num_swaps))
+        return keep
+
+    def _pair_change(self, distance, species_k, old, new):
+        """Change of the pair energies of neighbors k (species species_k) when their partner goes from old to new."""
+        before, _ = self.potential.pair_terms(distance, old, species_k)
+        after, _ = self.potential.pair_terms(distance, new, species_k)
+        return after - before
+
+    def trial_batch(self, temperature):
+        """Tries one batch of swaps at temperature (K). Returns (tried, accepted)."""
+        hosts, dopants = self.members
+        if not len(hosts) or not len(dopants):
+            return 0, 0
+        a = hosts[self.rng.integers(len(hosts), size=self.batch_size)]
+        b = dopants[self.rng.integers(len(dopants), size=self.batch_size)]
+        keep = self._independent(a, b)
+        a, b = a[keep], b[keep]
+        species_a, species_b = self.species[a], self.species[b]
+
+        # Energy change from the two fields; the a-b pair itself is unchanged by the swap
+        delta = (self.field[a, species_b] - self.field[a, species_a]
+                 + self.field[b, species_a] - self.field[b, species_b])
+        swap, neighbor, distance = self._shells(a)
+        bonded = neighbor == b[swap]
+        if bonded.any():
+            m = swap[bonded]
+            r = distance[bonded]
+            same_a, _ = self.potential.pair_terms(r, species_a[m], species_a[m])
+            same_b, _ = self.potential.pair_terms(r, species_b[m], species_b[m])
+            mixed, _ = self.potential.pair_terms(r, species_a[m], species_b[m])
+            delta[m] -= same_a + same_b - 2.0 * mixed
+
+        if temperature > 0:
+            accept = (delta <= 0) | (self.rng.random(len(delta)) < np.exp(-delta / (BOLTZMANN * temperature)))
+        else:
+            accept = delta <= 0
+        a, b, delta = a[accept], b[accept], delta[accept]
+        if len(a):
+            self._apply(a, b)
+            self.energy += float(delta.sum())
+        tried = int(keep.sum())
+        self.tried += tried
+        self.accepted += len(a)
+        return tried, len(a)
+
+    def _apply(self, a, b):
+        """Swaps the species of atoms a[m] and b[m] and updates their neighbors' fields."""
+        species_a, species_b = self.species[a], self.species[b]
+        centers = np.concatenate((a, b))
+        old = np.concatenate((species_a, species_b))
+        new = np.concatenate((species_b, species_a))
+        swap, neighbor, distance = self._shells(centers)
+        for s in range(self.field.shape[1]):
+            change = self._pair_change(distance, np.full(len(swap), s), old[swap], new[swap])
+            np.add.at(self.field[:, s], neighbor, change)
+        self.species[a], self.species[b] = species_b, species_a
+
+        hosts, dopants = self.members
+        slot_a, slot_b = self.slot[a], self.slot[b]
+        hosts[slot_a], dopants[slot_b] = b, a
+        self.slot[a], self.slot[b] = slot_b, slot_a
+
+    def run(self, trials, temperature):
+        """Tries about trials swaps at one temperature. Returns (tried, accepted)."""
+        tried = accepted = 0
+        while tried < trials:
+            batch_tried, batch_accepted = self.trial_batch(temperature)
+            if not batch_tried:
+                break
+            tried += batch_tried
+            accepted += batch_accepted
+        return tried, accepted
+
+    def anneal(self, start, stop, trials, stages=20, schedule="geometric", callback=None):
+        """
+        Cools from start to stop K over stages temperatures, spreading about
+        trials swaps evenly over them. callback(temperature, tried, accepted,
+        energy) is called after each stage. Returns the stages as a list of
+        such tuples; the crystal's species are updated at the end.
+        """
+        history = []
+        for temperature in temperature_schedule(start, stop, stages, schedule):
+            tried, accepted = self.run(trials / stages, temperature)
+            history.append((float(temperature), tried, accepted, self.energy))
+            if callback is not None:
+                callback(*history[-1])
+        self.store()
+        return history
+
+    def store(self):
+        """Writes the current species back into the crystal."""
+        self.crystal.species[self.crystal.atom_indices()] = self.species
@@ -0,0 +1,265 @@
+"""
+Benchmarks for Auraeon Crystal Lattice Simulator.
+
+Times every stage of building and drawing a crystal at sizes from 10^2 to
+10^6 atoms: each lattice generator, rotation, the vacancy/doping pass,
+the bond search, a full build_crystal, and plot_3d_lattice rendered on
+the headless Agg backend. Every stage is timed (best of repeat runs) and
+then run once more under tracemalloc for its peak memory. Results are
+written as JSON; given a baseline file from an earlier run, stages that
+got slower or use more memory than the tolerance allows are flagged as
+regressions and the exit status is 1.
+
+    python benchmark.py -o baseline.json
+    python benchmark.py --baseline baseline.json --tolerance 0.25
+"""
+
+import argparse
+import dataclasses
+import json
+import platform
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from crystal import Crystal, CrystalParams, build_crystal, crystal_dim, rotation_matrix, site_symbols
+from defects import apply_defects
+from lattice import LATTICE_DEFS, generate_lattice
+from neighbors import find_bonds
+
+DEFAULT_SIZES = (10**2, 10**3, 10**4, 10**5, 10**6)
+STAGES = ("generate", "rotate", "defects", "bonds", "build", "render")
+# Rendering goes through Matplotlib's 3D toolkit and is skipped above this many atoms by default
+RENDER_MAX_ATOMS = 10**5
+# Changes smaller than these are timer or allocator noise, never regressions
+MIN_SECONDS = 1e-3
+MIN_BYTES = 1 << 20
+
+# Iron BCC: the bond threshold sits between the first (2.49) and second (2.87) neighbor shells
+BENCH_PARAMS = CrystalParams(
+    lattice_type="3d_bcc", a=2.87, b=2.87, c=2.87, element_1="Fe", element_2="C",
+    vacancy_percent=10.0, doping_percent=10.0, bond_threshold=2.6, seed=0, rotation=(15.0, 30.0, 45.0),
+)
+
+
+def cells_for(lattice_type, atoms):
+    """(nx, ny, nz) of a roughly cubic supercell with about atoms sites."""
+    definition = LATTICE_DEFS[lattice_type]
+    cells = max(atoms / len(definition["basis"]), 1)
+    n = max(int(round(cells ** (1 / definition["dim"]))), 1)
+    return n, n, (n if definition["dim"] == 3 else 1)
+
+
+def sized_params(atoms, base=BENCH_PARAMS):
+    """base resized to about atoms sites."""
+    nx, ny, nz = cells_for(base.lattice_type, atoms)
+    return dataclasses.replace(base, nx=nx, ny=ny, nz=nz)
+
+
+def measure(function, repeat=3, memory=True):
+    """
+    Runs function() repeat times and returns (best seconds, peak bytes,
+    last result). The peak comes from one extra run under tracemalloc, so
+    its overhead never shows in the time.
+    """
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        best = min(best, time.perf_counter() - start)
+    peak = None
+    if memory:
+        tracemalloc.start()
+        try:
+            function()
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    return best, peak, result
+
+
+# ==================== STAGES ====================
+# Each stage function takes the target size and returns a list of
+# (label, atoms, function) cases to measure.
+def _generate_cases(size):
+    cases = []
+    for lattice_type in LATTICE_DEFS:
+        nx, ny, nz = cells_for(lattice_type, size)
+        atoms = nx * ny * nz * len(LATTICE_DEFS[lattice_type]["basis"])
+        cases.append((lattice_type, atoms, lambda t=lattice_type, n=(nx, ny, nz): generate_lattice(t, *n, 4.0, 4.0, 4.0)))
+    return cases
+
+
+def _rotate_cases(size):
+    params = sized_params(size)
+    positions, _ = generate_lattice(params.lattice_type, params.nx, params.ny, params.nz, params.a, params.b, params.c)
+    R = rotation_matrix(*params.rotation)
+    return [(params.lattice_type, len(positions), lambda: positions @ R.T)]
+
+
+def _defects_cases(size):
+    params = sized_params(size)
+    positions, sites = generate_lattice(params.lattice_type, params.nx, params.ny, params.nz, params.a, params.b, params.c)
+    symbols, slot_codes = site_symbols(params)
+    species = slot_codes[sites]
+
+    def run():
+        crystal = Crystal(params, crystal_dim(params), positions, species.copy(), symbols)
+        apply_defects(crystal, params)
+        return crystal
+    return [(params.lattice_type, len(positions), run)]
+
+
+def _bonds_cases(size):
+    params = sized_params(size)
+    positions, _ = generate_lattice(params.lattice_type, params.nx, params.ny, params.nz, params.a, params.b, params.c)
+    return [(params.lattice_type, len(positions), lambda: find_bonds(positions, params.bond_threshold))]
+
+
+def _build_cases(size):
+    params = sized_params(size)
+    crystal = build_crystal(params, use_cache=False)
+    return [(params.lattice_type, crystal.num_sites, lambda: build_crystal(params, use_cache=False))]
+
+
+def _render_cases(size):
+    import matplotlib
+    matplotlib.use("Agg")  # headless; must come before pyplot is imported
+    import matplotlib.pyplot as plt
+    from visualization import plot_3d_lattice
+
+    params = sized_params(size)
+    crystal = build_crystal(params)
+    coords = crystal.atom_positions()
+    colors = crystal.element_table().colors[crystal.atom_species()]
+    sizes = crystal.element_property("radius") * 80
+
+    def run():
+        fig, ax = plt.subplots(figsize=(8, 6), subplot_kw={"projection": "3d"})
+        try:
+            plot_3d_lattice(
+                ax, coords[:, 0], coords[:, 1], coords[:, 2], params.a, params.b, params.c,
+                colors=colors, marker_sizes=sizes, bonds=crystal.bonds,
+            )
+            fig.canvas.draw()
+        finally:
+            plt.close(fig)
+    return [(params.lattice_type, crystal.num_atoms, run)]
+
+
+STAGE_CASES = {
+    "generate": _generate_cases,
+    "rotate": _rotate_cases,
+    "defects": _defects_cases,
+    "bonds": _bonds_cases,
+    "build": _build_cases,
+    "render": _render_cases,
+}
+
+
+def run_benchmarks(sizes=DEFAULT_SIZES, stages=STAGES, repeat=3, memory=True, render_max=RENDER_MAX_ATOMS, callback=None):
+    """
+    Measures every stage at every size. Returns the JSON-ready report:
+    {"meta": {...}, "results": [{"stage", "case", "size", "atoms",
+    "seconds", "peak_bytes"}, ...]}. callback(record) follows every case.
+    """
+    results = []
+    for size in sizes:
+        for stage in stages:
+            if stage not in STAGE_CASES:
+                raise ValueError(f"Unknown stage: {stage} (expected one of {', '.join(STAGES)})")
+            if stage == "render" and render_max is not None and size > render_max:
+                continue
+            for case, atoms, function in STAGE_CASES[stage](size):
+                seconds, peak, _ = measure(function, repeat, memory)
+                record = {"stage": stage, "case": case, "size": int(size), "atoms": int(atoms),
+                          "seconds": seconds, "peak_bytes": peak}
+                results.append(record)
+                if callback is not None:
+                    callback(record)
+    meta = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "repeat": repeat,
+    }
+    return {"meta": meta, "results": results}
+
+
+def compare(report, baseline, tolerance=0.25):
+    """
+    Matches results to the baseline by (stage, case, size). Returns one
+    dict per match with the time and memory ratios (new / baseline) and a
+    regressed flag, set when either grew by more than tolerance (and by
+    more than MIN_SECONDS / MIN_BYTES).
+    """
+    previous = {(r["stage"], r["case"], r["size"]): r for r in baseline["results"]}
+    rows = []
+    for record in report["results"]:
+        old = previous.get((record["stage"], record["case"], record["size"]))
+        if old is None:
+            continue
+        time_ratio = record["seconds"] / old["seconds"] if old["seconds"] else float("inf")
+        slower = (time_ratio > 1 + tolerance and record["seconds"] - old["seconds"] > MIN_SECONDS)
+        memory_ratio = None
+        larger = False
+        if record["peak_bytes"] is not None and old.get("peak_bytes"):
+            memory_ratio = record["peak_bytes"] / old["peak_bytes"]
+            larger = memory_ratio > 1 + tolerance and record["peak_bytes"] - old["peak_bytes"] > MIN_BYTES
+        rows.append({
+            "stage": record["stage"], "case": record["case"], "size": record["size"],
+            "time_ratio": time_ratio, "memory_ratio": memory_ratio, "regressed": slower or larger,
+        })
+    return rows
+
+
+def _format_record(record):
+    peak = "-" if record["peak_bytes"] is None else f"{record['peak_bytes'] / 2**20:.1f} MiB"
+    return f"{record['stage']:<9} {record['case']:<14} {record['atoms']:>9} atoms  {record['seconds']:.4f} s  {peak}"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark lattice generation, defects, bonds and rendering.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES), help="target atom counts")
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=list(STAGES))
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per case (the best one counts)")
+    parser.add_argument("--no-memory", action="store_true", help="skip the tracemalloc peak memory runs")
+    parser.add_argument("--render-max", type=int, default=RENDER_MAX_ATOMS,
+                        help="largest size that is rendered (default: %(default)s)")
+    parser.add_argument("-o", "--output", help="JSON file for the results (default: print them)")
+    parser.add_argument("--baseline", help="JSON results of an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="allowed fractional slowdown or memory growth (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    report = run_benchmarks(
+        args.sizes, args.stages, args.repeat, not args.no_memory, args.render_max,
+        callback=lambda record: print(_format_record(record), file=sys.stderr),
+    )
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        rows = compare(report, baseline, args.tolerance)
+        regressions = [row for row in rows if row["regressed"]]
+        for row in rows:
+            memory = "-" if row["memory_ratio"] is None else f"{row['memory_ratio']:.2f}x"
+            flag = "  REGRESSION" if row["regressed"] else ""
+            print(f"{row['stage']:<9} {row['case']:<14} {row['size']:>9}  time {row['time_ratio']:.2f}x  "
+                  f"memory {memory}{flag}", file=sys.stderr)
+        print(f"{len(regressions)} regression(s) in {len(rows)} compared case(s)", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
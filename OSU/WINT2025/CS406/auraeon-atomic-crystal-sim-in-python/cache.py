@@ -0,0 +1,111 @@
+"""
+Bounded LRU cache for Auraeon Crystal Lattice Simulator.
+
+Used to keep generated lattices and bond lists around between refreshes so
+that changing only a rotation, a color or the defect percentages does not
+regenerate the geometry. Entries are evicted least-recently-used first once
+the total size of the cached arrays exceeds max_bytes.
+"""
+
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+
+def _sizeof(value):
+    """Approximate memory held by value: the bytes of every NumPy array in it."""
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, (tuple, list)):
+        return sum(_sizeof(v) for v in value)
+    if isinstance(value, dict):
+        return sum(_sizeof(v) for v in value.values())
+    return 0
+
+
+def _freeze(value):
+    """Makes cached arrays read-only so callers cannot modify shared data."""
+    if isinstance(value, np.ndarray):
+        value.flags.writeable = False
+    elif isinstance(value, (tuple, list)):
+        for v in value:
+            _freeze(v)
+    elif isinstance(value, dict):
+        for v in value.values():
+            _freeze(v)
+    return value
+
+
+class LRUCache:
+    """Thread-safe least-recently-used cache with a memory budget."""
+
+    def __init__(self, max_bytes=256 * 2**20):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()  # key -> (value, nbytes)
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def get(self, key, default=None):
+        """Returns the cached value for key (marking it recently used) or default."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value):
+        """Stores value under key, evicting old entries to stay within max_bytes."""
+        nbytes = _sizeof(value)
+        if nbytes > self.max_bytes:
+            return value  # would evict everything else, not worth caching
+        _freeze(value)
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= self._entries.pop(key)[1]
+            self._entries[key] = (value, nbytes)
+            self._bytes += nbytes
+            while self._bytes > self.max_bytes:
+                _, (_, old_bytes) = self._entries.popitem(last=False)
+                self._bytes -= old_bytes
+                self.evictions += 1
+        return value
+
+    def get_or_compute(self, key, compute):
+        """Returns the cached value for key, calling compute() and caching it on a miss."""
+        value = self.get(key)
+        if value is None:
+            value = self.put(key, compute())
+        return value
+
+    def clear(self):
+        """Drops every entry. Hit/miss counters are kept."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        """Hit/miss counters and current size, for sizing the cache."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+            }
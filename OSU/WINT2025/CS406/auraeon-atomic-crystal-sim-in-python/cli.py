@@ -0,0 +1,247 @@
+"""
+Command line entry point for Auraeon Crystal Lattice Simulator.
+
+Builds a crystal without any GUI and either prints a summary or exports it
+(.xyz, .extxyz, .data/.lmp for LAMMPS, .npy or .npz), e.g.
+
+    python cli.py --lattice 3d_fcc --nx 10 --ny 10 --nz 10 -o fcc.npz
+    python cli.py --lattice 3d_fcc --nx 100 --ny 100 --nz 100 --stream -o fcc.data
+    python cli.py --lattice 3d_nacl --periodic --no-bonds --rdf rdf.csv --r-max 8
+    python cli.py --lattice 3d_fcc -a 3.6 -b 3.6 -c 3.6 --element1 Cu --element2 Cu --periodic --energy morse
+    python cli.py --lattice 3d_fcc -a 3.6 -b 3.6 -c 3.6 --element1 Cu --element2 Cu --periodic --no-bonds --md 1000 --trajectory md.xyz
+    python cli.py --lattice 3d_fcc -a 3.6 -b 3.6 -c 3.6 --element1 Cu --element2 Ag --doping 10 --periodic --anneal 100000 --energy morse -o annealed.xyz
+    python cli.py --lattice 3d_fcc --sweep a=3.5,3.6,3.7 --sweep vacancy_percent=0,5,10 --checkpoint sweep.jsonl --table sweep.csv
+"""
+
+import argparse
+import dataclasses
+import logging
+import os
+import sys
+
+from crystal import CrystalParams, build_crystal, num_lattice_sites
+from export import export_crystal
+from lattice import LATTICE_DEFS
+from profiling import PROFILER, CSVSink, LogSink
+
+
+def parse_args(argv=None):
+    """Parses command line arguments into CrystalParams plus output options."""
+    defaults = CrystalParams()
+    parser = argparse.ArgumentParser(description="Build a crystal lattice without the GUI.")
+    parser.add_argument("--lattice", default=defaults.lattice_type, choices=list(LATTICE_DEFS), help="lattice type")
+    parser.add_argument("-a", type=float, default=defaults.a, help="lattice constant a")
+    parser.add_argument("-b", type=float, default=defaults.b, help="lattice constant b")
+    parser.add_argument("-c", type=float, default=defaults.c, help="lattice constant c")
+    parser.add_argument("--alpha", type=float, default=defaults.alpha, help="cell angle alpha (between b and c) in degrees")
+    parser.add_argument("--beta", type=float, default=defaults.beta, help="cell angle beta (between a and c) in degrees")
+    parser.add_argument("--gamma", type=float, default=defaults.gamma, help="cell angle gamma (between a and b) in degrees")
+    parser.add_argument("--nx", type=int, default=defaults.nx, help="unit cells along x")
+    parser.add_argument("--ny", type=int, default=defaults.ny, help="unit cells along y")
+    parser.add_argument("--nz", type=int, default=defaults.nz, help="unit cells along z")
+    parser.add_argument("--element1", default=defaults.element_1, help="symbol of element 1")
+    parser.add_argument("--element2", default=defaults.element_2, help="symbol of element 2")
+    parser.add_argument("--element3", default=defaults.element_3, help="symbol of element 3 (perovskite oxygen sites)")
+    parser.add_argument("--vacancy", type=float, default=defaults.vacancy_percent, help="vacancy percentage")
+    parser.add_argument("--doping", type=float, default=defaults.doping_percent, help="doping percentage")
+    parser.add_argument("--interstitial", type=float, default=defaults.interstitial_percent, help="interstitial atoms as a percentage of lattice sites")
+    parser.add_argument("--interstitial-element", default=defaults.interstitial_element, help="symbol of the interstitial atoms (default: element 2)")
+    parser.add_argument("--cluster-radius", type=float, default=defaults.cluster_radius, help="cluster defects on about this length scale (0: uniform)")
+    parser.add_argument("--seed", type=int, default=defaults.seed, help="random seed for the defects; the same seed gives the same crystal")
+    parser.add_argument("--bond-threshold", type=float, default=defaults.bond_threshold, help="bond length threshold")
+    parser.add_argument("--no-bonds", action="store_true", help="skip the bond search")
+    parser.add_argument("--periodic", action="store_true", help="find bonds with periodic boundaries (minimum image)")
+    parser.add_argument("--rotate", type=float, nargs=3, default=defaults.rotation, metavar=("X", "Y", "Z"), help="rotate the crystal about x, y and z (degrees)")
+    parser.add_argument("-o", "--output", help="export to this file; the format follows the extension")
+    parser.add_argument("--rdf", metavar="PATH", help="save g(r) and the partial g_ab(r) to PATH (.npz or .csv)")
+    parser.add_argument("--r-max", type=float, default=10.0, help="largest distance for --rdf")
+    parser.add_argument("--bins", type=int, default=200, help="number of distance bins for --rdf")
+    parser.add_argument("--workers", type=int, default=None, help="processes used for --rdf, --sweep and --animate")
+    parser.add_argument("--energy", choices=["lj", "morse"], help="print the Lennard-Jones or Morse pair potential energy")
+    parser.add_argument("--cutoff", type=float, default=None, help="pair potential cutoff for --energy (default: from the potential)")
+    parser.add_argument("--anneal", type=int, default=0, metavar="TRIALS", help="rearrange the dopants with this many Monte Carlo swap trials (potential from --energy, default lj)")
+    parser.add_argument("--anneal-start", type=float, default=1500.0, help="annealing start temperature in K")
+    parser.add_argument("--anneal-end", type=float, default=100.0, help="annealing end temperature in K")
+    parser.add_argument("--anneal-stages", type=int, default=20, help="temperatures in the (geometric) cooling schedule")
+    parser.add_argument("--md", type=int, default=0, metavar="STEPS", help="run this many molecular dynamics steps (potential from --energy, default lj)")
+    parser.add_argument("--timestep", type=float, default=1.0, help="MD timestep in fs")
+    parser.add_argument("--temperature", type=float, default=300.0, help="initial MD temperature in K")
+    parser.add_argument("--thermostat", type=float, default=None, metavar="K", help="hold MD at this temperature (Berendsen); default is constant energy")
+    parser.add_argument("--trajectory", metavar="PATH", help="stream MD frames to PATH (.xyz, .extxyz or .npy)")
+    parser.add_argument("--frame-every", type=int, default=10, help="steps between trajectory frames")
+    parser.add_argument("--sweep", action="append", default=[], metavar="FIELD=V1,V2,...", help="sweep a CrystalParams field over values (repeat for a grid); the other flags set the rest")
+    parser.add_argument("--table", metavar="PATH", help="save the sweep metrics to PATH (.csv or .npz)")
+    parser.add_argument("--checkpoint", metavar="PATH", help="record finished sweep points in PATH and skip them when resuming")
+    parser.add_argument("--animate", metavar="PATH", help="render an offscreen animation to PATH (.gif, or a directory for PNG frames)")
+    parser.add_argument("--frames", type=int, default=36, help="frames of the --animate camera orbit")
+    parser.add_argument("--elevation", type=float, default=30.0, help="camera elevation in degrees for --animate")
+    parser.add_argument("--animate-param", metavar="FIELD=V1,V2,...", help="animate a CrystalParams field over values instead of orbiting the camera")
+    parser.add_argument("--fps", type=float, default=12.0, help="GIF frames per second for --animate")
+    parser.add_argument("--profile", action="store_true", help="log the time of every build stage to stderr")
+    parser.add_argument("--profile-csv", metavar="PATH", help="append the time, atoms, bonds and bytes of every build stage to PATH")
+    parser.add_argument("--stream", action="store_true", help="write the perfect lattice chunk by chunk without building it in memory (no defects or bonds)")
+    args = parser.parse_args(argv)
+
+    params = CrystalParams(
+        lattice_type=args.lattice,
+        a=args.a, b=args.b, c=args.c,
+        alpha=args.alpha, beta=args.beta, gamma=args.gamma,
+        nx=args.nx, ny=args.ny, nz=args.nz,
+        element_1=args.element1, element_2=args.element2, element_3=args.element3,
+        vacancy_percent=args.vacancy, doping_percent=args.doping,
+        bond_threshold=None if args.no_bonds else args.bond_threshold,
+        periodic=args.periodic,
+        interstitial_percent=args.interstitial,
+        interstitial_element=args.interstitial_element,
+        cluster_radius=args.cluster_radius,
+        seed=args.seed,
+        rotation=tuple(args.rotate),
+    )
+    return params, args
+
+
+def parse_sweep_axes(specs):
+    """Turns 'field=v1,v2' strings into parameter_grid keywords, converting values to the field's type."""
+    types = {field.name: field.type for field in dataclasses.fields(CrystalParams)}
+    axes = {}
+    for spec in specs:
+        name, _, values = spec.partition("=")
+        name = name.strip().replace("-", "_")
+        if name not in types or not values:
+            raise ValueError(f"Bad --sweep {spec!r}: expected FIELD=V1,V2,... with a CrystalParams field")
+        convert = types[name]
+        if convert is bool:
+            convert = lambda value: value.strip().lower() in ("1", "true", "yes", "on")
+        elif convert not in (int, float, str):
+            raise ValueError(f"Cannot sweep {name}")
+        axes[name] = [convert(value.strip()) for value in values.split(",")]
+    return axes
+
+
+def run_sweep_command(params, args):
+    """Runs --sweep and prints one line per point."""
+    from sweep import parameter_grid, run_sweep  # only needed for sweeps
+    axes = parse_sweep_axes(args.sweep)
+    points = parameter_grid(params, **axes)
+
+    def report(done, total, point, metrics):
+        values = ", ".join(f"{name}={getattr(point, name)}" for name in axes)
+        print(f"[{done}/{total}] {values}: {metrics['num_atoms']} atoms, density {metrics['density']:.4f}, "
+              f"packing {metrics['packing_fraction']:.4f}, coordination {metrics['coordination_mean']:.3f}")
+
+    table = run_sweep(points, args.workers, args.checkpoint, report)
+    print(f"Swept {len(table)} points")
+    if args.table:
+        table.save(args.table)
+        print(f"Saved {len(table)} sweep points to {args.table}")
+
+
+def run_animate_command(params, args):
+    """Runs --animate and reports the progress."""
+    from animate import orbit_path, parameter_path, render_animation  # only needed for animations
+    if args.animate_param:
+        ((field, values),) = parse_sweep_axes([args.animate_param]).items()
+        frames = parameter_path(params, field, values, args.elevation)
+    else:
+        frames = orbit_path(params, args.frames, args.elevation)
+    paths = render_animation(
+        frames, args.animate, args.workers, fps=args.fps,
+        callback=lambda done, total: print(f"Rendered {done}/{total} frames", end="\r", flush=True)
+    )
+    print(f"\nSaved {len(frames)} frames to {args.animate if len(paths) == 1 else os.path.dirname(paths[0])}")
+
+
+def build_profiled(params, args):
+    """build_crystal, with its stages sent to the sinks chosen by --profile and --profile-csv."""
+    sinks = []
+    if args.profile:
+        logging.basicConfig(level=logging.INFO, format="%(message)s")
+        sinks.append(LogSink())
+    if args.profile_csv:
+        sinks.append(CSVSink(args.profile_csv))
+    if not sinks:
+        return build_crystal(params)
+    PROFILER.enable(*sinks)
+    frame = PROFILER.begin("build")
+    try:
+        with PROFILER.activate(frame):
+            crystal = build_crystal(params)
+        PROFILER.finish(frame)
+    finally:
+        PROFILER.disable()
+        for sink in sinks:
+            PROFILER.remove_sink(sink)
+            if isinstance(sink, CSVSink):
+                sink.close()
+    return crystal
+
+
+def main(argv=None):
+    params, args = parse_args(argv)
+    try:
+        if args.sweep:
+            run_sweep_command(params, args)
+            return 0
+        if args.animate:
+            run_animate_command(params, args)
+            return 0
+        if args.stream:
+            if not args.output:
+                raise ValueError("--stream needs an --output file")
+            if params.vacancy_percent or params.doping_percent or params.interstitial_percent:
+                raise ValueError("--stream writes the perfect lattice; drop --vacancy/--doping/--interstitial")
+            export_crystal(args.output, params)
+            print(f"Streamed {num_lattice_sites(params)} atoms to {args.output}")
+            return 0
+
+        crystal = build_profiled(params, args)
+        if args.anneal:
+            from anneal import DopantAnnealer  # only needed for annealing runs
+            annealer = DopantAnnealer(crystal, args.energy or "lj", cutoff=args.cutoff, seed=params.seed)
+            start_energy = annealer.energy
+            annealer.anneal(args.anneal_start, args.anneal_end, args.anneal, args.anneal_stages)
+            print(f"Annealed: {annealer.accepted} of {annealer.tried} swaps accepted, "
+                  f"energy {start_energy:.6f} -> {annealer.energy:.6f} eV")
+        if args.rdf:
+            from rdf import radial_distribution  # only needed for analysis runs
+            radial_distribution(crystal, args.r_max, args.bins, workers=args.workers).save(args.rdf)
+            print(f"Saved g(r) up to {args.r_max} to {args.rdf}")
+        if args.energy:
+            from potentials import crystal_energy  # only needed for analysis runs
+            result = crystal_energy(crystal, args.energy, args.cutoff)
+            per_atom = result.energy / max(crystal.num_atoms, 1)
+            largest = abs(result.forces).max() if crystal.num_atoms else 0.0
+            print(f"Energy ({args.energy}): {result.energy:.6f} eV, {per_atom:.6f} eV/atom, "
+                  f"largest force component {largest:.6f} eV/A")
+        if args.md:
+            from md import Simulation  # only needed for dynamics runs
+            simulation = Simulation(
+                crystal, args.energy or "lj", args.timestep, args.temperature, args.thermostat,
+                cutoff=args.cutoff, seed=params.seed
+            )
+            start_energy = simulation.total_energy()
+            simulation.run(args.md, args.trajectory, args.frame_every)
+            simulation.store()  # so -o exports the final coordinates
+            timing = simulation.timing()
+            print(f"MD: {args.md} steps of {args.timestep} fs, T = {simulation.temperature():.1f} K, "
+                  f"energy drift {simulation.total_energy() - start_energy:.6f} eV, "
+                  f"{timing['mean'] * 1000:.2f} ms/step, {timing['neighbor_builds']} neighbor list builds")
+            if args.trajectory:
+                print(f"Saved the trajectory to {args.trajectory}")
+        if args.output:
+            export_crystal(args.output, crystal)
+            print(f"Saved {crystal} to {args.output}")
+        else:
+            print(crystal)
+            histogram = crystal.coordination_histogram()
+            if histogram is not None:
+                counts = ", ".join(f"{cn}: {count}" for cn, count in enumerate(histogram) if count)
+                print(f"Coordination (bonds: atoms): {counts}")
+    except ValueError as error:
+        print(f"Error: {error}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,401 @@
+"""
+Headless crystal building API for Auraeon Crystal Lattice Simulator.
+
+build_crystal() turns a CrystalParams description into a Crystal holding
+atom coordinates, species and bonds. It runs the same lattice dispatch,
+rotation and defect steps as the GUI, but without importing
+tkinter or matplotlib, so crystals can be built in batch jobs, tests or
+on machines without a display.
+"""
+
+import shutil
+from dataclasses import dataclass
+
+import numpy as np
+
+from cache import LRUCache
+from defects import apply_defects
+from elements import element_table, is_element
+from lattice import LATTICE_DEFS, generate_lattice, iter_lattice_chunks, lattice_cell
+from neighbors import coordination_histogram, coordination_numbers, find_bonds, find_periodic_bonds
+from profiling import PROFILER
+
+# Unrotated lattices keyed on geometry, and full-lattice bond lists keyed on
+# geometry plus bond threshold and periodicity. Rotation, defects and colors never touch them.
+LATTICE_CACHE = LRUCache(max_bytes=256 * 2**20)
+BOND_CACHE = LRUCache(max_bytes=256 * 2**20)
+
+
+@dataclass
+class CrystalParams:
+    """Everything needed to build a crystal. Defaults match the GUI's start-up state."""
+    lattice_type: str = "3d_bcc"
+    a: float = 5.0
+    b: float = 5.0
+    c: float = 5.0
+    alpha: float = 90.0  # cell angles in degrees
+    beta: float = 90.0
+    gamma: float = 90.0
+    nx: int = 5
+    ny: int = 5
+    nz: int = 5
+    element_1: str = "Fe"
+    element_2: str = "C"
+    element_3: str = "O"  # only used by lattices with a third site (e.g. perovskite)
+    vacancy_percent: float = 0.0
+    doping_percent: float = 0.0
+    bond_threshold: float = 2.0  # None skips the bond search
+    periodic: bool = False  # bonds wrap around the supercell (minimum image)
+    interstitial_percent: float = 0.0  # extra atoms in lattice holes, as % of lattice sites
+    interstitial_element: str = None  # None uses element_2
+    cluster_radius: float = 0.0  # > 0 clusters defects on about this length scale
+    seed: int = None  # same seed and parameters give the same defects; None is random
+    rotation: tuple = (0.0, 0.0, 0.0)  # degrees about x, y, z; 2D lattices only use z
+
+
+class Crystal:
+    """
+    A built crystal stored as a structure of arrays.
+
+    Every lattice site keeps its slot for the lifetime of the crystal:
+    - positions: contiguous (N, 3) array (z is 0 for 2D lattices)
+    - species: (N,) uint8/uint16 codes indexing into symbols
+    - occupied: (N,) boolean mask, False marks a vacancy
+    Vacancies and doping only flip mask entries or species codes, and
+    per-atom properties are looked up per species rather than per atom.
+    bonds index into the occupied atoms (see atom_positions), or are None.
+
+    The arrays may be np.memmap buffers in storage_dir (see outofcore.py);
+    iter_atom_chunks then reads them without loading everything into RAM.
+    """
+
+    __slots__ = ("params", "dim", "positions", "species", "occupied", "symbols", "bonds", "storage_dir")
+
+    def __init__(self, params, dim, positions, species, symbols, occupied=None, bonds=None, storage_dir=None):
+        self.params = params
+        self.dim = dim
+        self.positions = positions
+        self.species = species
+        self.symbols = list(symbols)
+        self.occupied = np.ones(len(positions), dtype=bool) if occupied is None else occupied
+        self.bonds = bonds
+        self.storage_dir = storage_dir
+
+    @property
+    def num_sites(self):
+        return len(self.positions)
+
+    @property
+    def num_atoms(self):
+        return int(np.count_nonzero(self.occupied))
+
+    @property
+    def nbytes(self):
+        """Memory held by the per-site arrays and the bond array."""
+        total = self.positions.nbytes + self.species.nbytes + self.occupied.nbytes
+        return total + (self.bonds.nbytes if self.bonds is not None else 0)
+
+    def species_code(self, symbol):
+        """Returns the species code for symbol, registering it if it is new."""
+        if symbol not in self.symbols:
+            self.symbols.append(symbol)
+            if len(self.symbols) > np.iinfo(self.species.dtype).max + 1:
+                self.species = self.species.astype(np.uint16)
+        return self.symbols.index(symbol)
+
+    def atom_indices(self):
+        """Site indices of the occupied sites."""
+        return np.flatnonzero(self.occupied)
+
+    def atom_positions(self):
+        """(num_atoms, dim) coordinates of the occupied sites."""
+        return self.positions[self.occupied, :self.dim]
+
+    def atom_species(self):
+        """Species codes of the occupied sites."""
+        return self.species[self.occupied]
+
+    def iter_atom_chunks(self, chunk_sites=1 << 16):
+        """Yields (positions, species) of the occupied atoms, chunk_sites sites at a time."""
+        for start in range(0, self.num_sites, chunk_sites):
+            stop = start + chunk_sites
+            occupied = np.asarray(self.occupied[start:stop])
+            yield self.positions[start:stop][occupied], self.species[start:stop][occupied]
+
+    def close(self):
+        """Deletes the scratch files of a memory-mapped crystal (no-op otherwise)."""
+        if self.storage_dir is None:
+            return
+        for name in ("positions", "species", "occupied", "bonds"):
+            array = getattr(self, name)
+            if isinstance(array, np.memmap):
+                array.flush()
+        self.positions = self.species = self.occupied = self.bonds = None
+        shutil.rmtree(self.storage_dir, ignore_errors=True)
+        self.storage_dir = None
+
+    def atom_symbols(self):
+        """Element symbols of the occupied sites."""
+        return np.array(self.symbols)[self.atom_species()]
+
+    def lookup(self, table):
+        """
+        Resolves a per-species table for every occupied atom.
+
+        table is a sequence with one entry per symbol (e.g. one color per
+        element) or a dict keyed by symbol; the result is one fancy index.
+        """
+        if isinstance(table, dict):
+            table = [table[symbol] for symbol in self.symbols]
+        return np.asarray(table)[self.atom_species()]
+
+    def coordination(self):
+        """Number of bonds of every occupied atom, or None when bonds were not searched."""
+        if self.bonds is None:
+            return None
+        return coordination_numbers(self.bonds, self.num_atoms)
+
+    def coordination_histogram(self):
+        """counts[k] is the number of atoms with exactly k bonds (None without bonds)."""
+        coordination = self.coordination()
+        return None if coordination is None else coordination_histogram(coordination)
+
+    def element_table(self):
+        """The elements.ElementTable of this crystal's symbols (row k is species code k)."""
+        return element_table(self.symbols)
+
+    def element_property(self, name):
+        """Looks up an element property (e.g. "radius", see ElementTable.column) for every occupied atom."""
+        return self.element_table().take(name, self.atom_species())
+
+    def vacate(self, site_indices):
+        """Marks sites as vacancies. Bonds become stale and are dropped."""
+        self.occupied[site_indices] = False
+        self.bonds = None
+
+    def substitute(self, site_indices, symbol):
+        """Places element symbol on the given sites."""
+        if len(site_indices) == 0:
+            return
+        self.species[site_indices] = self.species_code(symbol)
+
+    def insert(self, positions, symbol):
+        """Appends occupied sites of element symbol (e.g. interstitials). Bonds become stale and are dropped."""
+        if len(positions) == 0:
+            return
+        code = self.species_code(symbol)
+        self.positions = np.concatenate((self.positions, np.asarray(positions, dtype=self.positions.dtype)))
+        self.species = np.concatenate((self.species, np.full(len(positions), code, dtype=self.species.dtype)))
+        self.occupied = np.concatenate((self.occupied, np.ones(len(positions), dtype=bool)))
+        self.bonds = None
+
+    def __repr__(self):
+        num_bonds = "?" if self.bonds is None else len(self.bonds)
+        return f"Crystal({self.params.lattice_type}, atoms={self.num_atoms}, bonds={num_bonds})"
+
+
+def rotation_matrix(alpha_degs, beta_degs, gamma_degs):
+    """Rotation about x, then y, then z by alpha, beta and gamma degrees (Rz @ Ry @ Rx)."""
+    alpha = np.radians(alpha_degs)
+    beta = np.radians(beta_degs)
+    gamma = np.radians(gamma_degs)
+    Rx = np.array([[1, 0, 0], [0, np.cos(alpha), -np.sin(alpha)], [0, np.sin(alpha), np.cos(alpha)]])
+    Ry = np.array([[np.cos(beta), 0, np.sin(beta)], [0, 1, 0], [-np.sin(beta), 0, np.cos(beta)]])
+    Rz = np.array([[np.cos(gamma), -np.sin(gamma), 0], [np.sin(gamma), np.cos(gamma), 0], [0, 0, 1]])
+    return Rz @ Ry @ Rx
+
+
+def _generate_positions(params):
+    """
+    Generates the unrotated lattice for params.
+
+    Returns (positions, sites) where positions is an (N, 3) array and sites
+    holds the element slot of each site (0, 1 or 2 for element 1, 2, 3).
+    """
+    return generate_lattice(
+        params.lattice_type, params.nx, params.ny, params.nz,
+        params.a, params.b, params.c, params.alpha, params.beta, params.gamma
+    )
+
+
+def geometry_key(params):
+    """Cache key for everything that changes the unrotated lattice."""
+    return (
+        params.lattice_type, params.nx, params.ny, params.nz,
+        params.a, params.b, params.c, params.alpha, params.beta, params.gamma
+    )
+
+
+def bond_key(params):
+    """Cache key for the bonds of the complete, unrotated lattice."""
+    return geometry_key(params) + (params.bond_threshold, params.periodic)
+
+
+def lattice_geometry(params, use_cache=True):
+    """Returns the unrotated (positions, sites) arrays for params, read-only when cached."""
+    if not use_cache:
+        return _generate_positions(params)
+    return LATTICE_CACHE.get_or_compute(geometry_key(params), lambda: _generate_positions(params))
+
+
+def _find_lattice_bonds(params, positions, dim, oriented=False):
+    if params.periodic:
+        return find_periodic_bonds(positions[:, :dim], params.bond_threshold, supercell_matrix(params, oriented))
+    return find_bonds(positions[:, :dim], params.bond_threshold)
+
+
+def lattice_bonds(params, positions, dim, use_cache=True):
+    """Bonds of the complete, unrotated lattice. Rotation never changes bond lengths."""
+    if not use_cache:
+        return _find_lattice_bonds(params, positions, dim)
+    return BOND_CACHE.get_or_compute(bond_key(params), lambda: _find_lattice_bonds(params, positions, dim))
+
+
+def cache_stats():
+    """Hit/miss counters and sizes of the lattice and bond caches."""
+    return {"lattice": LATTICE_CACHE.stats(), "bonds": BOND_CACHE.stats()}
+
+
+def crystal_dim(params):
+    """2 or 3, depending on the lattice type."""
+    if params.lattice_type not in LATTICE_DEFS:
+        raise ValueError(f"Unsupported lattice type: {params.lattice_type}")
+    return LATTICE_DEFS[params.lattice_type]["dim"]
+
+
+def orientation_matrix(params):
+    """Rotation applied to the lattice, or None when params.rotation is zero."""
+    if not any(params.rotation):
+        return None
+    if crystal_dim(params) == 2:
+        return rotation_matrix(0.0, 0.0, params.rotation[2])
+    return rotation_matrix(*params.rotation)
+
+
+def site_symbols(params):
+    """
+    Maps the element slots used by the lattice type to species codes.
+
+    Returns (symbols, slot_codes): the distinct element symbols, and for
+    each slot the index of its element in symbols. Unified elements share
+    one code.
+    """
+    elements = [params.element_1, params.element_2, params.element_3]
+    symbols = []
+    slot_codes = np.zeros(len(elements), dtype=np.uint8)
+    for slot in sorted(set(LATTICE_DEFS[params.lattice_type]["sites"])):
+        element = elements[slot]
+        if not is_element(element):
+            raise ValueError(f"Unknown element: {element}")
+        if element not in symbols:
+            symbols.append(element)
+        slot_codes[slot] = symbols.index(element)
+    return symbols, slot_codes
+
+
+def supercell_matrix(params, oriented=True):
+    """Rows are the edges of the whole nx * ny * nz block, rotated like the atoms unless oriented is False."""
+    cell = lattice_cell(
+        params.lattice_type, params.a, params.b, params.c,
+        params.alpha, params.beta, params.gamma
+    )
+    nz = 1 if crystal_dim(params) == 2 else params.nz
+    box = cell * np.array([[params.nx], [params.ny], [nz]])
+    R = orientation_matrix(params) if oriented else None
+    return box if R is None else box @ R.T
+
+
+def num_lattice_sites(params):
+    """Number of sites build_crystal would generate for params."""
+    nz = 1 if crystal_dim(params) == 2 else params.nz
+    return params.nx * params.ny * nz * len(LATTICE_DEFS[params.lattice_type]["basis"])
+
+
+def iter_lattice_stream(params, chunk_cells=4096, dtype=np.float64):
+    """
+    Yields (positions, species) chunks of the perfect, oriented lattice.
+
+    Nothing larger than chunk_cells unit cells is ever held in memory, so
+    this can feed exporters for crystals that would not fit in RAM. Species
+    codes index into site_symbols(params)[0]. Vacancies, doping and bonds
+    are not applied.
+    """
+    definition = LATTICE_DEFS[params.lattice_type]
+    nz = 1 if definition["dim"] == 2 else params.nz
+    cell = lattice_cell(
+        params.lattice_type, params.a, params.b, params.c,
+        params.alpha, params.beta, params.gamma
+    )
+    _, slot_codes = site_symbols(params)
+    species = slot_codes[np.asarray(definition["sites"])]
+    R = orientation_matrix(params)
+
+    chunks = iter_lattice_chunks(cell, definition["basis"], params.nx, params.ny, nz, chunk_cells)
+    for _, positions in chunks:
+        if R is not None:
+            positions = positions @ R.T
+        yield positions.astype(dtype, copy=False), np.tile(species, len(positions) // len(species))
+
+
+def build_crystal(params, dtype=np.float64, use_cache=True, scratch_dir=None):
+    """
+    Builds a crystal (lattice, rotation, defects and bonds) from params.
+
+    dtype sets the position precision; np.float32 halves the largest array.
+    With use_cache the unrotated lattice and its bonds are reused between
+    calls that share the same geometry, so only the rotation (one matrix
+    multiply) and the defect pass (see defects.py) are redone.
+    With scratch_dir the crystal's arrays are memory-mapped files in that
+    directory and every pass runs chunk by chunk (see outofcore.py); call
+    Crystal.close() to delete them.
+    """
+    dim = crystal_dim(params)
+    symbols, slot_codes = site_symbols(params)
+    for element in (params.element_2, params.interstitial_element):
+        if element is not None and not is_element(element):
+            raise ValueError(f"Unknown element: {element}")
+
+    if scratch_dir is not None:
+        from outofcore import build_mapped_crystal  # outofcore builds on this module
+        return build_mapped_crystal(params, scratch_dir, dtype)
+
+    # Each step is a profiling stage (see profiling.py); they cost nothing while profiling is off
+    with PROFILER.stage("lattice") as record:
+        base_positions, sites = lattice_geometry(params, use_cache)
+        record.update(atoms=len(base_positions), bytes=base_positions.nbytes + sites.nbytes)
+
+    with PROFILER.stage("rotate") as record:
+        R = orientation_matrix(params)
+        if R is None:
+            positions = np.array(base_positions, dtype=dtype)
+        else:
+            positions = np.asarray(base_positions @ R.T, dtype=dtype)
+        record.update(atoms=len(positions), bytes=positions.nbytes)
+
+    with PROFILER.stage("defects") as record:
+        crystal = Crystal(params, dim, positions, slot_codes[sites], symbols)
+        num_interstitials = apply_defects(crystal, params, R)
+        record.update(atoms=crystal.num_atoms, bytes=crystal.species.nbytes + crystal.occupied.nbytes)
+
+    if params.bond_threshold is not None:
+        with PROFILER.stage("bonds") as record:
+            if num_interstitials:
+                # Interstitials are not lattice sites, so search the atoms as placed
+                crystal.bonds = _find_lattice_bonds(params, crystal.atom_positions(), dim, oriented=True)
+            else:
+                bonds = lattice_bonds(params, base_positions, dim, use_cache)
+                crystal.bonds = occupied_bonds(bonds, crystal.occupied)
+            record.update(bonds=len(crystal.bonds), bytes=crystal.bonds.nbytes)
+
+    return crystal
+
+
+def occupied_bonds(site_bonds, occupied):
+    """
+    Restricts site-index bonds to occupied sites and renumbers them.
+
+    The result indexes into the occupied atoms, like Crystal.bonds.
+    """
+    keep = occupied[site_bonds[:, 0]] & occupied[site_bonds[:, 1]]
+    atom_number = np.cumsum(occupied) - 1
+    return atom_number[site_bonds[keep]].astype(site_bonds.dtype, copy=False)
@@ -0,0 +1,148 @@
+"""
+Seeded defect engine for Auraeon Crystal Lattice Simulator.
+
+Vacancies, substitutional dopants and interstitials are applied to a
+Crystal purely through masks and index arrays (vacancies clear occupied
+entries, dopants overwrite species codes, interstitials append sites), in
+vectorized O(N) passes. Every kind of defect draws from its own
+np.random.Generator stream derived from one seed, so the same seed and
+parameters give the same crystal in every run and every process, and
+changing e.g. the doping level never reshuffles the vacancies.
+
+Defects can be spatially correlated: with a cluster radius, space is cut
+into blocks of that size, each block gets a random intensity, and sites
+are drawn with probability proportional to the intensity of their block.
+"""
+
+import itertools
+
+import numpy as np
+
+from lattice import LATTICE_DEFS, lattice_cell
+
+# Independent random streams per kind of defect
+VACANCY_STREAM = 0
+DOPING_STREAM = 1
+INTERSTITIAL_STREAM = 2
+
+# Shape of the Gamma distribution of cluster intensities: small values put
+# most defects into a few blocks
+CLUSTER_SHAPE = 0.25
+
+
+def defect_rng(seed, stream):
+    """Generator for one kind of defect; seed None draws fresh entropy."""
+    return np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(stream,)))
+
+
+def cluster_weights(rng, positions, cluster_radius):
+    """Relative chance of a defect at each position, constant over cluster_radius-sized blocks."""
+    blocks = np.floor((positions - positions.min(axis=0)) / cluster_radius).astype(np.int64)
+    _, block_of_site = np.unique(blocks, axis=0, return_inverse=True)
+    intensity = rng.gamma(CLUSTER_SHAPE, size=block_of_site.max() + 1)
+    # Keep every weight positive, so any number of defects can still be placed
+    return intensity[block_of_site.ravel()] + 1e-12
+
+
+def choose_sites(rng, candidates, count, positions=None, cluster_radius=0.0):
+    """
+    Picks count of the candidate indices without replacement.
+
+    Uniform unless cluster_radius > 0, in which case positions (one row
+    per candidate) bias the choice towards a few clusters. Weighted picks
+    use one random key per candidate (Efraimidis-Spirakis), so they stay
+    a single vectorized pass.
+    """
+    candidates = np.asarray(candidates)
+    count = min(int(count), len(candidates))
+    if count <= 0:
+        return candidates[:0]
+    if not cluster_radius or positions is None:
+        return candidates[rng.choice(len(candidates), count, replace=False)]
+
+    weights = cluster_weights(rng, np.asarray(positions, dtype=float), cluster_radius)
+    keys = np.log(rng.random(len(candidates))) / weights
+    return candidates[np.argpartition(keys, len(keys) - count)[-count:]]
+
+
+def interstitial_basis(lattice_type, cell, tolerance=1e-6):
+    """
+    Fractional positions of the largest holes in one unit cell.
+
+    Points on a grid of twelfths of the cell (which holds the usual
+    cubic and hexagonal holes) are ranked by their distance to the
+    nearest lattice atom (periodically); the ones with the largest
+    clearance are the interstitial sites, e.g. octahedral holes in FCC and
+    tetrahedral holes in BCC.
+    """
+    definition = LATTICE_DEFS[lattice_type]
+    dim = definition["dim"]
+    basis = np.asarray(definition["basis"], dtype=float) % 1.0
+    steps = np.arange(12) / 12.0
+    grid = np.array(list(itertools.product(steps, steps, steps if dim == 3 else [0.0])))
+
+    # Distance from every grid point to every periodic image of every basis atom
+    images = np.array(list(itertools.product((-1, 0, 1), (-1, 0, 1), (-1, 0, 1) if dim == 3 else (0,))))
+    atoms = (basis[:, None, :] + images[None, :, :]).reshape(-1, 3)
+    offsets = (grid[:, None, :] - atoms[None, :, :]) @ cell
+    clearance = np.sqrt(np.einsum("ijk,ijk->ij", offsets, offsets)).min(axis=1)
+    return grid[clearance >= clearance.max() * (1 - tolerance)]
+
+
+def interstitial_sites(params, count, rng, rotation=None):
+    """
+    Positions of count interstitials on distinct holes of the supercell.
+
+    rotation is the crystal's orientation matrix (or None). The cluster
+    radius of params biases which holes are filled, as for other defects.
+    """
+    cell = lattice_cell(params.lattice_type, params.a, params.b, params.c, params.alpha, params.beta, params.gamma)
+    holes = interstitial_basis(params.lattice_type, cell)
+    nz = 1 if LATTICE_DEFS[params.lattice_type]["dim"] == 2 else params.nz
+    num_holes = params.nx * params.ny * nz * len(holes)
+
+    def hole_positions(indices):
+        cells = np.column_stack(np.unravel_index(indices // len(holes), (params.nx, params.ny, nz)))
+        return (cells + holes[indices % len(holes)]) @ cell
+
+    if params.cluster_radius:
+        chosen = choose_sites(rng, np.arange(num_holes), count, hole_positions(np.arange(num_holes)), params.cluster_radius)
+    else:
+        chosen = choose_sites(rng, np.arange(num_holes), count)
+    positions = hole_positions(np.sort(chosen))
+    return positions if rotation is None else positions @ rotation.T
+
+
+def apply_defects(crystal, params, rotation=None):
+    """
+    Applies the vacancies, doping and interstitials described by params.
+
+    Percentages are of the lattice sites (vacancies, interstitials) and of
+    the atoms left after vacancies (doping). Returns the number of
+    interstitials added; bonds are dropped when there are any.
+    """
+    radius = params.cluster_radius
+    num_sites = crystal.num_sites
+
+    # Vacancy Simulation
+    num_vacancies = int(num_sites * params.vacancy_percent / 100)
+    if num_vacancies:
+        rng = defect_rng(params.seed, VACANCY_STREAM)
+        sites = np.arange(num_sites)
+        crystal.vacate(choose_sites(rng, sites, num_vacancies, crystal.positions, radius))
+
+    # Doping Simulation: replace remaining atoms with element 2
+    remaining = crystal.atom_indices()
+    num_dopants = int(len(remaining) * params.doping_percent / 100)
+    if num_dopants:
+        rng = defect_rng(params.seed, DOPING_STREAM)
+        positions = crystal.positions[remaining] if radius else None
+        crystal.substitute(choose_sites(rng, remaining, num_dopants, positions, radius), params.element_2)
+
+    # Interstitials: extra atoms in the largest holes of the lattice
+    num_interstitials = int(num_sites * params.interstitial_percent / 100)
+    if num_interstitials:
+        rng = defect_rng(params.seed, INTERSTITIAL_STREAM)
+        positions = interstitial_sites(params, num_interstitials, rng, rotation)
+        crystal.insert(positions, params.interstitial_element or params.element_2)
+    return num_interstitials
@@ -8,8 +8,19 @@ and each value is another dictionary specifying these properties:
 - color: A Matplotlib friendly color
 - radius: Approximate atomic radius used for plotting
 - mass: Atomic mass for future plans involving calculating densities, etc.
+
+Elements missing from ELEMENT_DATA come from the bundled periodic table
+(periodic_table.csv), which is read the first time it is needed.
+ElementTable compiles the properties of a crystal's elements into NumPy
+columns indexed by species code, so per-atom values are one fancy index.
 """
 
+import csv
+import json
+import os
+
+import numpy as np
+
 ELEMENT_DATA = {
     "H": {
         "name": "Hydrogen",
@@ -204,3 +215,142 @@ ELEMENT_DATA = {
         "mass": 112.41
     }
 }
+
+# Pair potential parameters for potentials.py, keyed by element pair (either
+# order). Energies are in eV and lengths in Angstrom.
+# - lj: Lennard-Jones well depth epsilon and zero-crossing distance sigma
+#   (noble gases from gas viscosity data, metals from Halicioglu & Pound 1975,
+#   C from the graphite interlayer fit of Girifalco et al. 2000)
+# - morse: Morse well depth, stiffness alpha (1/Angstrom) and equilibrium
+#   distance r0 (metals from Girifalco & Weizer 1959)
+# Pairs that are not listed are mixed from the two like pairs (see
+# potentials.pair_parameters).
+PAIR_POTENTIALS = {
+    ("He", "He"): {"lj": {"epsilon": 0.00088, "sigma": 2.556}},
+    ("Ne", "Ne"): {"lj": {"epsilon": 0.00307, "sigma": 2.749}},
+    ("Ar", "Ar"): {"lj": {"epsilon": 0.01032, "sigma": 3.405}},
+    ("C", "C"): {"lj": {"epsilon": 0.00239, "sigma": 3.414}},
+    ("Na", "Na"): {"morse": {"depth": 0.0633, "alpha": 0.5899, "r0": 5.336}},
+    ("K", "K"): {"morse": {"depth": 0.0542, "alpha": 0.4977, "r0": 6.369}},
+    ("Ca", "Ca"): {"morse": {"depth": 0.1623, "alpha": 0.8053, "r0": 4.569}},
+    ("Al", "Al"): {
+        "lj": {"epsilon": 0.3922, "sigma": 2.620},
+        "morse": {"depth": 0.2703, "alpha": 1.1646, "r0": 3.253}
+    },
+    ("Cr", "Cr"): {"morse": {"depth": 0.4414, "alpha": 1.5721, "r0": 2.754}},
+    ("Fe", "Fe"): {"morse": {"depth": 0.4174, "alpha": 1.3885, "r0": 2.845}},
+    ("Ni", "Ni"): {
+        "lj": {"epsilon": 0.5197, "sigma": 2.282},
+        "morse": {"depth": 0.4205, "alpha": 1.4199, "r0": 2.780}
+    },
+    ("Cu", "Cu"): {
+        "lj": {"epsilon": 0.4093, "sigma": 2.338},
+        "morse": {"depth": 0.3429, "alpha": 1.3588, "r0": 2.866}
+    },
+    ("Ag", "Ag"): {
+        "lj": {"epsilon": 0.3447, "sigma": 2.644},
+        "morse": {"depth": 0.3323, "alpha": 1.3690, "r0": 3.115}
+    },
+}
+
+
+# ==================== ELEMENT TABLE ====================
+# Every element: atomic number, name, standard atomic weight, calculated
+# atomic radius (Clementi et al. 1967, blank where none is tabulated) and
+# Jmol color. ELEMENT_DATA values take precedence over it.
+PERIODIC_TABLE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "periodic_table.csv")
+DEFAULT_RADIUS = 1.5  # Angstrom, for elements without a tabulated radius
+
+_PERIODIC_TABLE = None
+_TABLES = {}
+
+
+def load_periodic_table(path=PERIODIC_TABLE_PATH):
+    """
+    Reads a periodic table file into {symbol: properties}.
+
+    path is a .csv file with a header row or a .json list of records, with
+    the fields atomic_number, symbol, name, mass, radius and color.
+    """
+    with open(path, newline="") as f:
+        records = json.load(f) if os.path.splitext(path)[1].lower() == ".json" else list(csv.DictReader(f))
+    table = {}
+    for record in records:
+        radius = record.get("radius")
+        table[record["symbol"]] = {
+            "name": record["name"],
+            "color": record["color"],
+            "radius": DEFAULT_RADIUS if radius in (None, "") else float(radius),
+            "mass": float(record["mass"]),
+            "atomic_number": int(record["atomic_number"]),
+        }
+    return table
+
+
+def periodic_table():
+    """The bundled periodic table, read on first access."""
+    global _PERIODIC_TABLE
+    if _PERIODIC_TABLE is None:
+        _PERIODIC_TABLE = load_periodic_table()
+    return _PERIODIC_TABLE
+
+
+def is_element(symbol):
+    return symbol in ELEMENT_DATA or symbol in periodic_table()
+
+
+def element_data(symbol):
+    """Properties of symbol (ELEMENT_DATA's, plus atomic_number), filled in from the periodic table."""
+    if not is_element(symbol):
+        raise ValueError(f"Unknown element: {symbol}")
+    return {**periodic_table().get(symbol, {}), **ELEMENT_DATA.get(symbol, {})}
+
+
+class ElementTable:
+    """
+    Properties of the elements in symbols as NumPy columns; row k belongs
+    to symbols[k], so table.radii[species] gives every atom's radius.
+    """
+
+    def __init__(self, symbols):
+        self.symbols = list(symbols)
+        records = [element_data(symbol) for symbol in self.symbols]
+        self.names = np.array([record["name"] for record in records], dtype=str)
+        self.atomic_numbers = np.array([record["atomic_number"] for record in records], dtype=np.int16)
+        self.masses = np.array([record["mass"] for record in records], dtype=float)
+        self.radii = np.array([record["radius"] for record in records], dtype=float)
+        self.color_names = [record["color"] for record in records]
+        self._colors = None
+
+    def __len__(self):
+        return len(self.symbols)
+
+    @property
+    def colors(self):
+        """(S, 4) RGBA colors, converted from the Matplotlib color names on first use."""
+        if self._colors is None:
+            from matplotlib.colors import to_rgba_array  # only needed for drawing
+            self._colors = to_rgba_array(self.color_names) if self.color_names else np.zeros((0, 4))
+        return self._colors
+
+    def column(self, name):
+        """The column of a property: "name", "atomic_number", "mass", "radius" or "color" (RGBA)."""
+        columns = {
+            "name": "names", "atomic_number": "atomic_numbers", "mass": "masses",
+            "radius": "radii", "color": "colors",
+        }
+        if name not in columns:
+            raise ValueError(f"Unknown element property: {name} (expected one of {', '.join(columns)})")
+        return getattr(self, columns[name])
+
+    def take(self, name, species):
+        """Property name of every atom, from its species code."""
+        return self.column(name)[species]
+
+
+def element_table(symbols):
+    """Shared ElementTable for symbols, compiled once per distinct symbol list."""
+    key = tuple(symbols)
+    if key not in _TABLES:
+        _TABLES[key] = ElementTable(key)
+    return _TABLES[key]
@@ -0,0 +1,185 @@
+"""
+Streaming exporters for Auraeon Crystal Lattice Simulator.
+
+Writes crystals as XYZ, extended XYZ, LAMMPS data, .npy or .npz files. The
+source is either a built Crystal or a CrystalParams; with CrystalParams the
+lattice is generated a bounded number of unit cells at a time and written
+straight to disk, so memory use does not grow with nx * ny * nz.
+
+Text formats are built one chunk at a time and written in bulk through a
+large file buffer.
+"""
+
+import os
+import zipfile
+
+import numpy as np
+
+from crystal import (
+    Crystal, crystal_dim, iter_lattice_stream, num_lattice_sites, orientation_matrix,
+    site_symbols, supercell_matrix
+)
+from elements import element_data
+
+# Sites per chunk when reading a built Crystal, unit cells per chunk when streaming params
+CHUNK_SITES = 1 << 16
+CHUNK_CELLS = 1 << 13
+
+_WRITE_BUFFER = 1 << 22
+
+
+class _Source:
+    """Atom count, symbols, box and a chunk iterator for a Crystal or CrystalParams."""
+
+    def __init__(self, source):
+        if isinstance(source, Crystal):
+            self.crystal = source
+            self.params = source.params
+            self.symbols = list(source.symbols)
+            self.num_atoms = source.num_atoms
+        else:
+            self.crystal = None
+            self.params = source
+            self.symbols = site_symbols(source)[0]
+            self.num_atoms = num_lattice_sites(source)
+        self.dim = crystal_dim(self.params)
+        self.box = supercell_matrix(self.params)
+
+    def chunks(self):
+        """Yields (positions, species codes) of the atoms, in order."""
+        if self.crystal is None:
+            yield from iter_lattice_stream(self.params, CHUNK_CELLS)
+            return
+        yield from self.crystal.iter_atom_chunks(CHUNK_SITES)
+
+
+def xyz_lines(positions, species, symbols):
+    """Formats one chunk of atoms as 'symbol x y z' lines."""
+    names = np.asarray(symbols)[species]
+    return "".join(
+        f"{name} {x:.8f} {y:.8f} {z:.8f}\n"
+        for name, (x, y, z) in zip(names.tolist(), positions.tolist())
+    )
+
+
+def _write_xyz(path, source, header):
+    with open(path, "w", buffering=_WRITE_BUFFER) as f:
+        f.write(f"{source.num_atoms}\n{header}\n")
+        for positions, species in source.chunks():
+            f.write(xyz_lines(positions, species, source.symbols))
+
+
+def write_xyz(path, source, comment=None):
+    """Writes a plain XYZ file."""
+    source = _Source(source)
+    if comment is None:
+        comment = f"Auraeon {source.params.lattice_type} crystal"
+    _write_xyz(path, source, comment.replace("\n", " "))
+
+
+def write_extxyz(path, source, comment=None):
+    """Writes an extended XYZ file that carries the supercell as its Lattice."""
+    source = _Source(source)
+    lattice = " ".join(f"{v:.8f}" for v in source.box.ravel())
+    pbc = "T T F" if source.dim == 2 else "T T T"
+    header = f'Lattice="{lattice}" Properties=species:S:1:pos:R:3 pbc="{pbc}"'
+    if comment:
+        header += f' comment="{comment}"'
+    _write_xyz(path, source, header)
+
+
+def write_lammps_data(path, source, comment=None):
+    """
+    Writes a LAMMPS data file (atom_style atomic) with a triclinic box.
+
+    LAMMPS boxes need a along x and b in the xy plane, so rotated crystals
+    are rejected.
+    """
+    source = _Source(source)
+    if orientation_matrix(source.params) is not None:
+        raise ValueError("LAMMPS data files need an unrotated crystal")
+
+    box = source.box
+    with open(path, "w", buffering=_WRITE_BUFFER) as f:
+        f.write(f"# {comment or 'Auraeon ' + source.params.lattice_type + ' crystal'}\n\n")
+        f.write(f"{source.num_atoms} atoms\n{len(source.symbols)} atom types\n\n")
+        f.write(f"0.0 {box[0, 0]:.8f} xlo xhi\n")
+        f.write(f"0.0 {box[1, 1]:.8f} ylo yhi\n")
+        f.write(f"0.0 {box[2, 2]:.8f} zlo zhi\n")
+        if np.any(np.abs([box[1, 0], box[2, 0], box[2, 1]]) > 1e-12):
+            f.write(f"{box[1, 0]:.8f} {box[2, 0]:.8f} {box[2, 1]:.8f} xy xz yz\n")
+
+        f.write("\nMasses\n\n")
+        for code, symbol in enumerate(source.symbols, start=1):
+            f.write(f"{code} {element_data(symbol)['mass']}  # {symbol}\n")
+
+        f.write("\nAtoms  # atomic\n\n")
+        next_id = 1
+        for positions, species in source.chunks():
+            ids = range(next_id, next_id + len(positions))
+            f.write("".join(
+                f"{i} {t} {x:.8f} {y:.8f} {z:.8f}\n"
+                for i, t, (x, y, z) in zip(ids, (species.astype(np.int64) + 1).tolist(), positions.tolist())
+            ))
+            next_id += len(positions)
+
+
+def _npy_header(dtype, shape):
+    """Header for an .npy stream whose data follows in C order."""
+    return {"descr": np.lib.format.dtype_to_descr(np.dtype(dtype)), "fortran_order": False, "shape": shape}
+
+
+def write_npy(path, source):
+    """Writes the (N, 3) positions as a .npy file, chunk by chunk."""
+    source = _Source(source)
+    with open(path, "wb", buffering=_WRITE_BUFFER) as f:
+        np.lib.format.write_array_header_2_0(f, _npy_header(np.float64, (source.num_atoms, 3)))
+        for positions, _ in source.chunks():
+            f.write(np.ascontiguousarray(positions, dtype=np.float64).tobytes())
+
+
+def write_npz(path, source):
+    """
+    Writes positions, species codes, symbols and the supercell as a .npz file.
+
+    Each array is streamed into its own archive member, so the full
+    positions array never has to exist in memory. Bonds of a built Crystal
+    are included when present.
+    """
+    source = _Source(source)
+    n = source.num_atoms
+    with zipfile.ZipFile(path, "w", compression=zipfile.ZIP_STORED, allowZip64=True) as archive:
+        with archive.open("positions.npy", "w", force_zip64=True) as f:
+            np.lib.format.write_array_header_2_0(f, _npy_header(np.float64, (n, 3)))
+            for positions, _ in source.chunks():
+                f.write(np.ascontiguousarray(positions, dtype=np.float64).tobytes())
+
+        with archive.open("species.npy", "w", force_zip64=True) as f:
+            np.lib.format.write_array_header_2_0(f, _npy_header(np.uint16, (n,)))
+            for _, species in source.chunks():
+                f.write(np.asarray(species, dtype=np.uint16).tobytes())
+
+        small = {"symbols": np.array(source.symbols), "cell": source.box}
+        if source.crystal is not None and source.crystal.bonds is not None:
+            small["bonds"] = source.crystal.bonds
+        for name, array in small.items():
+            with archive.open(f"{name}.npy", "w") as f:
+                np.lib.format.write_array(f, array, allow_pickle=False)
+
+
+WRITERS = {
+    ".xyz": write_xyz,
+    ".extxyz": write_extxyz,
+    ".data": write_lammps_data,
+    ".lmp": write_lammps_data,
+    ".npy": write_npy,
+    ".npz": write_npz,
+}
+
+
+def export_crystal(path, source):
+    """Writes source to path, picking the format from the file extension."""
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in WRITERS:
+        raise ValueError(f"Unsupported export format: {extension or path} (use {', '.join(WRITERS)})")
+    WRITERS[extension](path, source)
@@ -0,0 +1,41 @@
+"""
+On-screen performance overlay for Auraeon Crystal Lattice Simulator.
+
+PerformanceHUD is a profiling sink (see profiling.py) that shows the stage
+breakdown of the last finished frame in a small label over the plot,
+with the mean frame time of the recent frames beneath it. It touches Tk
+widgets, so frames must be finished on the Tk main thread, as main.py does.
+"""
+
+import tkinter as tk
+
+from profiling import RingBuffer
+
+
+class PerformanceHUD:
+    """Last-frame timing overlay, placed in the top-left corner of a widget."""
+
+    def __init__(self, widget, history=64):
+        self.widget = widget
+        self.history = RingBuffer(history)
+        self.visible = False
+        self.label = tk.Label(
+            widget, justify=tk.LEFT, anchor="nw", font="TkFixedFont",
+            bg="black", fg="lime", padx=6, pady=4, text="Waiting for a frame..."
+        )
+
+    def show(self):
+        self.label.place(x=8, y=8, anchor="nw")
+        self.label.lift()
+        self.visible = True
+
+    def hide(self):
+        self.label.place_forget()
+        self.visible = False
+
+    def __call__(self, frame):
+        self.history(frame)
+        mean = sum(f.seconds for f in self.history.frames) / len(self.history)
+        self.label.config(
+            text=f"{frame.label} #{frame.id}\n{frame.summary()}\nmean of last {len(self.history)}: {mean * 1000:.1f} ms"
+        )
@@ -1,78 +1,190 @@
+"""
+Bravais lattice engine for Auraeon Crystal Lattice Simulator.
+
+Every lattice type is data: a fractional-coordinate basis placed in a unit
+cell built from (a, b, c, alpha, beta, gamma). tile_lattice() repeats that
+basis over nx * ny * nz cells with one broadcasted operation, writing
+straight into an (N, 3) array, optionally a bounded number of cells at a
+time.
+
+Each entry of LATTICE_DEFS specifies:
+- name: Display name
+- dim: 2 or 3
+- basis: Fractional coordinates of the atoms in one unit cell
+- sites: For each basis atom, which element it holds (0 = element 1,
+  1 = element 2, 2 = element 3)
+- gamma (optional): Cell angle fixed by the lattice type, overriding the
+  angle given by the user (e.g. 120 degrees for hexagonal lattices)
+"""
+
 import numpy as np
 
-def generate_2d_simple_cubic(nx, ny, a, b):
-    """Generates coordinates for a 2D simple cubic lattice."""
-    x = np.arange(nx) * a
-    y = np.arange(ny) * b
-    x_coords, y_coords = np.meshgrid(x, y)
-    return x_coords, y_coords
-
-def generate_2d_triangular(nx, ny, a, b):
-    """Generates coordinates for a 2D triangular lattice."""
-    x = np.arange(nx) * a
-    y = np.arange(ny) * b
-    x_coords, y_coords = np.meshgrid(x, y)
-    # Offset every other row for triangular lattice
-    x_coords[::2, :] += a / 2.0
-    return x_coords, y_coords
-
-def generate_2d_hexagonal(nx, ny, a, b):
-    """Generates coordinates for a 2D hexagonal lattice."""
-    x = np.arange(nx) * a
-    y = np.arange(ny) * b * np.sqrt(3) / 2
-    x_coords, y_coords = np.meshgrid(x, y)
-    # Offset every other row for hexagonal lattice
-    x_coords[::2, :] += a / 2.0
-    return x_coords, y_coords
-
-def generate_3d_simple_cubic(nx, ny, nz, a, b, c):
-    """Generates coordinates for a 3D simple cubic lattice."""
-    x = np.arange(nx) * a
-    y = np.arange(ny) * b
-    z = np.arange(nz) * c
-    x_coords, y_coords, z_coords = np.meshgrid(x, y, z)
-    return x_coords, y_coords, z_coords
-
-def generate_bcc(nx, ny, nz, a, b, c):
-    """Generates coordinates for a 3D body-centered cubic lattice."""
-    x = np.arange(nx) * a
-    y = np.arange(ny) * b
-    z = np.arange(nz) * c
-    x_coords, y_coords, z_coords = np.meshgrid(x, y, z)
-
-    # Add atom in the center of each cell
-    x_center = x_coords + a / 2
-    y_center = y_coords + b / 2
-    z_center = z_coords + c / 2
-
-    return (x_coords, y_coords, z_coords), (x_center, y_center, z_center)
-
-def generate_fcc(nx, ny, nz, a, b, c):
-    """Generates coordinates for a 3D face-centered cubic lattice."""
-    x = np.arange(nx) * a
-    y = np.arange(ny) * b
-    z = np.arange(nz) * c
-    x_coords, y_coords, z_coords = np.meshgrid(x, y, z)
-
-    # Add atoms on the faces of each cell
-    x_face1 = x_coords + a / 2
-    y_face1 = y_coords + b / 2
-    z_face1 = z_coords
-
-    x_face2 = x_coords + a / 2
-    y_face2 = y_coords
-    z_face2 = z_coords + c / 2
-
-    x_face3 = x_coords
-    y_face3 = y_coords + b / 2
-    z_face3 = z_coords + c / 2
-
-    return (x_coords, y_coords, z_coords), (x_face1, y_face1, z_face1), (x_face2, y_face2, z_face2), (x_face3, y_face3, z_face3)
-
-def generate_3d_hexagonal(nx, ny, nz, a, b, c):
-    """Generates coordinates for a 3D hexagonal lattice."""
-    x = np.arange(nx) * a
-    y = np.arange(ny) * b
-    z = np.arange(nz) * c
-    x_coords, y_coords, z_coords = np.meshgrid(x, y, z)
-    return x_coords, y_coords, z_coords
+_FCC_BASIS = [(0.0, 0.0, 0.0), (0.5, 0.5, 0.0), (0.5, 0.0, 0.5), (0.0, 0.5, 0.5)]
+
+LATTICE_DEFS = {
+    "2d_sc": {
+        "name": "2D Square",
+        "dim": 2,
+        "basis": [(0.0, 0.0, 0.0)],
+        "sites": [0],
+    },
+    "2d_tri": {
+        "name": "2D Triangular",
+        "dim": 2,
+        "basis": [(0.0, 0.0, 0.0)],
+        "sites": [0],
+        "gamma": 60.0,
+    },
+    "2d_hex": {
+        "name": "2D Hexagonal (Honeycomb)",
+        "dim": 2,
+        "basis": [(1.0 / 3.0, 2.0 / 3.0, 0.0), (2.0 / 3.0, 1.0 / 3.0, 0.0)],
+        "sites": [0, 0],
+        "gamma": 120.0,
+    },
+    "3d_sc": {
+        "name": "Simple Cubic",
+        "dim": 3,
+        "basis": [(0.0, 0.0, 0.0)],
+        "sites": [0],
+    },
+    "3d_bcc": {
+        "name": "Body-Centered Cubic",
+        "dim": 3,
+        "basis": [(0.0, 0.0, 0.0), (0.5, 0.5, 0.5)],
+        "sites": [0, 1],  # corners hold element 1, the center element 2
+    },
+    "3d_fcc": {
+        "name": "Face-Centered Cubic",
+        "dim": 3,
+        "basis": _FCC_BASIS,
+        "sites": [0, 1, 1, 1],  # corners hold element 1, the faces element 2
+    },
+    "3d_hex": {
+        "name": "Simple Hexagonal",
+        "dim": 3,
+        "basis": [(0.0, 0.0, 0.0)],
+        "sites": [0],
+        "gamma": 120.0,
+    },
+    "3d_hcp": {
+        "name": "Hexagonal Close-Packed",
+        "dim": 3,
+        "basis": [(0.0, 0.0, 0.0), (2.0 / 3.0, 1.0 / 3.0, 0.5)],
+        "sites": [0, 0],
+        "gamma": 120.0,
+    },
+    "3d_diamond": {
+        "name": "Diamond / Zincblende",
+        "dim": 3,
+        "basis": _FCC_BASIS + [(x + 0.25, y + 0.25, z + 0.25) for x, y, z in _FCC_BASIS],
+        "sites": [0, 0, 0, 0, 1, 1, 1, 1],
+    },
+    "3d_nacl": {
+        "name": "Rock Salt (NaCl)",
+        "dim": 3,
+        "basis": _FCC_BASIS + [(0.5, 0.0, 0.0), (0.0, 0.5, 0.0), (0.0, 0.0, 0.5), (0.5, 0.5, 0.5)],
+        "sites": [0, 0, 0, 0, 1, 1, 1, 1],
+    },
+    "3d_perovskite": {
+        "name": "Cubic Perovskite (ABO3)",
+        "dim": 3,
+        "basis": [(0.0, 0.0, 0.0), (0.5, 0.5, 0.5), (0.5, 0.5, 0.0), (0.5, 0.0, 0.5), (0.0, 0.5, 0.5)],
+        "sites": [0, 1, 2, 2, 2],  # A site, B site, then three oxygen sites
+    },
+}
+
+
+def cell_matrix(a, b, c, alpha, beta, gamma):
+    """
+    Builds the 3x3 cell matrix (rows are the lattice vectors) from the cell
+    lengths and the angles in degrees: alpha between b and c, beta between
+    a and c, gamma between a and b. Vector a lies on x and b in the xy plane.
+    """
+    alpha, beta, gamma = np.radians([alpha, beta, gamma])
+    cosines = np.cos([alpha, beta, gamma])
+    # cos(90 degrees) is 6e-17 in floating point; keep right-angled cells exactly orthogonal
+    cos_a, cos_b, cos_g = np.where(np.abs(cosines) < 1e-12, 0.0, cosines)
+    sin_g = np.sin(gamma)
+    if sin_g < 1e-8:
+        raise ValueError("Cell angle gamma must be strictly between 0 and 180 degrees")
+
+    c_y = (cos_a - cos_b * cos_g) / sin_g
+    c_z_sq = 1.0 - cos_b ** 2 - c_y ** 2
+    if c_z_sq <= 1e-12:
+        raise ValueError("Cell angles alpha, beta and gamma do not form a valid cell")
+
+    return np.array([
+        [a, 0.0, 0.0],
+        [b * cos_g, b * sin_g, 0.0],
+        [c * cos_b, c * c_y, c * np.sqrt(c_z_sq)],
+    ])
+
+
+def lattice_cell(lattice_type, a, b, c, alpha, beta, gamma):
+    """Cell matrix for a lattice type, applying any angle the type fixes."""
+    definition = LATTICE_DEFS[lattice_type]
+    gamma = definition.get("gamma", gamma)
+    if definition["dim"] == 2:
+        alpha = beta = 90.0  # 2D cells only use gamma
+    return cell_matrix(a, b, c, alpha, beta, gamma)
+
+
+def iter_lattice_chunks(cell, basis, nx, ny, nz, chunk_cells=None):
+    """
+    Yields (first_site, positions) chunks covering nx * ny * nz unit cells.
+
+    Sites are ordered cell by cell, with the basis atoms of a cell next to
+    each other, so site s belongs to cell s // len(basis). Each chunk holds
+    at most chunk_cells cells (all of them if chunk_cells is None).
+    """
+    basis = np.asarray(basis, dtype=float)
+    num_cells = nx * ny * nz
+    chunk_cells = num_cells if chunk_cells is None else max(1, int(chunk_cells))
+
+    for start in range(0, num_cells, chunk_cells):
+        cell_ids = np.arange(start, min(start + chunk_cells, num_cells))
+        # Integer cell coordinates (i, j, k) of every cell in the chunk
+        grid = np.column_stack(np.unravel_index(cell_ids, (nx, ny, nz))).astype(float)
+        # Fractional coordinates of every atom, then one product with the cell
+        fractional = grid[:, None, :] + basis[None, :, :]
+        yield start * len(basis), (fractional.reshape(-1, 3) @ cell)
+
+
+def tile_lattice(cell, basis, nx, ny, nz, chunk_cells=None, out=None):
+    """
+    Returns the (N, 3) positions of basis repeated over nx * ny * nz cells.
+
+    With chunk_cells the work is done a bounded number of cells at a time,
+    written into out (allocated if not given), so temporary memory stays
+    proportional to the chunk rather than the whole crystal.
+    """
+    num_sites = nx * ny * nz * len(basis)
+    if out is None:
+        out = np.empty((num_sites, 3))
+    for first, positions in iter_lattice_chunks(cell, basis, nx, ny, nz, chunk_cells):
+        out[first:first + len(positions)] = positions
+    return out
+
+
+def lattice_sites(lattice_type, nx, ny, nz):
+    """Element slot (0, 1, 2) of every site produced by tile_lattice."""
+    sites = np.asarray(LATTICE_DEFS[lattice_type]["sites"], dtype=np.uint8)
+    return np.tile(sites, nx * ny * nz)
+
+
+def generate_lattice(lattice_type, nx, ny, nz, a, b, c, alpha=90.0, beta=90.0, gamma=90.0, chunk_cells=None):
+    """
+    Generates any lattice type in LATTICE_DEFS.
+
+    Returns (positions, sites): an (N, 3) coordinate array and the element
+    slot of each site. 2D lattices ignore nz and c and have z = 0.
+    """
+    if lattice_type not in LATTICE_DEFS:
+        raise ValueError(f"Unsupported lattice type: {lattice_type}")
+    definition = LATTICE_DEFS[lattice_type]
+    if definition["dim"] == 2:
+        nz = 1
+    cell = lattice_cell(lattice_type, a, b, c, alpha, beta, gamma)
+    positions = tile_lattice(cell, definition["basis"], nx, ny, nz, chunk_cells)
+    return positions, lattice_sites(lattice_type, nx, ny, nz)
@@ -0,0 +1,230 @@
+"""
+Level-of-detail rendering for Auraeon Crystal Lattice Simulator.
+
+Large crystals are drawn at one of several detail levels, from every atom
+down to a thinned-out shell of surface atoms. Bonds are left out of any
+level that would draw more than max_bonds of them. LODRenderer keeps a
+simple cost model (seconds per atom and per bond, corrected after every
+measured draw) and picks the finest level that fits a frame-time budget:
+a tight budget right after a change or while the view is being dragged,
+then, once the user is idle, it refines to the finest level that fits a
+much larger budget.
+"""
+
+import time
+
+import numpy as np
+
+from crystal import num_lattice_sites, supercell_matrix
+from lattice import LATTICE_DEFS
+from profiling import PROFILER
+
+# (name, interior stride, surface stride), finest first. A stride of k keeps
+# every k-th atom of that group; 0 drops the group.
+LOD_LEVELS = (
+    ("full", 1, 1),
+    ("decimated", 4, 1),
+    ("surface", 0, 1),
+    ("sparse", 0, 4),
+)
+
+
+def surface_mask(crystal):
+    """True for occupied atoms in the outermost unit cells of the supercell."""
+    params = crystal.params
+    nz = 1 if crystal.dim == 2 else params.nz
+    shape = (params.nx, params.ny, nz)
+    sites = crystal.atom_indices()
+    num_lattice = num_lattice_sites(params)
+    lattice = sites < num_lattice
+    i, j, k = (np.empty(len(sites), dtype=np.int64) for _ in range(3))
+    i[lattice], j[lattice], k[lattice] = np.unravel_index(
+        sites[lattice] // len(LATTICE_DEFS[params.lattice_type]["basis"]), shape
+    )
+    if not lattice.all():
+        # Sites added after the lattice (interstitials) are placed by their fractional coordinates
+        fractional = crystal.positions[sites[~lattice]] @ np.linalg.inv(supercell_matrix(params))
+        cells = np.clip(np.floor(fractional * shape).astype(np.int64), 0, np.array(shape) - 1)
+        i[~lattice], j[~lattice], k[~lattice] = cells.T
+    mask = (i == 0) | (i == params.nx - 1) | (j == 0) | (j == params.ny - 1)
+    if crystal.dim == 3:
+        mask |= (k == 0) | (k == nz - 1)
+    return mask
+
+
+def level_view(crystal, level, surface=None, max_bonds=None):
+    """
+    Atoms and bonds drawn at one entry of LOD_LEVELS.
+
+    Returns (shown, bonds): the indices of the drawn atoms (into the
+    occupied atoms) and the bonds between them, renumbered to index into
+    shown. bonds is None when the crystal has none or there are more
+    than max_bonds. Periodic bonds that wrap around the box are not drawn.
+    """
+    _, interior_stride, surface_stride = LOD_LEVELS[level]
+    num_atoms = crystal.num_atoms
+    if interior_stride == 1 and surface_stride == 1:
+        shown = np.arange(num_atoms)
+    else:
+        if surface is None:
+            surface = surface_mask(crystal)
+        parts = []
+        if surface_stride:
+            parts.append(np.flatnonzero(surface)[::surface_stride])
+        if interior_stride:
+            parts.append(np.flatnonzero(~surface)[::interior_stride])
+        shown = np.sort(np.concatenate(parts)) if parts else np.empty(0, dtype=np.intp)
+
+    bonds = crystal.bonds
+    if bonds is None:
+        return shown, None
+    if crystal.params.periodic:
+        # Bonds that wrap around the box would be drawn straight across the crystal
+        positions = crystal.atom_positions()
+        offsets = positions[bonds[:, 0]] - positions[bonds[:, 1]]
+        bonds = bonds[np.einsum("ij,ij->i", offsets, offsets) <= crystal.params.bond_threshold ** 2 * (1 + 1e-9)]
+    if len(shown) < num_atoms:
+        # Keep bonds with both atoms shown, numbered by position in shown
+        position = np.full(num_atoms, -1, dtype=np.int64)
+        position[shown] = np.arange(len(shown))
+        bonds = position[bonds]
+        bonds = bonds[(bonds >= 0).all(axis=1)]
+    if max_bonds is not None and len(bonds) > max_bonds:
+        return shown, None
+    return shown, bonds
+
+
+class LODRenderer:
+    """Draws crystals into a LatticeScene at the detail level the frame budget allows."""
+
+    def __init__(self, root, scene, canvas, frame_budget=0.1, idle_budget=1.5, max_bonds=50_000,
+                 idle_ms=400, on_draw=None):
+        """
+        root: the Tk root used for timers (root.after).
+        frame_budget: seconds a draw may take right after a change or while dragging.
+        idle_budget: seconds a draw may take once the view has been idle for idle_ms.
+        on_draw(shown): called after every draw with the indices of the drawn atoms.
+        """
+        self.root = root
+        self.scene = scene
+        self.canvas = canvas
+        self.frame_budget = frame_budget
+        self.idle_budget = idle_budget
+        self.max_bonds = max_bonds
+        self.idle_ms = idle_ms
+        self.on_draw = on_draw
+        self.level = None
+        self.shown = None
+        # Seconds per drawn atom and per drawn bond, refined after every draw
+        self.cost_per_atom = 2e-5
+        self.cost_per_bond = 1e-5
+        self._job = None
+        self._views = {}
+        self._surface = None
+        self._refine_id = None
+
+    def connect(self):
+        """Drops to a coarse level while the view is dragged, refining again when idle."""
+        self.canvas.mpl_connect("motion_notify_event", self._on_drag)
+
+    def show(self, crystal, coords, colors, sizes, **draw_kwargs):
+        """
+        Draws crystal within the frame budget and schedules refinement.
+
+        coords, colors and sizes describe every occupied atom; draw_kwargs
+        are passed on to LatticeScene.draw (title, elements, element_colors).
+        """
+        if self._job is None or self._job[0] is not crystal:
+            self._views = {}
+            self._surface = None
+        self._job = (crystal, coords, colors, sizes, draw_kwargs)
+        self._render(self.choose_level(self.frame_budget))
+        self._schedule_refine()
+
+    def view(self, level):
+        """(shown, bonds) of the current crystal at level, computed once per crystal."""
+        if level not in self._views:
+            crystal = self._job[0]
+            if self._surface is None and LOD_LEVELS[level][1:] != (1, 1):
+                self._surface = surface_mask(crystal)
+            self._views[level] = level_view(crystal, level, self._surface, self.max_bonds)
+        return self._views[level]
+
+    def estimate(self, level):
+        """Predicted seconds to draw level."""
+        shown, bonds = self.view(level)
+        num_bonds = 0 if bonds is None else len(bonds)
+        return self.cost_per_atom * len(shown) + self.cost_per_bond * num_bonds
+
+    def choose_level(self, budget):
+        """Finest level predicted to draw within budget seconds (the coarsest if none does)."""
+        for level in range(len(LOD_LEVELS)):
+            if self.estimate(level) <= budget:
+                return level
+        return len(LOD_LEVELS) - 1
+
+    def _render(self, level):
+        """Draws the current crystal at level and updates the cost model from the timing."""
+        _, coords, colors, sizes, draw_kwargs = self._job
+        shown, bonds = self.view(level)
+        colors = np.asarray(colors)
+        if colors.ndim and len(colors) == len(coords):
+            colors = colors[shown]
+        sizes = np.asarray(sizes)
+        if sizes.ndim and len(sizes) == len(coords):
+            sizes = sizes[shown]
+
+        predicted = self.estimate(level)
+        start = time.perf_counter()
+        with PROFILER.stage("scene") as record:
+            self.scene.draw(coords[shown], colors, sizes, bonds, **draw_kwargs)
+            record.update(atoms=len(shown), bonds=None if bonds is None else len(bonds))
+        with PROFILER.stage("canvas"):
+            self.canvas.draw()
+        elapsed = time.perf_counter() - start
+
+        # Scale both cost terms halfway towards what this draw actually took
+        if predicted > 0 and elapsed > 0:
+            correction = np.sqrt(elapsed / predicted)
+            self.cost_per_atom *= correction
+            self.cost_per_bond *= correction
+
+        self.level = level
+        self.shown = shown
+        if self.on_draw is not None:
+            self.on_draw(shown)
+
+    def _schedule_refine(self):
+        if self._refine_id is not None:
+            self.root.after_cancel(self._refine_id)
+        self._refine_id = self.root.after(self.idle_ms, self._refine)
+
+    def _refine(self):
+        """Redraws at the finest level the idle budget allows, if finer than what is shown."""
+        self._refine_id = None
+        if self._job is None:
+            return
+        level = self.choose_level(self.idle_budget)
+        if level < self.level:
+            self._profiled_render(level, "refine")
+
+    def _on_drag(self, event):
+        if event.button is None or event.inaxes is not self.scene.ax or self._job is None:
+            return
+        level = self.choose_level(self.frame_budget)
+        if level > self.level:
+            self._profiled_render(level, "drag")
+        self._schedule_refine()
+
+    def _profiled_render(self, level, label):
+        """_render as a profiling frame of its own (redraws that no refresh asked for)."""
+        frame = PROFILER.begin(label)
+        with PROFILER.activate(frame):
+            self._render(level)
+        PROFILER.finish(frame)
+
+    def cancel(self):
+        """Stops a pending refinement."""
+        if self._refine_id is not None:
+            self.root.after_cancel(self._refine_id)
+            self._refine_id = None
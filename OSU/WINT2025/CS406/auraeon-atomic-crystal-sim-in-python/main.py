@@ -1,16 +1,22 @@
+import time
+STARTED = time.perf_counter()  # startup is timed from here, imports included
+import sys
 import tkinter as tk
 from tkinter import ttk, colorchooser
 import numpy as np
 from elements import ELEMENT_DATA
-from lattice import (
-    generate_2d_simple_cubic, generate_2d_triangular, generate_2d_hexagonal,
-    generate_3d_simple_cubic, generate_bcc, generate_fcc, generate_3d_hexagonal
-)
-from visualization import plot_2d_lattice, plot_3d_lattice
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+from crystal import CrystalParams, build_crystal
+from lattice import LATTICE_DEFS
+from scheduler import RefreshScheduler
+from neighbors import coordination_numbers
+from startup import PlottingLoader, StartupTimer
+from profiling import PROFILER
+from hud import PerformanceHUD
+# matplotlib and the modules drawing with it are imported in the background (see startup.py)
 
 def main():
+    timer = StartupTimer(STARTED)
+    timer.mark("imports")
     root = tk.Tk()
     root.title("Auraeon - Crystal Lattice Simulator v0.3.8")
     root.geometry("1200x900")
@@ -43,37 +49,75 @@ def main():
     # ==================== DEFECTS & DOPING ====================
     vacancy_percentage = tk.DoubleVar(value=0.0)
     doping_percentage = tk.DoubleVar(value=0.0)
+    interstitial_percentage = tk.DoubleVar(value=0.0)
+    cluster_radius = tk.DoubleVar(value=0.0)
+    defect_seed = tk.IntVar(value=0)  # same seed, same defects on every redraw
 
     # ==================== BOND LENGTH THRESHOLD ====================
     bond_length_threshold = tk.DoubleVar(value=2.0)
-
-   # ==================== SELECTED ATOM FOR HIGHLIGHTING ====================
-    selected_atom_index = tk.IntVar(value=-1)  # Initially no atom is selected
-    highlight_artist = None # stores the highlight object
-    x_coords_global = None
-    y_coords_global = None
-    z_coords_global = None
-
-    # ==================== INITIALIZE MATPLOTLIB FIGURE AND AXES ====================
-    fig, ax = plt.subplots(figsize=(8, 6), subplot_kw={'projection': '3d'})
-    canvas = FigureCanvasTkAgg(fig, master=root)
-    canvas_widget = canvas.get_tk_widget()
+    periodic_bonds = tk.BooleanVar(value=False)
+
+    # ==================== PERFORMANCE HUD ====================
+    show_hud = tk.BooleanVar(value="--profile" in sys.argv) # per-stage timings over the plot
+
+   # ==================== LAST BUILT CRYSTAL ====================
+    last_crystal = {"crystal": None} # reused when only colors change
+
+    # ==================== VIEWER (CREATED ONCE MATPLOTLIB IS IMPORTED) ====================
+    viewer = {} # figure, canvas and drawing helpers, see create_viewer
+    pending = {} # a crystal built before the viewer existed
+    placeholder = ttk.Label(root, text="Loading viewer...", anchor="center")
+
+    def create_viewer(modules):
+        """Builds the figure and its helpers on the Tk main thread, then draws any crystal already built."""
+        timer.mark("plotting imported")
+        fig, ax = modules["plt"].subplots(figsize=(8, 6), subplot_kw={'projection': '3d'})
+        canvas = modules["FigureCanvasTkAgg"](fig, master=root)
+        scene = modules["LatticeScene"](ax) # keeps the drawn artists for in-place updates
+        picker = modules["AtomPicker"](ax) # maps clicks to atoms
+        picker.connect(canvas)
+        selection = modules["SelectionOverlay"](ax, picker) # selected atoms, drawn without replotting
+        selection.connect(canvas)
+
+        def on_draw(shown):
+            picker.set_atoms(scene.coords, shown)
+            if "first frame" not in timer.marks:
+                timer.mark("first frame")
+                if "--startup-report" in sys.argv:
+                    print(timer.report())
+
+        # Draws large crystals at reduced detail first, full detail when idle
+        renderer = modules["LODRenderer"](root, scene, canvas, on_draw=on_draw)
+        renderer.connect()
+        hud = PerformanceHUD(canvas.get_tk_widget())
+        PROFILER.add_sink(hud)
+        viewer.update(fig=fig, picker=picker, selection=selection, renderer=renderer, to_rgba=modules["to_rgba"], hud=hud)
+        toggle_hud()
+
+        placeholder.destroy()
+        canvas.get_tk_widget().grid(row=0, column=1, sticky="nsew")
+        if "result" in pending:
+            draw_lattice(*pending.pop("result"))
 
     # ==================== UI ELEMENTS ====================
     frame = ttk.Frame(root, padding="10 10 10 10")
 
     # --------- Layout using grid ---------
     frame.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
-    canvas_widget.grid(row=0, column=1, sticky=(tk.W, tk.E, tk.N, tk.S))
+    placeholder.grid(row=0, column=1, sticky=(tk.W, tk.E, tk.N, tk.S))
     root.columnconfigure(1, weight=1)  # plot expands
     root.rowconfigure(0, weight=1)
 
     # ==================== HELPER: RE-PLOT WHENEVER ANYTHING CHANGES ====================
     def refresh_plot(*args):
-        """Re-call generate_and_plot() with the currently selected lattice type."""
+        """Schedules a regenerate + redraw with the current UI state.
+
+        Rapid calls (e.g. while dragging a slider) are coalesced, and the
+        lattice is built off the Tk main thread by refresh_scheduler.
+        """
         lt = current_lattice_type.get()
         if lt:
-            generate_and_plot(lt, ax)
+            refresh_scheduler.request(read_params(lt))
 
     # ==================== CHOOSE COLOR ====================
     def choose_color(color_var):
@@ -108,35 +152,6 @@ def main():
             lattice_gamma.set(120.0)
         refresh_plot()
 
-    def rotate_2d(x_array, y_array, alpha_degs):
-        alpha = np.radians(alpha_degs)
-        x_flat = x_array.ravel()
-        y_flat = y_array.ravel()
-        cos_a = np.cos(alpha)
-        sin_a = np.sin(alpha)
-        x_rot = x_flat * cos_a - y_flat * sin_a
-        y_rot = x_flat * sin_a + y_flat * cos_a
-        shape_2d = x_array.shape
-        return x_rot.reshape(shape_2d), y_rot.reshape(shape_2d)
-
-    def rotate_3d(x_array, y_array, z_array, alpha_degs, beta_degs, gamma_degs):
-        alpha = np.radians(alpha_degs)
-        beta = np.radians(beta_degs)
-        gamma = np.radians(gamma_degs)
-        x_flat = x_array.ravel()
-        y_flat = y_array.ravel()
-        z_flat = z_array.ravel()
-        coords = np.vstack((x_flat, y_flat, z_flat))
-        Rx = np.array([[1, 0, 0], [0, np.cos(alpha), -np.sin(alpha)], [0, np.sin(alpha), np.cos(alpha)]])
-        Ry = np.array([[np.cos(beta), 0, np.sin(beta)], [0, 1, 0], [-np.sin(beta), 0, np.cos(beta)]])
-        Rz = np.array([[np.cos(gamma), -np.sin(gamma), 0], [np.sin(gamma), np.cos(gamma), 0], [0, 0, 1]])
-        R = Rz @ Ry @ Rx
-        coords_rot = R @ coords
-        x_rot = coords_rot[0].reshape(x_array.shape)
-        y_rot = coords_rot[1].reshape(y_array.shape)
-        z_rot = coords_rot[2].reshape(z_array.shape)
-        return x_rot, y_rot, z_rot
-
     def reset_sliders():
         lattice_a.set(5.0)
         lattice_b.set(5.0)
@@ -150,6 +165,9 @@ def main():
         crystal_system.set("isometric")
         vacancy_percentage.set(0.0)
         doping_percentage.set(0.0)
+        interstitial_percentage.set(0.0)
+        cluster_radius.set(0.0)
+        defect_seed.set(0)
         refresh_plot()
 
     def unify_elements():
@@ -170,162 +188,98 @@ def main():
         element_color_2.set(c1)
         refresh_plot()
 
-    def on_atom_click(event):
-        """Handles atom click events to highlight nearest atom."""
-        if event.xdata is None or event.ydata is None:
-            return # click was outside the plot
-
-        x, y = event.xdata, event.ydata # coords of the click
-
-        # Find the index of the atom nearest to the click
-        min_distance = float('inf')
-        nearest_atom = -1
-
-        # Get current atom positions
-        global x_coords_global, y_coords_global, z_coords_global
-        if x_coords_global is not None and len(x_coords_global) > 0:
-            # Iterate through atoms & compute distances
-            num_atoms = len(x_coords_global)
-            for i in range(num_atoms):
-                distance = np.sqrt((x_coords_global[i] - x)**2 + (y_coords_global[i] - y)**2 + (z_coords_global[i] - 0)**2) # simple 2D distance
-                if distance < min_distance: # If closer...
-                    min_distance = distance  # Store the new minimum distance
-                    nearest_atom = i # Store the index of the closest atom
-        # Set selected atom
-        selected_atom_index.set(nearest_atom)
-        # Update plot
-        refresh_plot() # redraw with new highlighting
-
-    def generate_and_plot(lattice_type, ax):
-        """Generates & plots the lattice with the current UI state."""
-        # Set title before generating
-        title = f"{lattice_type.upper()} Lattice"
-
-        # Clear the axes before plotting new data
-        ax.clear()
-        current_lattice_type.set(lattice_type)
-        a, b, c = lattice_a.get(), lattice_b.get(), lattice_c.get()
-        alpha, beta, gamma = lattice_alpha.get(), lattice_beta.get(), lattice_gamma.get()
-        nx, ny, nz = unit_cells_x.get(), unit_cells_y.get(), unit_cells_z.get()
+    def read_params(lattice_type):
+        """Takes a snapshot of the UI state so the lattice can be built off the main thread."""
         e1 = selected_element_1.get()
         e2 = selected_element_2.get()
-        col1 = element_color_1.get() or ELEMENT_DATA[e1]["color"]
-        col2 = element_color_2.get() or ELEMENT_DATA[e2]["color"]
-        same_element = (e1 == e2)
-        rad1 = ELEMENT_DATA[e1]["radius"] * 80
-        rad2 = ELEMENT_DATA[e2]["radius"] * 80
-        bond_threshold = bond_length_threshold.get()
-        selected_atom = selected_atom_index.get()
-
-        # Get Vacancy and Doping % from sliders
-        vacancy_percent = vacancy_percentage.get()
-        doping_percent = doping_percentage.get()
-
-        lattice_funcs = {
-            "2d_sc": generate_2d_simple_cubic,
-            "2d_tri": generate_2d_triangular,
-            "2d_hex": generate_2d_hexagonal,
-            "3d_sc": generate_3d_simple_cubic,
-            "3d_bcc": generate_bcc,
-            "3d_fcc": generate_fcc,
-            "3d_hex": generate_3d_hexagonal
+        return {
+            "crystal": CrystalParams(
+                lattice_type=lattice_type,
+                a=lattice_a.get(), b=lattice_b.get(), c=lattice_c.get(),
+                alpha=lattice_alpha.get(), beta=lattice_beta.get(), gamma=lattice_gamma.get(),
+                nx=unit_cells_x.get(), ny=unit_cells_y.get(), nz=unit_cells_z.get(),
+                element_1=e1, element_2=e2,
+                vacancy_percent=vacancy_percentage.get(),
+                doping_percent=doping_percentage.get(),
+                bond_threshold=bond_length_threshold.get(),
+                periodic=periodic_bonds.get(),
+                interstitial_percent=interstitial_percentage.get(),
+                cluster_radius=cluster_radius.get(),
+                seed=defect_seed.get(),
+            ),
+            "col1": element_color_1.get() or ELEMENT_DATA[e1]["color"],
+            "col2": element_color_2.get() or ELEMENT_DATA[e2]["color"],
         }
-        elements = [e1, e2] # define element list
-        highlight_artist = None  # Initialize highlight_artist
-
-        if lattice_type in ["2d_sc", "2d_tri", "2d_hex"]:
-            x_total, y_total = lattice_funcs[lattice_type](nx, ny, a, b)
-            x_total, y_total = rotate_2d(x_total, y_total, alpha)
-            num_atoms = x_total.size
-            atom_types = [e1] * num_atoms # Default to element 1
-            x_flat, y_flat = x_total.flatten(), y_total.flatten() # 1D
-        elif lattice_type in ["3d_sc", "3d_hex"]:
-            x_total, y_total, z_total = lattice_funcs[lattice_type](nx, ny, nz, a, b, c)
-            x_total, y_total, z_total = rotate_3d(x_total, y_total, z_total, alpha, beta, gamma)
-            num_atoms = x_total.size
-            atom_types = [e1] * num_atoms # Default to element 1
-            x_flat, y_flat, z_flat = x_total.flatten(), y_total.flatten(), z_total.flatten() # 1D
-        elif lattice_type in ["3d_bcc", "3d_fcc"]:
-            base_lattice, other_lattice = lattice_funcs[lattice_type](nx, ny, nz, a, b, c)
-            x_c, y_c, z_c = base_lattice
-            x_b, y_b, z_b = other_lattice
-            x_c, y_c, z_c = rotate_3d(x_c, y_c, z_c, alpha, beta, gamma)
-            x_b, y_b, z_b = rotate_3d(x_b, y_b, z_b, alpha, beta, gamma)
-            num_base_atoms, num_other_atoms = x_c.size, x_b.size
-            x_flat = np.concatenate([x_c.flatten(), x_b.flatten()])
-            y_flat = np.concatenate([y_c.flatten(), y_b.flatten()])
-            z_flat = np.concatenate([z_c.flatten(), z_b.flatten()])
-            atom_types = [e1] * num_base_atoms + [e2] * num_other_atoms # Element 1 then Element 2
-            num_atoms = len(atom_types)
-        else:
-            print(f"Error: Unsupported lattice type: {lattice_type}")
-            return
 
-        # Vacancy Simulation
-        num_vacancies = int(num_atoms * vacancy_percent / 100)
-        vacancy_indices = np.random.choice(num_atoms, num_vacancies, replace=False)
-        x_plot = np.delete(x_flat, vacancy_indices)
-        y_plot = np.delete(y_flat, vacancy_indices)
-        if 'z_flat' in locals(): # Check if z exists for 3D
-            z_plot = np.delete(z_flat, vacancy_indices)
-        atom_types = np.delete(atom_types, vacancy_indices)
-
-        # Doping Simulation
-        num_atoms_to_dope = int(len(x_plot) * doping_percent / 100)
-        doping_indices = np.random.choice(len(x_plot), num_atoms_to_dope, replace=False)
-        for i in doping_indices:
-            atom_types[i] = e2 # replace atom e1 with e2
-
-        # Now Plot It
-        if lattice_type in ["2d_sc", "2d_tri", "2d_hex"]:
-            plot_2d_lattice(
-                ax, x_plot, y_plot, a, b,
-                title=f"{lattice_type.upper()} Lattice (nx={nx}, ny={ny}, alpha={alpha:.1f})",
-                colors=[ELEMENT_DATA[at]["color"] for at in atom_types],
-                marker_sizes=rad1, #Same marker size
-                elements=elements,
-                bond_threshold=bond_threshold
-            )
-            #clear the variables, preventing bugs
-            x_coords_global = None
-            y_coords_global = None
-            z_coords_global = None
-        elif lattice_type in ["3d_sc", "3d_hex","3d_bcc", "3d_fcc"]:
-            plot_3d_lattice(
-                ax, x_plot, y_plot, z_plot, a, b, c,
-                title=f"{lattice_type.upper()} Lattice (nx={nx}, ny={ny}, nz={nz}, α={alpha:.1f}, β={beta:.1f}, γ={gamma:.1f})",
-                colors=[ELEMENT_DATA[at]["color"] for at in atom_types],
-                marker_sizes=rad1, #same marker size
-                elements=elements,
-                bond_threshold=bond_threshold
-            )
-
-            # Store the coordinates for highlighting and re-click events
-            x_coords_global, y_coords_global, z_coords_global = x_plot, y_plot, z_plot
-        else:
-            x_coords_global, y_coords_global, z_coords_global = None, None, None
-
-                # Store the coordinates for highlighting
-           # Store the coordinates for highlighting
-            x_coords_global = x_plot
-            y_coords_global = y_plot
-            if 'z_plot' in locals(): # Check if z_plot exists
-                z_coords_global = z_plot #z_plot
-            else:
-                z_coords_global = None
-
-        # clear highlight and set title/labels then redraw canvas
-        if highlight_artist:
-            highlight_artist.remove()
-            highlight_artist = None
-
-        # set title/labels
-        ax.set_title(title)
-        ax.set_xlabel("X")
-        ax.set_ylabel("Y")
-        if "z_plot" in locals(): # check if Z exists
-            ax.set_zlabel("Z") # check if Z exists
-        canvas.draw()
+    def compute_lattice(snapshot, is_stale):
+        """Builds the crystal (lattice, defects, bonds). Runs on a worker thread."""
+        # The profiling frame follows the crystal to draw_lattice (None while profiling is off)
+        frame = PROFILER.begin("refresh")
+        # Color-only changes keep the crystal that is already built
+        if last_crystal["crystal"] is not None and last_crystal["crystal"].params == snapshot["crystal"]:
+            return snapshot, last_crystal["crystal"], frame
+
+        try:
+            with PROFILER.activate(frame):
+                crystal = build_crystal(snapshot["crystal"])
+        except ValueError as error:
+            print(f"Error: {error}") # e.g. cell angles that do not form a cell
+            return None
+        if is_stale():
+            return None  # a newer request arrived while building
+        last_crystal["crystal"] = crystal
+        return snapshot, crystal, frame
+
+    def draw_lattice(snapshot, crystal, frame=None):
+        """Draws a built crystal and updates the canvas. Runs on the Tk main thread."""
+        if not viewer:
+            pending["result"] = (snapshot, crystal, frame) # drawn by create_viewer
+            return
+        with PROFILER.activate(frame):
+            show_crystal(snapshot, crystal)
+        PROFILER.finish(frame)
+
+    def show_crystal(snapshot, crystal):
+        """Resolves colors and sizes and hands the crystal to the renderer."""
+        fig, picker, selection, renderer = viewer["fig"], viewer["picker"], viewer["selection"], viewer["renderer"]
+        to_rgba = viewer["to_rgba"]
+        params = crystal.params
+        e1, e2 = params.element_1, params.element_2
+        elements = [e1, e2] # define element list
+        element_colors = [snapshot["col1"], snapshot["col2"]]
+
+        # One color and radius per species (the chosen colors override the table's),
+        # resolved for every atom in a single fancy index
+        with PROFILER.stage("colors") as record:
+            table = crystal.element_table()
+            species_colors = table.colors.copy()
+            palette = {e2: snapshot["col2"], e1: snapshot["col1"]}
+            for code, symbol in enumerate(crystal.symbols):
+                if symbol in palette:
+                    species_colors[code] = to_rgba(palette[symbol])
+            species = crystal.atom_species()
+            colors = species_colors[species]
+            sizes = table.radii[species] * 80
+            record.update(atoms=len(species), bytes=colors.nbytes + sizes.nbytes)
+
+        positions = crystal.atom_positions()
+        coordination = None if crystal.bonds is None else coordination_numbers(crystal.bonds, crystal.num_atoms)
+        # The selection only survives redraws of the same crystal (e.g. color changes)
+        selection.set_atoms(positions, species, crystal.symbols, coordination,
+                            same_atoms=crystal is viewer.get("drawn"))
+        viewer["drawn"] = crystal
+        largest = table.radii.max(initial=0.0) * 80
+        picker.radius_px = max(4.0, np.sqrt(largest) / 2 * fig.dpi / 72) # largest marker radius in pixels
+
+        # Existing artists are updated in place unless the number of drawn atoms changed
+        renderer.show(
+            crystal, positions, colors, sizes,
+            title=f"{params.lattice_type.upper()} Lattice",
+            elements=elements,
+            element_colors=element_colors
+        )
+
+    refresh_scheduler = RefreshScheduler(root, compute_lattice, lambda result: draw_lattice(*result))
 
     # ==================== UI ELEMENTS ====================
     frame = ttk.Frame(root, padding="10 10 10 10")
@@ -333,13 +287,10 @@ def main():
 
     # --------- Lattice Type Selection ---------
     ttk.Label(frame, text="Lattice Type:").grid(column=0, row=0, sticky=(tk.W, tk.E))
-    lattice_type_combo = ttk.Combobox(frame, textvariable=current_lattice_type, values=["2d_sc", "2d_tri", "2d_hex", "3d_sc", "3d_bcc", "3d_fcc", "3d_hex"], state='readonly')
+    lattice_type_combo = ttk.Combobox(frame, textvariable=current_lattice_type, values=list(LATTICE_DEFS), state='readonly')
     lattice_type_combo.grid(column=1, row=0, sticky=(tk.W, tk.E))
     lattice_type_combo.bind("<<ComboboxSelected>>", lambda event: refresh_plot())
 
-    # Register click event handler
-    canvas.mpl_connect('button_press_event', on_atom_click)
-
     # --------- Crystal System Selection ---------
     ttk.Label(frame, text="Crystal System:").grid(column=0, row=1, sticky=(tk.W, tk.E))
     crystal_system_combo = ttk.Combobox(frame, textvariable=crystal_system, values=["isometric", "orthorhombic", "tetragonal", "hexagonal"], state='readonly')
@@ -374,15 +325,15 @@ def main():
 
     # --------- Unit Cells ---------
     ttk.Label(frame, text="Unit Cells nx:").grid(column=0, row=8, sticky=tk.W)
-    nx_slider = tk.Scale(frame, from_=1, to=10, resolution=1, orient=tk.HORIZONTAL, variable=unit_cells_x, command=lambda event: refresh_plot())
+    nx_slider = tk.Scale(frame, from_=1, to=50, resolution=1, orient=tk.HORIZONTAL, variable=unit_cells_x, command=lambda event: refresh_plot())
     nx_slider.grid(column=1, row=8, sticky=(tk.W, tk.E))
 
     ttk.Label(frame, text="Unit Cells ny:").grid(column=0, row=9, sticky=tk.W)
-    ny_slider = tk.Scale(frame, from_=1, to=10, resolution=1, orient=tk.HORIZONTAL, variable=unit_cells_y, command=lambda event: refresh_plot())
+    ny_slider = tk.Scale(frame, from_=1, to=50, resolution=1, orient=tk.HORIZONTAL, variable=unit_cells_y, command=lambda event: refresh_plot())
     ny_slider.grid(column=1, row=9, sticky=(tk.W, tk.E))
 
     ttk.Label(frame, text="Unit Cells nz:").grid(column=0, row=10, sticky=tk.W)
-    nz_slider = tk.Scale(frame, from_=1, to=10, resolution=1, orient=tk.HORIZONTAL, variable=unit_cells_z, command=lambda event: refresh_plot())
+    nz_slider = tk.Scale(frame, from_=1, to=50, resolution=1, orient=tk.HORIZONTAL, variable=unit_cells_z, command=lambda event: refresh_plot())
     nz_slider.grid(column=1, row=10, sticky=(tk.W, tk.E))
 
     # --------- Element 1 Selection ---------
@@ -443,14 +394,53 @@ def main():
     doping_slider = tk.Scale(frame, from_=0.0, to=100.0, resolution=1.0, orient=tk.HORIZONTAL, variable=doping_percentage, command=lambda event: refresh_plot())
     doping_slider.grid(column=1, row=20, sticky=(tk.W, tk.E))
 
-    # ---------Canvas and Frame Weight ---------
-    canvas.get_tk_widget().grid(row=0, column=1, sticky="nsew")
-    # Register click event handler
-    canvas.mpl_connect('button_press_event', on_atom_click)
+    # --------- Periodic Boundaries ---------
+    periodic_check = ttk.Checkbutton(frame, text="Periodic Bonds", variable=periodic_bonds, command=refresh_plot)
+    periodic_check.grid(column=0, row=21, columnspan=2, sticky=tk.W)
+
+    # --------- Interstitial Percentage ---------
+    ttk.Label(frame, text="Interstitial %:").grid(column=0, row=22, sticky=tk.W)
+    interstitial_slider = tk.Scale(frame, from_=0.0, to=25.0, resolution=0.5, orient=tk.HORIZONTAL, variable=interstitial_percentage, command=lambda event: refresh_plot())
+    interstitial_slider.grid(column=1, row=22, sticky=(tk.W, tk.E))
+
+    # --------- Defect Clustering ---------
+    ttk.Label(frame, text="Cluster Radius:").grid(column=0, row=23, sticky=tk.W)
+    cluster_slider = tk.Scale(frame, from_=0.0, to=20.0, resolution=0.5, orient=tk.HORIZONTAL, variable=cluster_radius, command=lambda event: refresh_plot())
+    cluster_slider.grid(column=1, row=23, sticky=(tk.W, tk.E))
+
+    # --------- Defect Seed ---------
+    ttk.Label(frame, text="Defect Seed:").grid(column=0, row=24, sticky=tk.W)
+    seed_spinbox = ttk.Spinbox(frame, from_=0, to=999999, textvariable=defect_seed, width=8, command=refresh_plot)
+    seed_spinbox.grid(column=1, row=24, sticky=(tk.W, tk.E))
+    seed_spinbox.bind("<Return>", lambda event: refresh_plot())
+
+    # --------- Performance HUD ---------
+    def toggle_hud():
+        """Records stage timings only while the HUD is shown, so they cost nothing otherwise."""
+        if show_hud.get():
+            PROFILER.enable()
+        else:
+            PROFILER.disable()
+        if viewer and show_hud.get():
+            viewer["hud"].show()
+        elif viewer:
+            viewer["hud"].hide()
+
+    hud_check = ttk.Checkbutton(frame, text="Performance HUD", variable=show_hud, command=lambda: (toggle_hud(), refresh_plot()))
+    hud_check.grid(column=0, row=25, columnspan=2, sticky=tk.W)
+    toggle_hud()
+
+    timer.mark("controls built")
 
     # ==================== INITIAL PLOT + UI ====================
+    # The window appears first; the plotting imports and the first crystal build run behind it
+    PlottingLoader(root, create_viewer).start()
     refresh_plot()
+    root.after_idle(lambda: timer.mark("window shown"))
     root.mainloop()
+    refresh_scheduler.shutdown()
+    if viewer:
+        viewer["renderer"].cancel()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,238 @@
+"""
+Molecular dynamics for Auraeon Crystal Lattice Simulator.
+
+Simulation integrates a crystal's atoms with velocity Verlet under a pair
+potential (see potentials.py), using the element masses of
+elements.ElementTable. It runs at constant energy (NVE) or, with a
+thermostat temperature, under a Berendsen thermostat. Forces come from a
+Verlet neighbor list (neighbors.VerletList) that is searched again only
+once some atom has moved more than half the skin, so most steps are a
+few array operations over the stored pairs. Trajectory frames are
+streamed to disk as they are produced, and every step is timed.
+
+Units are Angstrom, fs, amu, eV and K.
+"""
+
+import os
+import time
+
+import numpy as np
+
+from crystal import supercell_matrix
+from export import xyz_lines
+from neighbors import VerletList
+from potentials import PairPotential
+
+BOLTZMANN = 8.617333262e-5  # eV/K
+# Acceleration of a 1 eV/Angstrom force on 1 amu, in Angstrom/fs^2
+FORCE_TO_ACCEL = 9.648533212e-3
+
+# .npy trajectory headers are padded to this size, so the frame count can be rewritten in place
+_NPY_HEADER_BYTES = 128
+
+
+def _npy_frames_header(num_frames, num_atoms, dim):
+    """Version 1.0 .npy header for a (num_frames, num_atoms, dim) little-endian float64 array."""
+    header = repr({"descr": "<f8", "fortran_order": False, "shape": (num_frames, num_atoms, dim)})
+    header = header.ljust(_NPY_HEADER_BYTES - 11) + "\n"
+    return b"\x93NUMPY\x01\x00" + len(header).to_bytes(2, "little") + header.encode("latin1")
+
+
+class TrajectoryWriter:
+    """
+    Appends frames to an extended XYZ (.xyz, .extxyz) or .npy file as they are produced.
+
+    A .npy trajectory is one (frames, atoms, dim) array; its frame count is
+    written on close(). Only the current frame is ever held in memory.
+    """
+
+    def __init__(self, path, symbols, species, box, pbc=None):
+        self.path = path
+        self.symbols = list(symbols)
+        self.species = np.asarray(species)
+        self.box = box
+        self.pbc = pbc
+        self.num_frames = 0
+        self.binary = os.path.splitext(path)[1].lower() == ".npy"
+        if not self.binary and os.path.splitext(path)[1].lower() not in (".xyz", ".extxyz"):
+            raise ValueError(f"Unsupported trajectory format: {path} (use .xyz, .extxyz or .npy)")
+        self._file = open(path, "wb" if self.binary else "w", buffering=1 << 22)
+        self._shape = None
+
+    def write(self, coords, time_fs=0.0, energy=None):
+        """Appends one frame of (N, D) coordinates."""
+        coords = np.asarray(coords, dtype=float)
+        if self.binary:
+            if self._shape is None:
+                self._shape = coords.shape
+                self._file.write(_npy_frames_header(0, *coords.shape))
+            self._file.write(np.ascontiguousarray(coords, dtype="<f8").tobytes())
+        else:
+            positions = np.zeros((len(coords), 3))
+            positions[:, :coords.shape[1]] = coords
+            lattice = " ".join(f"{v:.8f}" for v in self.box.ravel())
+            pbc = " ".join("T" if p else "F" for p in (self.pbc or (False, False, False)))
+            header = f'Lattice="{lattice}" Properties=species:S:1:pos:R:3 Time={time_fs:.6f} pbc="{pbc}"'
+            if energy is not None:
+                header += f" energy={energy:.8f}"
+            self._file.write(f"{len(coords)}\n{header}\n")
+            self._file.write(xyz_lines(positions, self.species, self.symbols))
+        self.num_frames += 1
+
+    def close(self):
+        if self._file.closed:
+            return
+        if self.binary and self._shape is not None:
+            self._file.seek(0)
+            self._file.write(_npy_frames_header(self.num_frames, *self._shape))
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class Simulation:
+    """Velocity Verlet integration of a crystal's atoms under a pair potential."""
+
+    def __init__(self, crystal, potential="lj", timestep=1.0, temperature=0.0, thermostat_temperature=None,
+                 tau=100.0, skin=0.3, cutoff=None, periodic=None, seed=None):
+        """
+        potential: "lj", "morse" or a PairPotential over crystal.symbols.
+        timestep: fs per step.
+        temperature: K of the initial Maxwell-Boltzmann velocities, drawn from seed.
+        thermostat_temperature: K the Berendsen thermostat pulls towards with
+            time constant tau (fs); None integrates at constant energy (NVE).
+        skin: Angstrom added to the cutoff for the Verlet neighbor list.
+        periodic defaults to crystal.params.periodic.
+        """
+        if periodic is None:
+            periodic = crystal.params.periodic
+        if not isinstance(potential, PairPotential):
+            potential = PairPotential(crystal.symbols, potential, cutoff)
+        self.potential = potential
+        self.crystal = crystal
+        self.dim = crystal.dim
+        self.symbols = list(crystal.symbols)
+        self.species = crystal.atom_species()
+        self.coords = np.array(crystal.atom_positions(), dtype=float)
+        self.masses = np.asarray(crystal.element_property("mass"), dtype=float)
+        self.box = supercell_matrix(crystal.params)
+        self.pbc = (True, True, self.dim == 3) if periodic else None
+        self.timestep = timestep
+        self.thermostat_temperature = thermostat_temperature
+        self.tau = tau
+        self.time = 0.0
+        self.steps = 0
+        self.step_times = []  # seconds taken by every step
+
+        self._accel_per_force = (FORCE_TO_ACCEL / self.masses)[:, None]
+        self.velocities = self._initial_velocities(temperature, seed)
+        self.neighbors = VerletList(potential.cutoff, skin, self.box, self.pbc)
+        self.neighbors.update(self.coords)
+        self.result = potential.evaluate_list(self.coords, self.species, self.neighbors)
+
+    @property
+    def num_atoms(self):
+        return len(self.coords)
+
+    @property
+    def degrees_of_freedom(self):
+        """Velocity components, less the center-of-mass motion that is removed at the start."""
+        return self.dim * max(self.num_atoms - 1, 1)
+
+    def _initial_velocities(self, temperature, seed):
+        """Maxwell-Boltzmann velocities at exactly temperature, without center-of-mass drift."""
+        velocities = np.zeros_like(self.coords)
+        if temperature <= 0 or self.num_atoms < 2:
+            return velocities
+        rng = np.random.default_rng(seed)
+        velocities = rng.normal(size=self.coords.shape) * np.sqrt(BOLTZMANN * temperature * self._accel_per_force)
+        velocities -= (self.masses[:, None] * velocities).sum(axis=0) / self.masses.sum()
+        return velocities * np.sqrt(temperature / self._temperature(velocities))
+
+    def _temperature(self, velocities):
+        kinetic = 0.5 * np.einsum("i,ij,ij->", self.masses, velocities, velocities) / FORCE_TO_ACCEL
+        return 2.0 * kinetic / (self.degrees_of_freedom * BOLTZMANN)
+
+    def kinetic_energy(self):
+        """Kinetic energy in eV."""
+        return 0.5 * np.einsum("i,ij,ij->", self.masses, self.velocities, self.velocities) / FORCE_TO_ACCEL
+
+    def potential_energy(self):
+        return self.result.energy
+
+    def total_energy(self):
+        return self.kinetic_energy() + self.result.energy
+
+    def temperature(self):
+        """Instantaneous kinetic temperature in K."""
+        return self._temperature(self.velocities)
+
+    def step(self):
+        """Advances one timestep and returns the seconds it took."""
+        start = time.perf_counter()
+        half_dt = 0.5 * self.timestep
+        self.velocities += half_dt * self.result.forces * self._accel_per_force
+        self.coords += self.timestep * self.velocities
+        self.neighbors.update(self.coords)
+        self.result = self.potential.evaluate_list(self.coords, self.species, self.neighbors)
+        self.velocities += half_dt * self.result.forces * self._accel_per_force
+
+        if self.thermostat_temperature is not None:
+            # Berendsen: scale velocities part of the way towards the target temperature
+            current = self.temperature()
+            if current > 0:
+                ratio = 1.0 + self.timestep / self.tau * (self.thermostat_temperature / current - 1.0)
+                self.velocities *= np.sqrt(max(ratio, 0.0))
+
+        self.time += self.timestep
+        self.steps += 1
+        elapsed = time.perf_counter() - start
+        self.step_times.append(elapsed)
+        return elapsed
+
+    def run(self, num_steps, trajectory=None, every=10, callback=None):
+        """
+        Runs num_steps steps.
+
+        trajectory: path of a .xyz/.extxyz/.npy file (or a TrajectoryWriter)
+        that receives the starting frame and every every-th frame after it.
+        callback(simulation) is called after every step.
+        """
+        writer = trajectory
+        if isinstance(trajectory, str):
+            writer = TrajectoryWriter(trajectory, self.symbols, self.species, self.box, self.pbc)
+        try:
+            if writer is not None and self.steps == 0:
+                writer.write(self.coords, self.time, self.total_energy())
+            for _ in range(num_steps):
+                self.step()
+                if writer is not None and self.steps % every == 0:
+                    writer.write(self.coords, self.time, self.total_energy())
+                if callback is not None:
+                    callback(self)
+        finally:
+            if writer is not None and writer is not trajectory:
+                writer.close()
+        return self
+
+    def store(self):
+        """Writes the current coordinates back into the crystal. Its bonds are left as they were."""
+        self.crystal.positions[self.crystal.atom_indices(), :self.dim] = self.coords
+
+    def timing(self):
+        """Step time statistics (seconds) and the number of neighbor list searches."""
+        times = np.asarray(self.step_times)
+        if not len(times):
+            return {"steps": 0, "neighbor_builds": self.neighbors.builds}
+        return {
+            "steps": len(times),
+            "mean": float(times.mean()),
+            "min": float(times.min()),
+            "max": float(times.max()),
+            "total": float(times.sum()),
+            "neighbor_builds": self.neighbors.builds,
+        }
@@ -0,0 +1,368 @@
+"""
+Spatial neighbor search for Auraeon Crystal Lattice Simulator.
+
+Atoms are binned into a cell list whose cells are as wide as the search
+cutoff, so every neighbor of an atom lies in its own cell or one of the
+adjacent cells. Only those candidate pairs are ever measured, which keeps
+time and memory roughly linear in the number of atoms instead of building
+a dense N x N distance matrix.
+
+This module only depends on NumPy and can be used without the GUI.
+"""
+
+import itertools
+
+import numpy as np
+
+# Upper bound on cells along one axis, keeps flattened cell keys inside int64
+_MAX_CELLS_PER_AXIS = 2 ** 20
+
+
+def _half_shell_offsets(dim):
+    """Returns the neighbor cell offsets that visit each pair of cells once."""
+    offsets = []
+    for offset in itertools.product((-1, 0, 1), repeat=dim):
+        nonzero = [o for o in offset if o != 0]
+        # Keep an offset only if its first non-zero component is positive
+        if nonzero and nonzero[0] > 0:
+            offsets.append(offset)
+    return np.array(offsets, dtype=np.int64)
+
+
+def index_dtype(num_atoms):
+    """Smallest integer type able to index num_atoms atoms."""
+    return np.int32 if num_atoms <= np.iinfo(np.int32).max else np.int64
+
+
+class CellList:
+    """
+    Atoms binned into cubic cells at least cell_size wide.
+
+    Atoms of one cell are contiguous in `order`, and occupied cells are
+    looked up by binary search on their flattened keys, so only cells that
+    actually hold atoms cost memory. With pad, the grid has that many empty
+    cell layers around the atoms, so neighbor offsets up to pad cells away
+    never leave it and their keys are a single addition.
+    """
+
+    def __init__(self, coords, cell_size, pad=0):
+        self.coords = coords
+        self.pad = pad
+        # Very sparse inputs get coarser cells so the cell keys fit in an int64
+        origin = coords.min(axis=0)
+        extent = float((coords.max(axis=0) - origin).max())
+        self.cell_size = max(cell_size, extent / _MAX_CELLS_PER_AXIS)
+        self.cell_idx = np.floor((coords - origin) / self.cell_size).astype(np.int64) + pad
+        self.cell_dims = self.cell_idx.max(axis=0) + 1 + pad
+        self.cell_keys = np.ravel_multi_index(self.cell_idx.T, self.cell_dims)
+        # Key difference between neighboring cells along each axis
+        self.key_strides = np.cumprod(np.append(self.cell_dims[1:], 1)[::-1])[::-1]
+
+        self.order = np.argsort(self.cell_keys, kind="stable")
+        self.occupied, self.cell_start, self.cell_count = np.unique(
+            self.cell_keys[self.order], return_index=True, return_counts=True
+        )
+
+    def candidates(self, atoms, offset=None):
+        """
+        Candidate pairs (i, j) between atoms and every atom j in the cell at
+        offset from theirs (their own cell when offset is None).
+        """
+        if offset is None:
+            neighbor_keys = self.cell_keys[atoms]
+        elif np.abs(offset).max() <= self.pad:
+            neighbor_keys = self.cell_keys[atoms] + int(np.dot(offset, self.key_strides))
+        else:
+            shifted = self.cell_idx[atoms] + offset
+            inside = np.all((shifted >= 0) & (shifted < self.cell_dims), axis=1)
+            atoms = atoms[inside]
+            neighbor_keys = np.ravel_multi_index(shifted[inside].T, self.cell_dims)
+
+        slot = np.searchsorted(self.occupied, neighbor_keys)
+        slot = np.minimum(slot, len(self.occupied) - 1)
+        found = self.occupied[slot] == neighbor_keys
+        atoms, slot = atoms[found], slot[found]
+        counts = self.cell_count[slot]
+
+        # Expand each atom into one candidate pair per atom in its neighbor cell
+        i = np.repeat(atoms, counts)
+        first = np.repeat(self.cell_start[slot], counts)
+        within = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        return i, self.order[first + within]
+
+    def within(self, atoms, offset, cutoff):
+        """Candidate pairs no further apart than cutoff, with their squared distances."""
+        i, j = self.candidates(atoms, offset)
+        diff = self.coords[i] - self.coords[j]
+        dist_sq = np.einsum("ij,ij->i", diff, diff)
+        close = dist_sq <= cutoff ** 2
+        return i[close], j[close], dist_sq[close]
+
+
+def find_bonds(coords, bond_threshold):
+    """
+    Finds every pair of atoms no further apart than bond_threshold.
+
+    coords is an (N, D) array of atom positions (D is 2 or 3).
+    Returns an (M, 2) integer array of (i, j) index pairs with i < j,
+    sorted by i and then j.
+    """
+    coords = np.asarray(coords, dtype=float)
+    if coords.ndim != 2:
+        raise ValueError(f"coords must be an (N, D) array, got shape {coords.shape}")
+
+    num_atoms, dim = coords.shape
+    idx_dtype = index_dtype(num_atoms)
+    if num_atoms < 2 or bond_threshold <= 0:
+        return np.empty((0, 2), dtype=idx_dtype)
+
+    cells = CellList(coords, bond_threshold)
+    all_atoms = np.arange(num_atoms)
+    pairs_i, pairs_j = [], []
+
+    # Pairs inside the same cell
+    i, j, _ = cells.within(all_atoms, None, bond_threshold)
+    keep = i < j
+    pairs_i.append(i[keep])
+    pairs_j.append(j[keep])
+
+    # Pairs in adjacent cells, each pair of cells visited once
+    for offset in _half_shell_offsets(dim):
+        i, j, _ = cells.within(all_atoms, offset, bond_threshold)
+        pairs_i.append(np.minimum(i, j))
+        pairs_j.append(np.maximum(i, j))
+
+    i = np.concatenate(pairs_i)
+    j = np.concatenate(pairs_j)
+    sort = np.lexsort((j, i))
+    return np.column_stack((i[sort], j[sort])).astype(idx_dtype, copy=False)
+
+
+def periodic_images(coords, cutoff, box, pbc=(True, True, True)):
+    """
+    Wraps atoms into a periodic box and adds ghost images within cutoff of its faces.
+
+    box is a 3x3 matrix whose rows are the edges of the periodic box, and
+    pbc says which edges wrap around; (N, 2) coords use the first two.
+    Returns (points, owner): the wrapped atoms first, then the ghosts, and
+    for every point the index of the atom it is an image of. cutoff must
+    be less than half of every periodic box width, so a pair of atoms has
+    at most one image pair in reach (minimum image).
+    """
+    coords = np.asarray(coords, dtype=float)
+    num_atoms, dim = coords.shape
+    edges = np.asarray(box, dtype=float)[:dim, :dim]
+    periodic = np.asarray(pbc, dtype=bool)[:dim]
+    inverse = np.linalg.inv(edges)
+    # Distance between the two faces of the box across each edge
+    widths = 1.0 / np.linalg.norm(inverse, axis=0)
+    if np.any(2 * cutoff >= widths[periodic]):
+        raise ValueError(
+            f"Cutoff {cutoff} must be less than half the periodic box width ({widths[periodic].min() / 2:.3f})"
+        )
+
+    # Wrap every atom into the box by whole box edges, then pad with ghosts near periodic faces
+    fractional = coords @ inverse
+    wraps = np.where(periodic, np.floor(fractional), 0.0)
+    fractional -= wraps
+    wrapped = coords - wraps @ edges if wraps.any() else coords
+    reach = cutoff / widths
+    near_low = fractional < reach         # copied across to the high face
+    near_high = fractional >= 1.0 - reach  # copied across to the low face
+
+    points = [wrapped]
+    owners = [np.arange(num_atoms)]
+    for shift in itertools.product((-1, 0, 1), repeat=dim):
+        shift = np.array(shift)
+        if not shift.any() or np.any(shift[~periodic] != 0):
+            continue
+        mask = np.ones(num_atoms, dtype=bool)
+        for axis in np.flatnonzero(shift):
+            mask &= near_low[:, axis] if shift[axis] > 0 else near_high[:, axis]
+        ghosts = np.flatnonzero(mask)
+        if len(ghosts):
+            points.append(wrapped[ghosts] + shift @ edges)
+            owners.append(ghosts)
+    return np.concatenate(points), np.concatenate(owners)
+
+
+def find_periodic_bonds(coords, bond_threshold, box, pbc=(True, True, True)):
+    """
+    Finds every pair of atoms within bond_threshold under periodic boundaries.
+
+    Atoms near periodic faces are copied across the box as ghost images (see
+    periodic_images), find_bonds runs once over atoms plus ghosts, and pairs
+    found through a ghost are mapped back to the original atom (minimum
+    image). bond_threshold must be less than half of every periodic box width.
+    Returns the same (i, j) pair array as find_bonds.
+    """
+    coords = np.asarray(coords, dtype=float)
+    if coords.ndim != 2:
+        raise ValueError(f"coords must be an (N, D) array, got shape {coords.shape}")
+    num_atoms = len(coords)
+    idx_dtype = index_dtype(num_atoms)
+    if num_atoms < 2 or bond_threshold <= 0:
+        return np.empty((0, 2), dtype=idx_dtype)
+
+    points, owner = periodic_images(coords, bond_threshold, box, pbc)
+    pairs = find_bonds(points, bond_threshold)
+    # Real atoms come first, so a pair touches a real atom iff its lower index is real
+    pairs = owner[pairs[pairs[:, 0] < num_atoms]]
+    i = np.minimum(pairs[:, 0], pairs[:, 1]).astype(np.int64)
+    j = np.maximum(pairs[:, 0], pairs[:, 1]).astype(np.int64)
+    # A pair seen from both ends (atom-ghost and ghost-atom) is kept once
+    keys = np.unique(i * num_atoms + j)
+    return np.column_stack((keys // num_atoms, keys % num_atoms)).astype(idx_dtype, copy=False)
+
+
+def stencil_offsets(dim, subdivisions=1, half=True):
+    """
+    Offsets of the cells that can hold points within r of a point in the
+    zero cell, for cells r / subdivisions wide.
+
+    With half, the zero offset and one of every pair of opposite offsets
+    are left out, so each pair of distinct cells is visited once.
+    """
+    offsets = []
+    for offset in np.ndindex(*(2 * subdivisions + 1,) * dim):
+        offset = np.array(offset) - subdivisions
+        nonzero = offset[offset != 0]
+        if half and (not len(nonzero) or nonzero[0] < 0):
+            continue
+        # Closest approach of two cells at this offset, in cell widths
+        gap = np.maximum(np.abs(offset) - 1, 0)
+        if (gap ** 2).sum() < subdivisions ** 2:
+            offsets.append(offset)
+    return np.array(offsets, dtype=np.int64)
+
+
+def coordinate_axes(points):
+    """
+    The columns of (N, D) points as D contiguous arrays, for pair loops
+    that gather coordinates by index: gathering scalars from one axis is
+    much faster than gathering rows.
+    """
+    return [np.ascontiguousarray(points[:, k]) for k in range(points.shape[1])]
+
+
+def iter_neighbor_pairs(coords, cutoff, box=None, pbc=None, block_atoms=1 << 16, subdivisions=2):
+    """
+    Yields (i, j, diff) blocks of ordered neighbor pairs within cutoff.
+
+    Every atom i is listed with each of its neighbors j, so a pair appears
+    once from each end, and diff holds the vectors from j to i (from the
+    nearest image of j with box and pbc). A block covers at most
+    block_atoms atoms i, taken cell by cell, so memory stays bounded however
+    large the crystal and blocks can be processed independently. Cells are
+    cutoff / subdivisions wide; finer cells wrap the cutoff sphere more
+    tightly, so fewer candidate pairs are measured.
+    """
+    coords = np.asarray(coords, dtype=float)
+    num_atoms, dim = coords.shape
+    if num_atoms < 2 or cutoff <= 0:
+        return
+    if box is not None and pbc is not None and np.any(pbc):
+        points, owner = periodic_images(coords, cutoff, box, pbc)
+    else:
+        points, owner = coords, np.arange(num_atoms)
+
+    # Store points cell by cell, so each block and its neighbor cells are compact memory ranges
+    order = CellList(points, cutoff / subdivisions).order
+    points, owner = points[order], owner[order]
+    cells = CellList(points, cutoff / subdivisions, pad=subdivisions)
+    stencil = stencil_offsets(dim, subdivisions, half=False)
+    axes = coordinate_axes(points)
+    real = np.flatnonzero(order < num_atoms)
+
+    for start in range(0, num_atoms, block_atoms):
+        block = real[start:start + block_atoms]
+        pairs_i, pairs_j, diffs = [], [], []
+        for offset in stencil:
+            i, j = cells.candidates(block, offset)
+            diff = [axis[i] - axis[j] for axis in axes]
+            dist_sq = sum(d * d for d in diff)
+            close = np.flatnonzero((dist_sq <= cutoff ** 2) & (i != j))
+            pairs_i.append(i[close])
+            pairs_j.append(j[close])
+            diffs.append(np.column_stack([d[close] for d in diff]))
+        yield owner[np.concatenate(pairs_i)], owner[np.concatenate(pairs_j)], np.concatenate(diffs)
+
+
+class VerletList:
+    """
+    Half neighbor list within cutoff + skin, kept while atoms move.
+
+    Each pair (i < j) is stored once, with the periodic shift that turns
+    coords[i] - coords[j] into the minimum-image vector, so pair vectors
+    can be recomputed from the current coordinates without a new search.
+    update() searches again only once some atom has moved more than
+    skin / 2 since the last search; until then no pair can have come
+    within cutoff unseen.
+    """
+
+    def __init__(self, cutoff, skin=0.3, box=None, pbc=None):
+        self.cutoff = cutoff
+        self.skin = skin
+        self.box = box
+        self.pbc = pbc
+        self.i = self.j = self.shifts = None
+        self.reference = None  # coordinates at the last search
+        self.builds = 0
+
+    def build(self, coords):
+        """Searches all pairs within cutoff + skin of coords."""
+        coords = np.asarray(coords, dtype=float)
+        pairs_i, pairs_j, shifts = [], [], []
+        for i, j, diff in iter_neighbor_pairs(coords, self.cutoff + self.skin, self.box, self.pbc):
+            keep = i < j
+            i, j, diff = i[keep], j[keep], diff[keep]
+            pairs_i.append(i)
+            pairs_j.append(j)
+            shifts.append(diff - (coords[i] - coords[j]))
+        i = np.concatenate(pairs_i) if pairs_i else np.empty(0, dtype=np.int64)
+        j = np.concatenate(pairs_j) if pairs_j else np.empty(0, dtype=np.int64)
+        idx_dtype = index_dtype(len(coords))
+        self.i = i.astype(idx_dtype)
+        self.j = j.astype(idx_dtype)
+        self.shifts = None  # open boundaries need no shifts
+        if shifts and self.box is not None and self.pbc is not None and np.any(self.pbc):
+            self.shifts = coordinate_axes(np.concatenate(shifts))
+        self.reference = coords.copy()
+        self.builds += 1
+
+    def update(self, coords):
+        """Rebuilds the list if any atom has moved more than skin / 2. Returns True if it did."""
+        if self.reference is not None and len(self.reference) == len(coords):
+            moved = coords - self.reference
+            if np.einsum("ij,ij->i", moved, moved).max(initial=0.0) <= (self.skin / 2) ** 2:
+                return False
+        self.build(coords)
+        return True
+
+    def vectors(self, coords):
+        """Minimum-image vectors from atom j to atom i for every listed pair."""
+        diff = np.empty((len(self.i), coords.shape[1]))
+        for axis, column in enumerate(coordinate_axes(coords)):
+            diff[:, axis] = column[self.i] - column[self.j]
+            if self.shifts is not None:
+                diff[:, axis] += self.shifts[axis]
+        return diff
+
+
+def coordination_numbers(bonds, num_atoms, chunk_bonds=1 << 20):
+    """
+    Number of bonds touching each of num_atoms atoms, from an (M, 2) bond array.
+
+    bonds is read chunk_bonds rows at a time, so memory-mapped bond arrays
+    are never loaded whole.
+    """
+    counts = np.zeros(num_atoms, dtype=np.int64)
+    for start in range(0, len(bonds), chunk_bonds):
+        chunk = np.asarray(bonds[start:start + chunk_bonds])
+        counts += np.bincount(chunk.ravel(), minlength=num_atoms)[:num_atoms]
+    return counts
+
+
+def coordination_histogram(coordination):
+    """counts[k] is the number of atoms with exactly k bonds."""
+    return np.bincount(np.asarray(coordination))
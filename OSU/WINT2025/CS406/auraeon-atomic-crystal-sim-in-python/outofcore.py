@@ -0,0 +1,266 @@
+"""
+Out-of-core crystals for Auraeon Crystal Lattice Simulator.
+
+build_mapped_crystal() backs a crystal's positions, species, occupancy and
+bonds with np.memmap files in a scratch directory. Generation (including
+rotation), the vacancy and doping passes and the bond search all walk the
+mapped buffers a bounded number of sites at a time, so crystals larger
+than RAM can be built, analysed and exported. Normally reached through
+build_crystal(params, scratch_dir=...).
+"""
+
+import os
+import tempfile
+
+import numpy as np
+
+from crystal import (
+    Crystal, crystal_dim, iter_lattice_stream, num_lattice_sites, site_symbols, supercell_matrix
+)
+from defects import DOPING_STREAM, VACANCY_STREAM, defect_rng
+from lattice import LATTICE_DEFS, lattice_cell
+from neighbors import find_bonds, index_dtype, periodic_images
+from rdf import BLOCK_ATOMS, SUBDIVISIONS, point_histogram
+
+# Sites handled per pass over the mapped buffers
+CHUNK_SITES = 1 << 20
+
+
+def _mapped(directory, name, dtype, shape):
+    """Creates a zero-filled memory-mapped array backed by directory/name.npy."""
+    return np.lib.format.open_memmap(os.path.join(directory, f"{name}.npy"), mode="w+", dtype=dtype, shape=shape)
+
+
+def iter_random_subset(rng, num_items, num_chosen, chunk_size=CHUNK_SITES, mask=None):
+    """
+    Yields (start, offsets) picking num_chosen of num_items uniformly without replacement.
+
+    rng is the np.random.Generator the picks are drawn from.
+    The choice is made chunk by chunk (a hypergeometric draw decides how many
+    picks fall into each chunk), so memory stays proportional to chunk_size.
+    mask, if given, is a boolean array: only its True items may be picked,
+    and num_items must equal their count.
+    """
+    remaining_items = num_items
+    remaining_picks = num_chosen
+    for start in range(0, len(mask) if mask is not None else num_items, chunk_size):
+        if remaining_picks == 0:
+            return
+        if mask is None:
+            candidates = np.arange(min(chunk_size, num_items - start))
+        else:
+            candidates = np.flatnonzero(mask[start:start + chunk_size])
+        in_chunk = len(candidates)
+        if in_chunk == 0:
+            continue
+        rest = remaining_items - in_chunk
+        picks = remaining_picks if rest == 0 else rng.hypergeometric(in_chunk, rest, remaining_picks)
+        if picks:
+            yield start, candidates[rng.choice(in_chunk, picks, replace=False)]
+        remaining_items -= in_chunk
+        remaining_picks -= picks
+
+
+def _layer_width(params, distance):
+    """
+    How many neighboring cell layers along a can hold atoms within distance.
+
+    Sites are ordered cell by cell with the a index slowest, so a block of
+    a-layers is a contiguous run of sites.
+    """
+    cell = lattice_cell(
+        params.lattice_type, params.a, params.b, params.c,
+        params.alpha, params.beta, params.gamma
+    )
+    # Spacing between the lattice planes spanned by b and c
+    spacing = abs(np.linalg.det(cell)) / np.linalg.norm(np.cross(cell[1], cell[2]))
+    return int(np.floor(distance / spacing)) + 1
+
+
+def _sites_per_layer(crystal):
+    """Sites in one cell layer along a."""
+    params = crystal.params
+    nz = 1 if crystal.dim == 2 else params.nz
+    return params.ny * nz * len(LATTICE_DEFS[params.lattice_type]["basis"])
+
+
+def mapped_bonds(crystal, bond_threshold, chunk_sites=CHUNK_SITES, directory=None):
+    """
+    Finds bonds of a lattice-ordered crystal one slab of cell layers at a time.
+
+    Each slab is searched together with the layers that can reach it, and a
+    pair is kept by the slab that holds its lower index, so every bond is
+    found exactly once. Results are appended to directory/bonds.npy (memory
+    mapped) when directory is given, otherwise returned in memory.
+    """
+    params = crystal.params
+    nx = params.nx
+    sites_per_layer = _sites_per_layer(crystal)
+    reach = _layer_width(params, bond_threshold)
+    layers_per_block = max(1, chunk_sites // sites_per_layer)
+
+    # Occupied atoms before each layer, to turn local indices into atom indices
+    layer_counts = [
+        int(np.count_nonzero(crystal.occupied[i * sites_per_layer:(i + 1) * sites_per_layer]))
+        for i in range(nx)
+    ]
+    atoms_before = np.concatenate(([0], np.cumsum(layer_counts)))
+    idx_dtype = index_dtype(crystal.num_sites)
+
+    raw_path = None if directory is None else os.path.join(directory, "bonds.raw")
+    raw = open(raw_path, "wb") if raw_path else None
+    parts = []
+    total = 0
+    try:
+        for first in range(0, nx, layers_per_block):
+            last = min(first + layers_per_block, nx)
+            lo, hi = max(0, first - reach), min(nx, last + reach)
+            occupied = np.asarray(crystal.occupied[lo * sites_per_layer:hi * sites_per_layer])
+            coords = crystal.positions[lo * sites_per_layer:hi * sites_per_layer][occupied, :crystal.dim]
+
+            local = find_bonds(coords, bond_threshold)
+            # Keep pairs whose lower atom lies in this block's own layers
+            own_lo = atoms_before[first] - atoms_before[lo]
+            own_hi = atoms_before[last] - atoms_before[lo]
+            local = local[(local[:, 0] >= own_lo) & (local[:, 0] < own_hi)]
+            block = (local.astype(idx_dtype) + atoms_before[lo]).astype(idx_dtype, copy=False)
+
+            total += len(block)
+            if raw is not None:
+                raw.write(block.tobytes())
+            else:
+                parts.append(block)
+    finally:
+        if raw is not None:
+            raw.close()
+
+    if raw_path is None:
+        return np.concatenate(parts) if parts else np.empty((0, 2), dtype=idx_dtype)
+
+    # Wrap the raw pair stream in an .npy header so it can be memory-mapped
+    bonds = _mapped(directory, "bonds", idx_dtype, (total, 2))
+    with open(raw_path, "rb") as f:
+        rows = max(1, chunk_sites)
+        for start in range(0, total, rows):
+            block = np.frombuffer(f.read(rows * 2 * bonds.itemsize), dtype=idx_dtype).reshape(-1, 2)
+            bonds[start:start + len(block)] = block
+    os.remove(raw_path)
+    bonds.flush()
+    return bonds
+
+
+def mapped_pair_histogram(crystal, r_max, num_bins=200, periodic=False, block_atoms=BLOCK_ATOMS, workers=None,
+                          subdivisions=SUBDIVISIONS, chunk_sites=CHUNK_SITES):
+    """
+    rdf.pair_histogram() of a lattice-ordered crystal, one slab of cell layers at a time.
+
+    Each slab is loaded together with the layers within r_max of it, and
+    only pairs starting at the slab's own atoms are counted, so every
+    ordered pair is counted once. With periodic boundaries the layers past
+    either end of a are those from the other end, shifted by the supercell
+    edge, and the other edges get ghost images as in pair_histogram.
+    """
+    params = crystal.params
+    dim = crystal.dim
+    nx = params.nx
+    sites_per_layer = _sites_per_layer(crystal)
+    reach = _layer_width(params, r_max)
+    layers_per_block = max(1, chunk_sites // sites_per_layer)
+    num_species = len(crystal.symbols)
+    box = supercell_matrix(params)
+    if periodic:
+        # Width of the box across the a faces; the other edges are checked by periodic_images
+        width = 1.0 / np.linalg.norm(np.linalg.inv(box[:dim, :dim])[:, 0])
+        if 2 * r_max >= width:
+            raise ValueError(f"Cutoff {r_max} must be less than half the periodic box width ({width / 2:.3f})")
+
+    counts = np.zeros((num_species, num_species, num_bins), dtype=np.int64)
+    for first in range(0, nx, layers_per_block):
+        last = min(first + layers_per_block, nx)
+        coords, species, counted = [], [], []
+        # Layers first - reach .. last + reach, read as up to three runs (wrapped below 0, inside, wrapped past nx)
+        for wrap in ((-1, 0, 1) if periodic else (0,)):
+            lo, hi = max(first - reach, wrap * nx), min(last + reach, (wrap + 1) * nx)
+            if lo >= hi:
+                continue
+            sites = slice((lo - wrap * nx) * sites_per_layer, (hi - wrap * nx) * sites_per_layer)
+            occupied = np.asarray(crystal.occupied[sites])
+            run = np.asarray(crystal.positions[sites][occupied, :dim], dtype=float)
+            coords.append(run + wrap * box[0, :dim] if wrap else run)
+            species.append(np.asarray(crystal.species[sites])[occupied])
+            own = np.zeros(len(occupied), dtype=bool)
+            if wrap == 0:
+                own[(first - lo) * sites_per_layer:(last - lo) * sites_per_layer] = True
+            counted.append(own[occupied])
+        coords, species, counted = np.concatenate(coords), np.concatenate(species), np.concatenate(counted)
+
+        if periodic:
+            points, owner = periodic_images(coords, r_max, box, (False, True, dim == 3))
+            species = species[owner]
+            counted = np.concatenate((counted, np.zeros(len(points) - len(coords), dtype=bool)))
+        else:
+            points = coords
+        counts += point_histogram(points, species, num_species, r_max, num_bins, counted,
+                                  block_atoms, workers, subdivisions)
+    return counts
+
+
+def build_mapped_crystal(params, scratch_dir, dtype=np.float64, chunk_sites=CHUNK_SITES):
+    """
+    Builds a crystal whose arrays live in np.memmap files.
+
+    A fresh sub-directory of scratch_dir holds the files; Crystal.close()
+    removes it. Generation, rotation, vacancies, doping and bonds are all
+    done chunk by chunk. Interstitials and clustered defects need the
+    whole crystal in memory and are not supported.
+    """
+    if params.periodic and params.bond_threshold is not None:
+        raise ValueError("Periodic bonds are not supported for memory-mapped crystals")
+    if params.interstitial_percent or params.cluster_radius:
+        raise ValueError("Interstitials and defect clustering are not supported for memory-mapped crystals")
+    dim = crystal_dim(params)
+    symbols, _ = site_symbols(params)
+    num_sites = num_lattice_sites(params)
+    os.makedirs(scratch_dir, exist_ok=True)
+    directory = tempfile.mkdtemp(prefix="auraeon-", dir=scratch_dir)
+
+    positions = _mapped(directory, "positions", dtype, (num_sites, 3))
+    species = _mapped(directory, "species", np.uint8, (num_sites,))
+    occupied = _mapped(directory, "occupied", bool, (num_sites,))
+
+    # Generation and rotation, written straight into the mapped buffers
+    basis_size = len(LATTICE_DEFS[params.lattice_type]["basis"])
+    chunk_cells = max(1, chunk_sites // basis_size)
+    start = 0
+    for chunk_positions, chunk_species in iter_lattice_stream(params, chunk_cells, dtype):
+        stop = start + len(chunk_positions)
+        positions[start:stop] = chunk_positions
+        species[start:stop] = chunk_species
+        occupied[start:stop] = True
+        start = stop
+
+    crystal = Crystal(params, dim, positions, species, symbols, occupied, storage_dir=directory)
+
+    # Vacancy Simulation
+    num_vacancies = int(num_sites * params.vacancy_percent / 100)
+    for first, offsets in iter_random_subset(
+        defect_rng(params.seed, VACANCY_STREAM), num_sites, num_vacancies, chunk_sites
+    ):
+        occupied[first + offsets] = False
+
+    # Doping Simulation: replace remaining atoms with element 2
+    num_atoms = crystal.num_atoms
+    num_atoms_to_dope = int(num_atoms * params.doping_percent / 100)
+    if num_atoms_to_dope:
+        dopant = crystal.species_code(params.element_2)
+        for first, offsets in iter_random_subset(
+            defect_rng(params.seed, DOPING_STREAM), num_atoms, num_atoms_to_dope, chunk_sites, occupied
+        ):
+            species[first + offsets] = dopant
+
+    if params.bond_threshold is not None:
+        crystal.bonds = mapped_bonds(crystal, params.bond_threshold, chunk_sites, directory)
+
+    for array in (positions, species, occupied):
+        array.flush()
+    return crystal
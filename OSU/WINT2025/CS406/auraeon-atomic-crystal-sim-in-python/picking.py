@@ -0,0 +1,132 @@
+"""
+Atom picking for Auraeon Crystal Lattice Simulator.
+
+AtomPicker projects the atom positions to screen pixels once per view
+change (through the 3D axes' projection matrix when there is one) and
+bins the projected points into a uniform screen grid sorted by cell key.
+A click only looks at the few grid cells around the cursor, found with a
+binary search, so picking stays interactive for very large lattices. When
+several atoms overlap under the cursor, the one nearest the viewer wins.
+"""
+
+import numpy as np
+from mpl_toolkits.mplot3d import proj3d
+
+
+class AtomPicker:
+    """Finds the atom under a mouse click on one axes."""
+
+    def __init__(self, ax, radius_px=8.0):
+        self.ax = ax
+        self.radius_px = radius_px
+        self.coords = None
+        self.ids = None      # atom index reported for each entry of coords
+        self._screen = None  # (N, 2) pixel positions for the current view
+        self._depth = None   # (N,) distance from the viewer, smaller is closer
+        self._keys = None    # grid cell key of every atom, sorted
+        self._order = None   # atom index for each entry of _keys
+        self._cell_px = None
+        self._draw_cid = None
+
+    def connect(self, canvas):
+        """Re-projects lazily after every redraw, since any redraw may have moved the camera."""
+        self._draw_cid = canvas.mpl_connect("draw_event", lambda event: self.invalidate())
+
+    def set_atoms(self, coords, ids=None):
+        """
+        Sets the (N, 2) or (N, 3) atom positions that can be picked.
+
+        ids, if given, holds the index to report for each position (e.g. when
+        only some atoms are drawn); otherwise positions report their own index.
+        """
+        self.coords = None if coords is None else np.asarray(coords, dtype=float)
+        self.ids = None if ids is None else np.asarray(ids)
+        self.invalidate()
+
+    def invalidate(self):
+        """Forgets the projection; the next pick re-projects."""
+        self._screen = None
+
+    def _project(self):
+        """Projects every atom to display pixels and rebuilds the screen grid."""
+        coords = self.coords
+        if self.ax.name == "3d":
+            z = coords[:, 2] if coords.shape[1] > 2 else np.zeros(len(coords))
+            xs, ys, depth = proj3d.proj_transform(coords[:, 0], coords[:, 1], z, self.ax.get_proj())
+            screen = self.ax.transData.transform(np.column_stack((xs, ys)))
+        else:
+            screen = self.ax.transData.transform(coords[:, :2])
+            depth = np.zeros(len(coords))
+
+        # Grid cells as wide as the pick radius: hits lie in the 3x3 block around the cursor
+        cell_px = max(float(self.radius_px), 1.0)
+        cells = np.floor(screen / cell_px).astype(np.int64)
+        keys = self._cell_key(cells[:, 0], cells[:, 1])
+        order = np.argsort(keys, kind="stable")
+
+        self._screen = screen
+        self._depth = np.asarray(depth, dtype=float)
+        self._keys = keys[order]
+        self._order = order
+        self._cell_px = cell_px
+
+    @staticmethod
+    def _cell_key(cx, cy):
+        """Packs two grid cell coordinates into one sortable integer."""
+        return (np.asarray(cx, dtype=np.int64) << 32) + (np.asarray(cy, dtype=np.int64) + (1 << 31))
+
+    def candidates(self, x_px, y_px):
+        """Positions in coords drawn within radius_px of the display point (x_px, y_px)."""
+        if self.coords is None or len(self.coords) == 0:
+            return np.empty(0, dtype=np.intp)
+        if self._screen is None:
+            self._project()
+
+        cx = int(np.floor(x_px / self._cell_px))
+        cy = int(np.floor(y_px / self._cell_px))
+        found = []
+        for dx in (-1, 0, 1):
+            # The three cells of one grid column are adjacent in key order
+            lo = self._cell_key(cx + dx, cy - 1)
+            hi = self._cell_key(cx + dx, cy + 1)
+            start = np.searchsorted(self._keys, lo, side="left")
+            stop = np.searchsorted(self._keys, hi, side="right")
+            found.append(self._order[start:stop])
+        near = np.concatenate(found)
+
+        offsets = self._screen[near] - (x_px, y_px)
+        return near[np.einsum("ij,ij->i", offsets, offsets) <= self.radius_px ** 2]
+
+    def in_box(self, x0_px, y0_px, x1_px, y1_px):
+        """Indices of the atoms drawn inside the display rectangle with corners (x0, y0) and (x1, y1)."""
+        if self.coords is None or len(self.coords) == 0:
+            return np.empty(0, dtype=np.intp)
+        if self._screen is None:
+            self._project()
+
+        x0, x1 = sorted((x0_px, x1_px))
+        y0, y1 = sorted((y0_px, y1_px))
+        columns = np.arange(np.floor(x0 / self._cell_px), np.floor(x1 / self._cell_px) + 1, dtype=np.int64)
+        # One key range per grid column crossed by the box
+        starts = np.searchsorted(self._keys, self._cell_key(columns, int(np.floor(y0 / self._cell_px))), side="left")
+        stops = np.searchsorted(self._keys, self._cell_key(columns, int(np.floor(y1 / self._cell_px))), side="right")
+        if not len(columns) or (stops - starts).sum() == 0:
+            return np.empty(0, dtype=np.intp)
+        counts = stops - starts
+        entries = np.repeat(starts - np.cumsum(counts) + counts, counts) + np.arange(counts.sum())
+        near = self._order[entries]
+
+        x, y = self._screen[near].T
+        inside = np.sort(near[(x >= x0) & (x <= x1) & (y >= y0) & (y <= y1)])
+        return inside if self.ids is None else self.ids[inside]
+
+    def pick(self, x_px, y_px):
+        """Returns the index of the front-most atom under the cursor, or -1."""
+        near = self.candidates(x_px, y_px)
+        if len(near) == 0:
+            return -1
+        # Nearest to the viewer first, then nearest to the cursor
+        offsets = self._screen[near] - (x_px, y_px)
+        on_screen = np.einsum("ij,ij->i", offsets, offsets)
+        best = near[np.lexsort((on_screen, self._depth[near]))[0]]
+        return int(best if self.ids is None else self.ids[best])
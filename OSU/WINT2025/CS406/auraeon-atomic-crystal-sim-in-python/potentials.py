@@ -0,0 +1,205 @@
+"""
+Pair potentials for Auraeon Crystal Lattice Simulator.
+
+PairPotential evaluates Lennard-Jones or Morse energies and forces for a
+set of elements, with parameters per element pair from
+elements.PAIR_POTENTIALS. Neighbors within the cutoff come from a cell
+list a block of atoms at a time (neighbors.iter_neighbor_pairs) and every
+pair term is computed on whole arrays, so time and memory grow linearly
+with the number of atoms. Periodic boundaries use the minimum image.
+Energies are in eV, lengths in Angstrom and forces in eV/Angstrom.
+"""
+
+from dataclasses import dataclass
+
+import numpy as np
+
+from crystal import supercell_matrix
+from elements import PAIR_POTENTIALS
+from neighbors import iter_neighbor_pairs
+
+# Atoms whose neighbor pairs are evaluated together
+BLOCK_ATOMS = 1 << 16
+
+
+def lennard_jones(r, epsilon, sigma):
+    """Lennard-Jones energy and force magnitude (-dE/dr) at distances r."""
+    s6 = (sigma / r) ** 6
+    s12 = s6 * s6
+    return 4.0 * epsilon * (s12 - s6), 24.0 * epsilon * (2.0 * s12 - s6) / r
+
+
+def morse(r, depth, alpha, r0):
+    """Morse energy and force magnitude (-dE/dr) at distances r."""
+    decay = np.exp(-alpha * (r - r0))
+    return depth * (decay * decay - 2.0 * decay), 2.0 * alpha * depth * (decay * decay - decay)
+
+
+# Name -> (function, parameter names)
+POTENTIALS = {
+    "lj": (lennard_jones, ("epsilon", "sigma")),
+    "morse": (morse, ("depth", "alpha", "r0")),
+}
+
+
+def _like_parameters(symbol, kind):
+    """Parameters of the symbol-symbol pair, converted from the other potential if only that one is listed."""
+    listed = PAIR_POTENTIALS.get((symbol, symbol), {})
+    if kind in listed:
+        return dict(listed[kind])
+    # Match the well: same depth and minimum, and for Morse the same curvature
+    if kind == "lj" and "morse" in listed:
+        well = listed["morse"]
+        return {"epsilon": well["depth"], "sigma": well["r0"] / 2 ** (1 / 6)}
+    if kind == "morse" and "lj" in listed:
+        well = listed["lj"]
+        r0 = 2 ** (1 / 6) * well["sigma"]
+        return {"depth": well["epsilon"], "alpha": 6.0 / r0, "r0": r0}
+    raise ValueError(f"No pair potential parameters for {symbol}-{symbol}")
+
+
+def pair_parameters(a, b, kind):
+    """
+    Parameters of potential kind for elements a and b.
+
+    Listed pairs are used as they are. Other unlike pairs are mixed from
+    the two like pairs: geometric mean of the well depths and arithmetic
+    mean of the lengths (Lorentz-Berthelot for Lennard-Jones).
+    """
+    if kind not in POTENTIALS:
+        raise ValueError(f"Unknown potential: {kind} (expected one of {', '.join(POTENTIALS)})")
+    listed = PAIR_POTENTIALS.get((a, b)) or PAIR_POTENTIALS.get((b, a)) or {}
+    if kind in listed:
+        return dict(listed[kind])
+    first, second = _like_parameters(a, kind), _like_parameters(b, kind)
+    depth = "epsilon" if kind == "lj" else "depth"
+    mixed = {name: (first[name] + second[name]) / 2 for name in first}
+    mixed[depth] = np.sqrt(first[depth] * second[depth])
+    return mixed
+
+
+@dataclass
+class PairEnergy:
+    """
+    Energy and forces of one configuration.
+
+    per_atom splits every pair energy evenly between its two atoms, so it
+    sums to energy. forces has one row per atom; num_pairs counts the
+    (unordered) pairs within the cutoff.
+    """
+    energy: float
+    per_atom: np.ndarray
+    forces: np.ndarray
+    num_pairs: int
+
+
+class PairPotential:
+    """Lennard-Jones ("lj") or Morse ("morse") pair potential between the elements in symbols."""
+
+    def __init__(self, symbols, kind="lj", cutoff=None, shift=True):
+        """
+        Species codes index into symbols. cutoff defaults to 2.5 sigma
+        (Lennard-Jones) or r0 + 4 / alpha (Morse) of the widest pair. With
+        shift, pair energies are offset to be zero at the cutoff, so the
+        energy does not jump as atoms cross it.
+        """
+        if kind not in POTENTIALS:
+            raise ValueError(f"Unknown potential: {kind} (expected one of {', '.join(POTENTIALS)})")
+        self.kind = kind
+        self.symbols = list(symbols)
+        function, names = POTENTIALS[kind]
+        # One (species, species) table per parameter
+        num_species = len(self.symbols)
+        self.tables = {name: np.zeros((num_species, num_species)) for name in names}
+        for a, first in enumerate(self.symbols):
+            for b, second in enumerate(self.symbols):
+                for name, value in pair_parameters(first, second, kind).items():
+                    self.tables[name][a, b] = value
+
+        if cutoff is None:
+            if kind == "lj":
+                cutoff = 2.5 * self.tables["sigma"].max()
+            else:
+                cutoff = (self.tables["r0"] + 4.0 / self.tables["alpha"]).max()
+        self.cutoff = float(cutoff)
+        self.offset = np.zeros((num_species, num_species))
+        if shift:
+            self.offset = function(np.full((num_species, num_species), self.cutoff), **self.tables)[0]
+
+    def pair_terms(self, r, species_i, species_j):
+        """Pair energies and force magnitudes (-dE/dr) at distances r between atoms of the given species."""
+        function, names = POTENTIALS[self.kind]
+        if len(self.symbols) == 1:
+            energy, force = function(r, **{name: self.tables[name][0, 0] for name in names})
+            return energy - self.offset[0, 0], force
+        pair = species_i.astype(np.intp) * len(self.symbols) + species_j
+        energy, force = function(r, **{name: self.tables[name].ravel()[pair] for name in names})
+        return energy - self.offset.ravel()[pair], force
+
+    def evaluate(self, coords, species, box=None, pbc=None, block_atoms=BLOCK_ATOMS):
+        """
+        Energy and forces of atoms at coords (N, D) with species codes.
+
+        With box (rows are the supercell edges) and pbc, distances follow
+        periodic boundaries; the cutoff must then be under half of every
+        periodic box width.
+        """
+        coords = np.asarray(coords, dtype=float)
+        species = np.asarray(species)
+        num_atoms, dim = coords.shape
+        per_atom = np.zeros(num_atoms)
+        forces = np.zeros((num_atoms, dim))
+        num_pairs = 0
+        for i, j, diff in iter_neighbor_pairs(coords, self.cutoff, box, pbc, block_atoms):
+            r = np.sqrt(np.einsum("ij,ij->i", diff, diff))
+            energy, force = self.pair_terms(r, species[i], species[j])
+            # Every pair is listed from both ends: i takes half the energy and its own force
+            per_atom += 0.5 * np.bincount(i, weights=energy, minlength=num_atoms)
+            scale = force / r
+            for axis in range(dim):
+                forces[:, axis] += np.bincount(i, weights=diff[:, axis] * scale, minlength=num_atoms)
+            num_pairs += len(i)
+        return PairEnergy(float(per_atom.sum()), per_atom, forces, num_pairs // 2)
+
+    def evaluate_list(self, coords, species, neighbors):
+        """
+        Like evaluate, over the pairs of a neighbors.VerletList already
+        updated for coords (listed pairs beyond the cutoff contribute nothing).
+        Each pair is computed once and its force applied to both atoms.
+        """
+        coords = np.asarray(coords, dtype=float)
+        num_atoms, dim = coords.shape
+        diff = neighbors.vectors(coords)
+        r_sq = np.einsum("ij,ij->i", diff, diff)
+        inside = r_sq <= self.cutoff ** 2
+        r = np.sqrt(r_sq)
+        energy, force = self.pair_terms(r, species[neighbors.i], species[neighbors.j])
+        energy = np.where(inside, energy, 0.0)
+        scale = np.where(inside, force / r, 0.0)
+
+        per_atom = 0.5 * (np.bincount(neighbors.i, weights=energy, minlength=num_atoms)
+                          + np.bincount(neighbors.j, weights=energy, minlength=num_atoms))
+        forces = np.empty((num_atoms, dim))
+        for axis in range(dim):
+            pair_force = diff[:, axis] * scale
+            forces[:, axis] = (np.bincount(neighbors.i, weights=pair_force, minlength=num_atoms)
+                               - np.bincount(neighbors.j, weights=pair_force, minlength=num_atoms))
+        return PairEnergy(float(energy.sum()), per_atom, forces, int(inside.sum()))
+
+
+def crystal_energy(crystal, kind="lj", cutoff=None, periodic=None, block_atoms=BLOCK_ATOMS):
+    """
+    Pair potential energy and forces of a crystal's atoms.
+
+    periodic defaults to crystal.params.periodic; periodic crystals wrap
+    around the supercell along every lattice edge.
+    """
+    if periodic is None:
+        periodic = crystal.params.periodic
+    potential = PairPotential(crystal.symbols, kind, cutoff)
+    return potential.evaluate(
+        crystal.atom_positions(), crystal.atom_species(),
+        box=supercell_matrix(crystal.params),
+        pbc=(True, True, crystal.dim == 3) if periodic else None,
+        block_atoms=block_atoms
+    )
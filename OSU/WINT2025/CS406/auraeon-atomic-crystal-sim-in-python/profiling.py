@@ -0,0 +1,223 @@
+"""
+Per-stage timing for Auraeon Crystal Lattice Simulator.
+
+The refresh pipeline is marked with stages (lattice, rotate, defects,
+bonds, colors, scene, canvas):
+
+    with PROFILER.stage("bonds") as record:
+        bonds = find_bonds(...)
+        record.update(bonds=len(bonds), bytes=bonds.nbytes)
+
+Each stage records its wall time plus whatever counts the code adds:
+atoms, bonds and bytes (the size of the arrays it allocated). Stages
+belong to a Frame, one per refresh or redraw. A frame is started with
+begin(), made current on a thread with activate() (it can move from the
+build worker to the Tk thread with the built crystal) and handed to every
+sink by finish(). A sink is any callable(frame): LogSink, CSVSink and
+RingBuffer are provided, and hud.PerformanceHUD shows the last frame in the
+window.
+
+The profiler is off by default. Then stage() returns one shared context
+that does nothing, so instrumented code pays for a method call and a
+with statement.
+"""
+
+import collections
+import csv
+import itertools
+import logging
+import threading
+import time
+
+STAGE_FIELDS = ("stage", "seconds", "atoms", "bonds", "bytes")
+
+
+class Frame:
+    """The stages of one refresh or redraw, in the order they finished."""
+
+    _ids = itertools.count(1)
+
+    def __init__(self, label):
+        self.id = next(self._ids)
+        self.label = label
+        self.started = time.time()
+        self.stages = []  # one dict per stage, keyed by STAGE_FIELDS
+
+    @property
+    def seconds(self):
+        """Total time of the recorded stages."""
+        return sum(stage["seconds"] for stage in self.stages)
+
+    def summary(self):
+        """One line per stage plus the total, e.g. for a log or the HUD."""
+        lines = []
+        for stage in self.stages:
+            counts = [f"{stage[name]} {name}" for name in ("atoms", "bonds") if stage.get(name) is not None]
+            if stage.get("bytes"):
+                counts.append(f"{stage['bytes'] / 2**20:.1f} MiB")
+            detail = f"  ({', '.join(counts)})" if counts else ""
+            lines.append(f"{stage['stage']:<8} {stage['seconds'] * 1000:8.1f} ms{detail}")
+        lines.append(f"{'total':<8} {self.seconds * 1000:8.1f} ms")
+        return "\n".join(lines)
+
+
+class _Stage:
+    """Times one stage into the frame that is current when it starts."""
+
+    __slots__ = ("frame", "record", "start")
+
+    def __init__(self, frame, name):
+        self.frame = frame
+        self.record = {"stage": name, "seconds": 0.0, "atoms": None, "bonds": None, "bytes": None}
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self.record
+
+    def __exit__(self, *exc):
+        self.record["seconds"] = time.perf_counter() - self.start
+        self.frame.stages.append(self.record)
+
+
+class _NullStage:
+    """What stage() returns while nothing is recorded; counts written to it are dropped."""
+
+    __slots__ = ("record",)
+
+    def __init__(self):
+        self.record = {}
+
+    def __enter__(self):
+        return self.record
+
+    def __exit__(self, *exc):
+        pass
+
+
+_NULL_STAGE = _NullStage()
+
+
+class Profiler:
+    """Collects stage timings into frames and hands finished frames to the sinks."""
+
+    def __init__(self):
+        self.enabled = False
+        self.sinks = []
+        self._local = threading.local()
+
+    def enable(self, *sinks):
+        """Starts recording, adding sinks to the ones already attached."""
+        self.sinks.extend(sinks)
+        self.enabled = True
+
+    def disable(self):
+        """Stops recording; the sinks stay attached for the next enable()."""
+        self.enabled = False
+
+    def add_sink(self, sink):
+        self.sinks.append(sink)
+
+    def remove_sink(self, sink):
+        if sink in self.sinks:
+            self.sinks.remove(sink)
+
+    def begin(self, label):
+        """A new frame, or None while disabled (every method accepts None and does nothing)."""
+        return Frame(label) if self.enabled else None
+
+    def activate(self, frame):
+        """Context that makes frame this thread's current frame, so stages are recorded into it."""
+        return _Activation(self._local, frame)
+
+    def stage(self, name):
+        """Context timing stage name into the current frame; does nothing without one."""
+        if not self.enabled:
+            return _NULL_STAGE
+        frame = getattr(self._local, "frame", None)
+        return _NULL_STAGE if frame is None else _Stage(frame, name)
+
+    def finish(self, frame):
+        """Hands frame to every sink. Sinks run on the calling thread."""
+        if frame is None or not frame.stages:
+            return
+        for sink in list(self.sinks):
+            sink(frame)
+
+
+class _Activation:
+    __slots__ = ("local", "frame", "previous")
+
+    def __init__(self, local, frame):
+        self.local = local
+        self.frame = frame
+
+    def __enter__(self):
+        self.previous = getattr(self.local, "frame", None)
+        if self.frame is not None:
+            self.local.frame = self.frame
+        return self.frame
+
+    def __exit__(self, *exc):
+        self.local.frame = self.previous
+
+
+# The profiler the pipeline is instrumented with
+PROFILER = Profiler()
+
+
+# ==================== SINKS ====================
+class LogSink:
+    """Logs every frame as one line (stage times in ms) to a logging.Logger."""
+
+    def __init__(self, logger=None, level=logging.INFO):
+        self.logger = logger or logging.getLogger("auraeon.profile")
+        self.level = level
+
+    def __call__(self, frame):
+        stages = ", ".join(f"{stage['stage']} {stage['seconds'] * 1000:.1f}" for stage in frame.stages)
+        self.logger.log(self.level, "%s #%d: %.1f ms (%s)", frame.label, frame.id, frame.seconds * 1000, stages)
+
+
+class CSVSink:
+    """Appends one row per stage to a CSV file, with a header when the file is new."""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "a", newline="")
+        self._writer = csv.writer(self._file)
+        if self._file.tell() == 0:
+            self._writer.writerow(("frame", "label", "started") + STAGE_FIELDS)
+
+    def __call__(self, frame):
+        for stage in frame.stages:
+            row = [frame.id, frame.label, f"{frame.started:.6f}"]
+            row += ["" if stage.get(name) is None else stage[name] for name in STAGE_FIELDS]
+            self._writer.writerow(row)
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+class RingBuffer:
+    """Keeps the last capacity frames in memory."""
+
+    def __init__(self, capacity=256):
+        self.frames = collections.deque(maxlen=capacity)
+
+    def __call__(self, frame):
+        self.frames.append(frame)
+
+    def __len__(self):
+        return len(self.frames)
+
+    def last(self):
+        return self.frames[-1] if self.frames else None
+
+    def mean_seconds(self):
+        """Mean seconds of every stage over the kept frames, keyed by stage name."""
+        totals = collections.defaultdict(list)
+        for frame in self.frames:
+            for stage in frame.stages:
+                totals[stage["stage"]].append(stage["seconds"])
+        return {name: sum(values) / len(values) for name, values in totals.items()}
@@ -0,0 +1,231 @@
+"""
+Radial distribution functions for Auraeon Crystal Lattice Simulator.
+
+radial_distribution() computes the total g(r) of a crystal and the partial
+g_ab(r) of every pair of species (element 1, element 2, dopants). Pair
+distances are never stored: atoms are binned into a cell list of cells
+r_max / SUBDIVISIONS wide, and a fixed-size block of atoms at a time is
+measured against the cells within r_max and histogrammed straight away,
+so memory stays proportional to the block rather than N^2. Blocks can be
+spread over a process pool. Periodic boundaries use ghost images (minimum
+image). Memory-mapped crystals are histogrammed one slab of cell layers
+at a time (outofcore.mapped_pair_histogram).
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+
+import numpy as np
+
+from crystal import supercell_matrix
+from neighbors import CellList, coordinate_axes, periodic_images, stencil_offsets
+
+# Atoms measured against their neighbors per block
+BLOCK_ATOMS = 1 << 15
+# Cells per r_max along each axis: finer cells wrap the search sphere more tightly
+SUBDIVISIONS = 2
+
+
+@dataclass
+class RDF:
+    """
+    Histogrammed g(r) of a crystal.
+
+    edges are the num_bins + 1 bin edges and r the bin centers. counts[a, b]
+    holds the number of ordered pairs (atom of species a, atom of species b)
+    per bin, and partials[a, b] the normalized g_ab(r).
+    """
+    edges: np.ndarray
+    r: np.ndarray
+    g: np.ndarray
+    partials: np.ndarray
+    counts: np.ndarray
+    symbols: list
+
+    def partial(self, a, b):
+        """g_ab(r) for two element symbols."""
+        return self.partials[self.symbols.index(a), self.symbols.index(b)]
+
+    def as_arrays(self):
+        """Plain arrays, e.g. for np.savez; partials are keyed 'g_Fe_C' and so on."""
+        arrays = {"r": self.r, "edges": self.edges, "g": self.g, "symbols": np.array(self.symbols)}
+        for a, first in enumerate(self.symbols):
+            for b, second in enumerate(self.symbols):
+                arrays[f"g_{first}_{second}"] = self.partials[a, b]
+        return arrays
+
+    def save(self, path):
+        """Writes the arrays to an .npz file, or to a .csv file with one column per curve."""
+        arrays = self.as_arrays()
+        if os.path.splitext(path)[1].lower() == ".csv":
+            columns = {name: values for name, values in arrays.items() if name not in ("edges", "symbols")}
+            np.savetxt(path, np.column_stack(list(columns.values())), delimiter=",",
+                       header=",".join(columns), comments="")
+        else:
+            np.savez(path, **arrays)
+
+
+# The _block_counts arguments every block of the current histogram shares
+_WORKER = {}
+
+
+def _init_worker(points, point_species, is_real, num_species, r_max, num_bins, subdivisions):
+    cells = CellList(points, r_max / subdivisions, pad=subdivisions)
+    stencil = stencil_offsets(points.shape[1], subdivisions)
+    axes = coordinate_axes(points)
+    _WORKER["args"] = (cells, stencil, axes, point_species, is_real, num_species, r_max, num_bins)
+
+
+def _worker_block(start, stop):
+    return _block_counts(*_WORKER["args"], start, stop)
+
+
+def _block_counts(cells, stencil, axes, species, is_real, num_species, r_max, num_bins, start, stop):
+    """
+    Histogram of the pairs that points start..stop form with the points in
+    their own cell and the stencil's cells. axes holds the point coordinates
+    one axis per array.
+
+    Each unordered pair is found once and counted in both directions, but a
+    direction only counts when it starts at a real atom (is_real, None when
+    there are no ghosts), so pairs through periodic ghosts add up to the
+    minimum-image ordered pairs. Returns a flat count array; pair (a, b) at
+    bin k is entry (a * num_species + b) * num_bins + k.
+    """
+    points = np.arange(start, stop)
+    counts = np.zeros(num_species * num_species * num_bins, dtype=np.int64)
+    scale = num_bins / r_max
+    for offset in [None] + list(stencil):
+        i, j = cells.candidates(points, offset)
+        if offset is None:
+            # Same-cell pairs are seen from both points, keep one
+            keep = i < j
+            i, j = i[keep], j[keep]
+        dist_sq = np.zeros(len(i))
+        for axis in axes:
+            diff = axis[i] - axis[j]
+            dist_sq += diff * diff
+        keep = dist_sq < r_max ** 2
+        i, j = i[keep], j[keep]
+        bins = np.minimum((np.sqrt(dist_sq[keep]) * scale).astype(np.int64), num_bins - 1)
+        species_i = species[i].astype(np.int64)
+        species_j = species[j].astype(np.int64)
+        forward = (species_i * num_species + species_j) * num_bins + bins
+        backward = (species_j * num_species + species_i) * num_bins + bins
+        if is_real is not None:
+            forward, backward = forward[is_real[i]], backward[is_real[j]]
+        counts += np.bincount(forward, minlength=len(counts))
+        counts += np.bincount(backward, minlength=len(counts))
+    return counts
+
+
+def point_histogram(points, species, num_species, r_max, num_bins=200, counted=None,
+                    block_atoms=BLOCK_ATOMS, workers=None, subdivisions=SUBDIVISIONS):
+    """
+    Counts ordered pairs of points closer than r_max by species pair and distance bin.
+
+    Unlike pair_histogram the points are taken as they are (ghost images
+    included), and a pair (i, j) only counts when counted[i] is True
+    (every point counts when counted is None). workers > 1 spreads the
+    blocks over that many processes.
+    Returns a (num_species, num_species, num_bins) int64 array.
+    """
+    points = np.asarray(points, dtype=float)
+    species = np.asarray(species)
+    if len(points) == 0:
+        return np.zeros((num_species, num_species, num_bins), dtype=np.int64)
+
+    # Store points cell by cell, so each block and each neighbor cell is a compact memory range
+    order = CellList(points, r_max / subdivisions).order
+    points, species = points[order], species[order]
+    if counted is not None:
+        counted = np.asarray(counted, dtype=bool)[order]
+
+    num_points = len(points)
+    blocks = [(start, min(start + block_atoms, num_points)) for start in range(0, num_points, block_atoms)]
+    setup = (points, species, counted, num_species, r_max, num_bins, subdivisions)
+    if workers is not None and workers > 1 and len(blocks) > 1:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=setup) as pool:
+            starts, stops = zip(*blocks)
+            counts = sum(pool.map(_worker_block, starts, stops))
+    else:
+        _init_worker(*setup)
+        try:
+            counts = sum(_worker_block(start, stop) for start, stop in blocks)
+        finally:
+            _WORKER.clear()
+    return counts.reshape(num_species, num_species, num_bins)
+
+
+def pair_histogram(coords, species, num_species, r_max, num_bins=200, box=None, pbc=None,
+                   block_atoms=BLOCK_ATOMS, workers=None, subdivisions=SUBDIVISIONS):
+    """
+    Counts ordered pairs (i, j), i != j, closer than r_max by species pair and distance bin.
+
+    coords is (N, D) and species holds a code below num_species per atom.
+    With box and pbc the distances follow periodic boundaries. workers > 1
+    spreads the blocks over that many processes.
+    Returns a (num_species, num_species, num_bins) int64 array.
+    """
+    coords = np.asarray(coords, dtype=float)
+    species = np.asarray(species)
+    num_atoms = len(coords)
+    if box is not None and pbc is not None and np.any(pbc) and num_atoms:
+        points, owner = periodic_images(coords, r_max, box, pbc)
+    else:
+        points, owner = coords, np.arange(num_atoms)
+    counted = np.arange(len(points)) < num_atoms if len(points) > num_atoms else None  # None: no ghosts
+    return point_histogram(points, species[owner], num_species, r_max, num_bins, counted,
+                           block_atoms, workers, subdivisions)
+
+
+def radial_distribution(crystal, r_max, num_bins=200, periodic=None, block_atoms=BLOCK_ATOMS, workers=None,
+                        subdivisions=SUBDIVISIONS):
+    """
+    Total and partial radial distribution functions of a crystal's atoms.
+
+    Normalization uses the supercell area (2D) or volume (3D), so g(r)
+    tends to 1 at large r for periodic crystals; without periodic
+    boundaries it falls off as r approaches the crystal size. periodic
+    defaults to crystal.params.periodic. Memory-mapped crystals (see
+    outofcore.py) are read one slab of cell layers at a time, so their
+    atoms are never all in memory at once.
+    """
+    params = crystal.params
+    dim = crystal.dim
+    if periodic is None:
+        periodic = params.periodic
+    box = supercell_matrix(params)
+    num_species = len(crystal.symbols)
+
+    if crystal.storage_dir is not None:
+        # Memory-mapped crystals are measured slab by slab, never loaded whole
+        from outofcore import mapped_pair_histogram
+        counts = mapped_pair_histogram(crystal, r_max, num_bins, periodic, block_atoms, workers, subdivisions)
+    else:
+        counts = pair_histogram(
+            crystal.atom_positions(), crystal.atom_species(), num_species, r_max, num_bins,
+            box=box, pbc=(True, True, dim == 3) if periodic else None,
+            block_atoms=block_atoms, workers=workers, subdivisions=subdivisions
+        )
+
+    edges = np.linspace(0.0, r_max, num_bins + 1)
+    if dim == 3:
+        shell = 4.0 / 3.0 * np.pi * np.diff(edges ** 3)
+    else:
+        shell = np.pi * np.diff(edges ** 2)
+    volume = abs(np.linalg.det(box[:dim, :dim]))
+
+    # g_ab(r) = counts_ab / (N_a * (N_b / V) * shell volume)
+    num_per_species = np.zeros(num_species)
+    for _, chunk_species in crystal.iter_atom_chunks():
+        num_per_species += np.bincount(chunk_species, minlength=num_species)
+    num_atoms = num_per_species.sum()
+    expected = np.outer(num_per_species, num_per_species)[:, :, None] / volume * shell
+    with np.errstate(divide="ignore", invalid="ignore"):
+        partials = np.where(expected > 0, counts / expected, 0.0)
+    total_expected = num_atoms ** 2 / volume * shell
+    g = counts.sum(axis=(0, 1)) / total_expected if num_atoms else np.zeros(num_bins)
+
+    return RDF(edges, (edges[:-1] + edges[1:]) / 2, g, partials, counts, list(crystal.symbols))
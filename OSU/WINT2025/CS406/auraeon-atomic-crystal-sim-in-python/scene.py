@@ -0,0 +1,109 @@
+"""
+Retained-mode scene for Auraeon Crystal Lattice Simulator.
+
+LatticeScene keeps handles to the atom scatter and the bond collection.
+Later draws change those artists in place (positions, colors, sizes, bond
+segments) instead of clearing the axes and rebuilding every artist; a full
+rebuild only happens when the number of atoms changes. The selection is
+drawn separately, by selection.SelectionOverlay.
+"""
+
+import numpy as np
+
+from visualization import (
+    draw_2d_bonds, draw_3d_bonds, draw_element_legend, plot_2d_lattice, plot_3d_lattice
+)
+
+
+class LatticeScene:
+    """Atom and bond artists on one axes, updated in place."""
+
+    def __init__(self, ax):
+        self.ax = ax
+        self.atoms = None       # scatter of every atom
+        self.bond_lines = None  # LineCollection / Line3DCollection of every bond
+        self.coords = None      # (N, D) coordinates currently drawn
+        self.rebuilds = 0
+        self.updates = 0
+
+    @property
+    def is_3d(self):
+        return self.ax.name == "3d"
+
+    @property
+    def num_atoms(self):
+        return 0 if self.coords is None else len(self.coords)
+
+    def _fit(self, coords):
+        """Pads or trims coordinates to the dimensionality of the axes."""
+        coords = np.asarray(coords, dtype=float)
+        dim = 3 if self.is_3d else 2
+        if coords.shape[1] == dim:
+            return coords
+        if coords.shape[1] > dim:
+            return coords[:, :dim]
+        return np.column_stack((coords, np.zeros((len(coords), dim - coords.shape[1]))))
+
+    def draw(self, coords, colors, sizes, bonds=None, title=None, elements="Unknown", element_colors=None):
+        """
+        Shows the given atoms and bonds.
+
+        bonds is an (M, 2) index array into coords. Artists are updated in
+        place when the atom count is unchanged, otherwise they are rebuilt.
+        """
+        coords = self._fit(coords)
+        if bonds is None:
+            bonds = np.empty((0, 2), dtype=np.int32)
+
+        if self.atoms is None or len(coords) != self.num_atoms:
+            self._rebuild(coords, colors, sizes, bonds, elements, element_colors)
+        else:
+            self._update(coords, colors, sizes, bonds, elements, element_colors)
+        self.coords = coords
+
+        if title is not None:
+            self.ax.set_title(title)
+
+    def _rebuild(self, coords, colors, sizes, bonds, elements, element_colors):
+        """Clears the axes and creates fresh artists."""
+        self.ax.clear()
+        if self.is_3d:
+            self.atoms, self.bond_lines = plot_3d_lattice(
+                self.ax, coords[:, 0], coords[:, 1], coords[:, 2], None, None, None,
+                colors=colors, marker_sizes=sizes, elements=elements,
+                element_colors=element_colors, bonds=bonds
+            )
+        else:
+            self.atoms, self.bond_lines = plot_2d_lattice(
+                self.ax, coords[:, 0], coords[:, 1], None, None,
+                colors=colors, marker_sizes=sizes, elements=elements,
+                element_colors=element_colors, bonds=bonds
+            )
+        self.rebuilds += 1
+
+    def _update(self, coords, colors, sizes, bonds, elements, element_colors):
+        """Applies changes to the existing artists."""
+        moved = self.coords is None or not np.array_equal(coords, self.coords)
+        if moved:
+            if self.is_3d:
+                self.atoms._offsets3d = (coords[:, 0], coords[:, 1], coords[:, 2])
+                self.ax.auto_scale_xyz(coords[:, 0], coords[:, 1], coords[:, 2], had_data=False)
+            else:
+                self.atoms.set_offsets(coords)
+                self.ax.ignore_existing_data_limits = True
+                self.ax.update_datalim(coords)
+                self.ax.autoscale_view()
+
+        self.atoms.set_facecolors(colors)
+        self.atoms.set_sizes(np.broadcast_to(sizes, (len(coords),)))
+
+        if self.bond_lines is not None:
+            self.bond_lines.set_segments(coords[bonds])
+        elif len(bonds):
+            if self.is_3d:
+                self.bond_lines = draw_3d_bonds(self.ax, coords[:, 0], coords[:, 1], coords[:, 2], None, bonds)
+            else:
+                self.bond_lines = draw_2d_bonds(self.ax, coords[:, 0], coords[:, 1], None, bonds)
+
+        draw_element_legend(self.ax, elements, element_colors)
+        self.updates += 1
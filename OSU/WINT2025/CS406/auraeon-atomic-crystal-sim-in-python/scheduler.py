@@ -0,0 +1,103 @@
+"""
+Coalescing refresh scheduler for Auraeon Crystal Lattice Simulator.
+
+Slider drags fire dozens of change events per second. The scheduler keeps
+only the latest parameter snapshot, waits for the events to settle, and
+runs the expensive work (lattice generation, defects, neighbor search) on
+a worker thread. Results of jobs that were superseded while running are
+dropped, and only the final drawing step runs back on the Tk main thread.
+"""
+
+import queue
+from concurrent.futures import ThreadPoolExecutor
+
+
+class RefreshScheduler:
+    """Debounces refresh requests and runs the heavy work off the Tk main thread."""
+
+    def __init__(self, root, compute, apply, delay_ms=50, poll_ms=15):
+        """
+        root: the Tk root used for timers (root.after).
+        compute(snapshot, is_stale): runs on the worker thread and returns a
+            result, or None if it noticed is_stale() and gave up early.
+        apply(result): runs on the Tk main thread with the newest result.
+        """
+        self.root = root
+        self.compute = compute
+        self.apply = apply
+        self.delay_ms = delay_ms
+        self.poll_ms = poll_ms
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="auraeon-refresh")
+        self._results = queue.Queue()
+        self._snapshot = None
+        self._generation = 0
+        self._future = None
+        self._timer_id = None
+        self._poll_id = None
+
+    def request(self, snapshot):
+        """Records the latest parameter snapshot and (re)starts the debounce timer."""
+        self._snapshot = snapshot
+        self._generation += 1
+        if self._timer_id is not None:
+            self.root.after_cancel(self._timer_id)
+        self._timer_id = self.root.after(self.delay_ms, self._dispatch)
+
+    def shutdown(self):
+        """Stops timers and drops any job that has not started yet."""
+        if self._timer_id is not None:
+            self.root.after_cancel(self._timer_id)
+            self._timer_id = None
+        if self._poll_id is not None:
+            self.root.after_cancel(self._poll_id)
+            self._poll_id = None
+        self._generation += 1  # marks a running job as stale
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _dispatch(self):
+        """Hands the newest snapshot to the worker thread."""
+        self._timer_id = None
+        generation = self._generation
+
+        # A queued job that has not started yet is already out of date
+        if self._future is not None:
+            self._future.cancel()
+
+        def is_stale():
+            return generation != self._generation
+
+        self._future = self._executor.submit(self._run, generation, self._snapshot, is_stale)
+        if self._poll_id is None:
+            self._poll_id = self.root.after(self.poll_ms, self._poll)
+
+    def _run(self, generation, snapshot, is_stale):
+        """Worker thread body: computes and queues the result for the main thread."""
+        try:
+            result = self.compute(snapshot, is_stale)
+        except Exception as error:
+            self._results.put((generation, None, error))
+        else:
+            self._results.put((generation, result, None))
+
+    def _poll(self):
+        """Main thread: applies the newest finished result and drops stale ones."""
+        self._poll_id = None
+        newest = None
+        while True:
+            try:
+                item = self._results.get_nowait()
+            except queue.Empty:
+                break
+            if item[0] == self._generation:
+                newest = item
+
+        if newest is not None:
+            _, result, error = newest
+            if error is not None:
+                self.root.report_callback_exception(type(error), error, error.__traceback__)
+            elif result is not None:
+                self.apply(result)
+
+        # Keep polling while a job is still queued or running
+        if (self._future is not None and not self._future.done()) or not self._results.empty():
+            self._poll_id = self.root.after(self.poll_ms, self._poll)
@@ -0,0 +1,186 @@
+"""
+Selection overlay for Auraeon Crystal Lattice Simulator.
+
+SelectionOverlay keeps the selected atoms as a set of indices into the drawn
+atoms and shows them with a persistent ring artist and a text readout
+(species, position, coordination). Both artists are animated, so they are
+left out of normal redraws: after every full draw the overlay saves the
+rendered plot as a background, and a selection change only restores that
+background and redraws the overlay on top (blitting). Selecting atoms never
+touches the crystal or the lattice artists.
+
+Click selects one atom, shift-click adds or removes an atom, and a
+control-drag selects every atom inside the dragged box.
+"""
+
+import numpy as np
+from matplotlib.patches import Rectangle
+from matplotlib.transforms import IdentityTransform
+
+_RING_STYLE = dict(s=250, facecolors='none', edgecolors='red', linewidths=2)
+
+
+class SelectionOverlay:
+    """Selected atoms, their highlight ring and info readout on one axes."""
+
+    def __init__(self, ax, picker):
+        self.ax = ax
+        self.picker = picker  # AtomPicker over the same atoms
+        self.selected = np.empty(0, dtype=np.intp)
+        self.coords = None
+        self.species = None
+        self.symbols = []
+        self.coordination = None
+        self.ring = None     # scatter around every selected atom
+        self.readout = None  # text describing the selection
+        self.box = None      # rectangle shown while box-selecting
+        self._box_start = None
+        self._background = None
+        self._canvas = None
+
+    @property
+    def is_3d(self):
+        return self.ax.name == "3d"
+
+    def connect(self, canvas):
+        """Hooks the overlay to the canvas's draw and mouse events."""
+        self._canvas = canvas
+        canvas.mpl_connect("draw_event", self._on_draw)
+        canvas.mpl_connect("button_press_event", self._on_press)
+        canvas.mpl_connect("motion_notify_event", self._on_motion)
+        canvas.mpl_connect("button_release_event", self._on_release)
+
+    def set_atoms(self, coords, species, symbols, coordination=None, same_atoms=False):
+        """
+        Sets the atoms that can be selected.
+
+        species holds a code into symbols for every atom and coordination
+        the number of bonds of every atom (None if bonds were not searched).
+        The selection is kept only with same_atoms, when the atoms are the
+        ones already set (e.g. a redraw with new colors). Any other set of
+        atoms clears it, since the same indices may now be other atoms.
+        """
+        self.coords = np.asarray(coords, dtype=float)
+        self.species = species
+        self.symbols = list(symbols)
+        self.coordination = coordination
+        if same_atoms:
+            self.selected = self.selected[self.selected < len(self.coords)]
+        else:
+            self.selected = np.empty(0, dtype=np.intp)
+
+    def select(self, indices, add=False):
+        """Selects indices (replacing the selection unless add) and blits the overlay."""
+        indices = np.atleast_1d(np.asarray(indices, dtype=np.intp))
+        indices = indices[indices >= 0]
+        if add:
+            # Adding atoms that are already selected removes them
+            indices = np.setxor1d(self.selected, indices)
+        self.selected = np.unique(indices)
+        self.refresh()
+
+    def clear(self):
+        self.select([])
+
+    # ==================== EVENTS ====================
+    def _on_press(self, event):
+        if event.inaxes is not self.ax or event.button != 1:
+            return
+        if event.key == "control":
+            # Start a box; the view must not rotate while dragging it
+            self._box_start = (event.x, event.y)
+            if self.is_3d:
+                self.ax.disable_mouse_rotation()
+            return
+        self.select(self.picker.pick(event.x, event.y), add=event.key == "shift")
+
+    def _on_motion(self, event):
+        if self._box_start is None:
+            return
+        x0, y0 = self._box_start
+        if self.box is None:
+            self.box = Rectangle((0, 0), 0, 0, transform=IdentityTransform(), fill=False,
+                                 edgecolor='red', linestyle='--', animated=True)
+            self.ax.figure.add_artist(self.box)
+        self.box.set_bounds(min(x0, event.x), min(y0, event.y), abs(event.x - x0), abs(event.y - y0))
+        self.box.set_visible(True)
+        self.refresh()
+
+    def _on_release(self, event):
+        if self._box_start is None:
+            return
+        (x0, y0), self._box_start = self._box_start, None
+        if self.is_3d:
+            self.ax.mouse_init()
+        if self.box is not None:
+            self.box.set_visible(False)
+        self.select(self.picker.in_box(x0, y0, event.x, event.y))
+
+    def _on_draw(self, event):
+        """Saves the freshly drawn plot, then puts the overlay back on top."""
+        self._background = self._canvas.copy_from_bbox(self.ax.figure.bbox)
+        self._draw_overlay()
+
+    # ==================== DRAWING ====================
+    def _ensure_artists(self):
+        """(Re)creates the overlay artists, e.g. after the axes were cleared."""
+        if self.ring is None or self.ring.axes is None:
+            if self.is_3d:
+                self.ring = self.ax.scatter([], [], [], depthshade=False, animated=True, **_RING_STYLE)
+            else:
+                self.ring = self.ax.scatter([], [], animated=True, **_RING_STYLE)
+        if self.readout is None or self.readout.axes is None:
+            text = self.ax.text2D if self.is_3d else self.ax.text
+            self.readout = text(0.02, 0.98, "", transform=self.ax.transAxes, va='top', family='monospace',
+                                animated=True, bbox=dict(facecolor='white', alpha=0.8, edgecolor='none'))
+
+    def describe(self):
+        """Readout text for the current selection."""
+        if self.coords is None or len(self.selected) == 0:
+            return ""
+        codes = np.asarray(self.species)[self.selected]
+        if len(self.selected) == 1:
+            index = self.selected[0]
+            position = ", ".join(f"{v:.3f}" for v in self.coords[index])
+            lines = [f"Atom {index}: {self.symbols[codes[0]]}", f"Position: ({position})"]
+            if self.coordination is not None:
+                lines.append(f"Coordination: {self.coordination[index]}")
+            return "\n".join(lines)
+
+        counts = np.bincount(codes, minlength=len(self.symbols))
+        composition = ", ".join(f"{self.symbols[code]} {counts[code]}" for code in np.flatnonzero(counts))
+        lines = [f"{len(self.selected)} atoms: {composition}"]
+        if self.coordination is not None:
+            lines.append(f"Mean coordination: {self.coordination[self.selected].mean():.2f}")
+        return "\n".join(lines)
+
+    def _draw_overlay(self):
+        """Draws the ring and readout for the current selection onto the canvas."""
+        if self.coords is None:
+            return
+        self._ensure_artists()
+        points = self.coords[self.selected]
+        if self.is_3d:
+            padded = np.column_stack((points, np.zeros((len(points), 3 - points.shape[1]))))[:, :3]
+            self.ring._offsets3d = tuple(padded.T)
+            self.ring.do_3d_projection()
+        else:
+            self.ring.set_offsets(points[:, :2].reshape(-1, 2))
+        self.readout.set_text(self.describe())
+        self.readout.set_visible(len(self.selected) > 0)
+
+        self.ax.draw_artist(self.ring)
+        self.ax.draw_artist(self.readout)
+        if self.box is not None and self.box.get_visible():
+            self.ax.figure.draw_artist(self.box)
+
+    def refresh(self):
+        """Shows the current selection by redrawing only the overlay over the saved background."""
+        if self._canvas is None:
+            return
+        if self._background is None:
+            self._canvas.draw_idle()  # no background yet, the draw callback paints the overlay
+            return
+        self._canvas.restore_region(self._background)
+        self._draw_overlay()
+        self._canvas.blit(self.ax.figure.bbox)
@@ -0,0 +1,33 @@
+"""
+Shared-memory arrays for the process pools of Auraeon Crystal Lattice Simulator.
+
+share_array() copies an array into a named shared memory block once, and
+worker processes map it with attach_array() instead of receiving a pickled
+copy with every task. Used by sweep.py and animate.py.
+"""
+
+from multiprocessing import shared_memory
+
+import numpy as np
+
+
+def share_array(array):
+    """Copies array into a new shared memory block. Returns (block, descriptor)."""
+    array = np.ascontiguousarray(array)
+    block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+    np.ndarray(array.shape, array.dtype, buffer=block.buf)[...] = array
+    return block, (block.name, array.shape, array.dtype.str)
+
+
+def attach_array(descriptor):
+    """Maps a block shared by share_array. Returns (block, array); the block must outlive the array."""
+    name, shape, dtype = descriptor
+    block = shared_memory.SharedMemory(name=name)
+    return block, np.ndarray(shape, np.dtype(dtype), buffer=block.buf)
+
+
+def release(blocks):
+    """Closes and removes blocks created by share_array."""
+    for block in blocks:
+        block.close()
+        block.unlink()
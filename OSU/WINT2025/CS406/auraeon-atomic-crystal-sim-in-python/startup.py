@@ -0,0 +1,101 @@
+"""
+Fast startup for Auraeon Crystal Lattice Simulator.
+
+The GUI shows its window before the plotting stack is loaded: main.py
+builds the control panel right away, PlottingLoader imports matplotlib,
+its Tk backend, the 3D toolkit and the modules drawn on them on a
+background thread, and the first lattice is built on the refresh worker at
+the same time. The viewer is created, and the first lattice drawn, once
+both are ready. StartupTimer records when each of these steps finished.
+
+The headless modules (lattice, elements, crystal and the analysis modules)
+never import the plotting stack; plotting_modules() lists what has been
+imported so far, to check that.
+"""
+
+import sys
+import threading
+import time
+
+# Top-level packages of the plotting stack
+PLOTTING_PACKAGES = ("matplotlib", "mpl_toolkits", "PIL")
+
+
+def plotting_modules():
+    """Names of the plotting stack modules imported so far."""
+    return sorted(name for name in sys.modules if name.split(".")[0] in PLOTTING_PACKAGES)
+
+
+class StartupTimer:
+    """Named startup steps and the seconds from start to the end of each."""
+
+    def __init__(self, start=None):
+        self.start = time.perf_counter() if start is None else start
+        self.marks = {}
+
+    def mark(self, name):
+        """Records that step name has just finished (only its first finish counts)."""
+        self.marks.setdefault(name, time.perf_counter() - self.start)
+        return self.marks[name]
+
+    def report(self):
+        """One line with every step in the order they finished, e.g. for printing."""
+        steps = sorted(self.marks.items(), key=lambda item: item[1])
+        return "Startup: " + ", ".join(f"{name} {seconds:.3f} s" for name, seconds in steps)
+
+
+def import_plotting():
+    """
+    Imports the plotting stack and the GUI modules that draw with it.
+    Returns {name: object} with everything main.py needs to build the viewer.
+    """
+    import matplotlib.pyplot as plt
+    from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+    from matplotlib.colors import to_rgba
+    import mpl_toolkits.mplot3d  # registers the 3d projection
+
+    from lod import LODRenderer
+    from picking import AtomPicker
+    from scene import LatticeScene
+    from selection import SelectionOverlay
+
+    return {
+        "plt": plt,
+        "FigureCanvasTkAgg": FigureCanvasTkAgg,
+        "to_rgba": to_rgba,
+        "LODRenderer": LODRenderer,
+        "AtomPicker": AtomPicker,
+        "LatticeScene": LatticeScene,
+        "SelectionOverlay": SelectionOverlay,
+    }
+
+
+class PlottingLoader:
+    """Runs import_plotting() on a daemon thread and hands the result to the Tk main thread."""
+
+    def __init__(self, root, on_ready, poll_ms=20):
+        """on_ready(modules) is called on the Tk main thread once the imports are done."""
+        self.root = root
+        self.on_ready = on_ready
+        self.poll_ms = poll_ms
+        self.modules = None
+        self.error = None
+        self._thread = threading.Thread(target=self._run, name="auraeon-imports", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        self.root.after(self.poll_ms, self._poll)
+
+    def _run(self):
+        try:
+            self.modules = import_plotting()
+        except Exception as error:
+            self.error = error
+
+    def _poll(self):
+        if self._thread.is_alive():
+            self.root.after(self.poll_ms, self._poll)
+        elif self.error is not None:
+            self.root.report_callback_exception(type(self.error), self.error, self.error.__traceback__)
+        else:
+            self.on_ready(self.modules)
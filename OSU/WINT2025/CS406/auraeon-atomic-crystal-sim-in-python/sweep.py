@@ -0,0 +1,280 @@
+"""
+Parameter sweeps for Auraeon Crystal Lattice Simulator.
+
+run_sweep() builds a crystal for every point of a parameter grid (see
+parameter_grid) on a process pool and reduces each one to summary metrics:
+density from the element masses, packing fraction from the radii,
+bond count and coordination statistics. Points that share a geometry
+(e.g. a sweep over vacancy or doping percentages) share one copy of the
+lattice and its bonds: the parent builds them once into shared memory and
+every worker maps them into its lattice and bond caches, so only the
+defect pass is redone per point. Finished points are appended to a
+checkpoint file as they complete, so an interrupted sweep resumes where it
+stopped. Results come back as one columnar SweepTable.
+"""
+
+import csv
+import dataclasses
+import itertools
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from crystal import (
+    BOND_CACHE, LATTICE_CACHE, CrystalParams, bond_key, build_crystal, crystal_dim, geometry_key,
+    lattice_bonds, lattice_geometry, supercell_matrix
+)
+from sharing import attach_array, release, share_array
+
+# Grams per atomic mass unit, and cubic centimeters per cubic Angstrom
+AMU_GRAMS = 1.66053906660e-24
+CM3_PER_A3 = 1e-24
+
+METRICS = (
+    "num_atoms", "num_vacancies", "num_bonds", "density", "packing_fraction",
+    "coordination_mean", "coordination_std", "coordination_min", "coordination_max", "seconds",
+)
+
+
+def parameter_grid(base=None, **axes):
+    """
+    Every combination of axes applied to base (default CrystalParams()).
+
+    Each keyword is a CrystalParams field with a list of values, e.g.
+    parameter_grid(a=[4.0, 5.0], vacancy_percent=[0, 5, 10]). Points are
+    ordered like itertools.product, the last axis varying fastest.
+    """
+    base = CrystalParams() if base is None else base
+    fields = {field.name for field in dataclasses.fields(CrystalParams)}
+    for name in axes:
+        if name not in fields:
+            raise ValueError(f"Unknown parameter: {name}")
+    names = list(axes)
+    return [dataclasses.replace(base, **dict(zip(names, values))) for values in itertools.product(*axes.values())]
+
+
+def point_metrics(crystal):
+    """
+    Summary metrics of one crystal.
+
+    density is in g/cm^3 for 3D crystals and amu/Angstrom^2 for 2D ones;
+    packing_fraction is the atom volume (area in 2D) from the element
+    radii over the supercell volume. Bond metrics are NaN without bonds.
+    """
+    dim = crystal.dim
+    box = supercell_matrix(crystal.params)
+    volume = abs(np.linalg.det(box[:dim, :dim]))
+    mass = float(np.sum(crystal.element_property("mass")))
+    radii = np.asarray(crystal.element_property("radius"), dtype=float)
+    if dim == 3:
+        density = mass * AMU_GRAMS / (volume * CM3_PER_A3)
+        packing = float(np.sum(4.0 / 3.0 * np.pi * radii ** 3)) / volume
+    else:
+        density = mass / volume
+        packing = float(np.sum(np.pi * radii ** 2)) / volume
+
+    metrics = {
+        "num_atoms": int(crystal.num_atoms),
+        "num_vacancies": int(crystal.num_sites - crystal.num_atoms),
+        "num_bonds": np.nan,
+        "density": density,
+        "packing_fraction": packing,
+        "coordination_mean": np.nan,
+        "coordination_std": np.nan,
+        "coordination_min": np.nan,
+        "coordination_max": np.nan,
+    }
+    coordination = crystal.coordination()
+    if coordination is not None:
+        metrics["num_bonds"] = int(len(crystal.bonds))
+        if len(coordination):
+            metrics["coordination_mean"] = float(coordination.mean())
+            metrics["coordination_std"] = float(coordination.std())
+            metrics["coordination_min"] = int(coordination.min())
+            metrics["coordination_max"] = int(coordination.max())
+    return metrics
+
+
+class SweepTable:
+    """Sweep results as columns: one array per CrystalParams field and per metric, one row per point."""
+
+    def __init__(self, columns):
+        self.columns = columns
+
+    @classmethod
+    def from_records(cls, records):
+        """Builds the table from (params, metrics) pairs."""
+        names = [field.name for field in dataclasses.fields(CrystalParams)] + list(METRICS)
+        rows = [{**dataclasses.asdict(params), **metrics} for params, metrics in records]
+        columns = {}
+        for name in names:
+            values = [row.get(name) for row in rows]
+            if name == "rotation":
+                columns[name] = np.array(values, dtype=float).reshape(len(rows), 3)
+            elif all(isinstance(v, str) for v in values) or any(v is None for v in values):
+                columns[name] = np.array(["" if v is None else str(v) for v in values])
+            else:
+                columns[name] = np.array(values)
+        return cls(columns)
+
+    def __len__(self):
+        return len(next(iter(self.columns.values()))) if self.columns else 0
+
+    def __getitem__(self, name):
+        return self.columns[name]
+
+    def save(self, path):
+        """Writes an .npz file with one array per column, or a .csv file with one row per point."""
+        if os.path.splitext(path)[1].lower() != ".csv":
+            np.savez(path, **self.columns)
+            return
+        flat = {}
+        for name, values in self.columns.items():
+            if values.ndim == 2:
+                for k in range(values.shape[1]):
+                    flat[f"{name}_{k}"] = values[:, k]
+            else:
+                flat[name] = values
+        with open(path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(flat)
+            writer.writerows(zip(*(values.tolist() for values in flat.values())))
+
+
+def _point_key(params):
+    """Identifies a point in checkpoint files."""
+    return json.dumps(dataclasses.asdict(params), sort_keys=True)
+
+
+def _params_from_dict(values):
+    values = dict(values)
+    values["rotation"] = tuple(values["rotation"])
+    return CrystalParams(**values)
+
+
+def load_checkpoint(path):
+    """Finished points recorded in a checkpoint file, keyed like the points they belong to."""
+    done = {}
+    if path is None or not os.path.exists(path):
+        return done
+    with open(path) as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # a line cut short by an interrupted run
+            params = _params_from_dict(record["params"])
+            done[_point_key(params)] = record["metrics"]
+    return done
+
+
+# ==================== SHARED MEMORY ====================
+def _share_geometries(points):
+    """
+    Builds the lattice (and bonds) of every geometry used by more than one
+    point into shared memory. Returns (blocks, shared) where shared maps
+    cache keys to array descriptors.
+    """
+    counts = {}
+    for params in points:
+        counts.setdefault(geometry_key(params), []).append(params)
+    blocks, shared = [], {}
+    for key, group in counts.items():
+        if len(group) < 2:
+            continue
+        positions, sites = lattice_geometry(group[0])
+        shared_arrays = []
+        for array in (positions, sites):
+            block, descriptor = share_array(array)
+            blocks.append(block)
+            shared_arrays.append(descriptor)
+        shared[("lattice",) + key] = tuple(shared_arrays)
+        for params in group:
+            if params.bond_threshold is None or ("bonds",) + bond_key(params) in shared:
+                continue
+            bonds = lattice_bonds(params, positions, crystal_dim(params))
+            block, descriptor = share_array(bonds)
+            blocks.append(block)
+            shared[("bonds",) + bond_key(params)] = descriptor
+    return blocks, shared
+
+
+# Per-process state of pool workers, set once by _init_worker
+_WORKER = {}
+
+
+def _init_worker(shared):
+    """Puts the shared lattices and bonds into this worker's caches."""
+    blocks = []
+    for key, descriptors in shared.items():
+        if key[0] == "lattice":
+            arrays = []
+            for descriptor in descriptors:
+                block, array = attach_array(descriptor)
+                blocks.append(block)
+                arrays.append(array)
+            LATTICE_CACHE.put(key[1:], tuple(arrays))
+        else:
+            block, array = attach_array(descriptors)
+            blocks.append(block)
+            BOND_CACHE.put(key[1:], array)
+    _WORKER["blocks"] = blocks
+
+
+def _evaluate(index, params):
+    start = time.perf_counter()
+    metrics = point_metrics(build_crystal(params))
+    metrics["seconds"] = time.perf_counter() - start
+    return index, metrics
+
+
+def run_sweep(points, workers=None, checkpoint=None, callback=None):
+    """
+    Builds every point (a list of CrystalParams, see parameter_grid) and
+    returns a SweepTable of their parameters and metrics, in point order.
+
+    workers defaults to every core; 0 or 1 runs in this process. Points
+    without a seed get their index as seed, so defects are reproducible and
+    resumed sweeps match. With checkpoint (a .jsonl path), finished points
+    are appended as they complete and points already in the file are
+    skipped. callback(done, total, params, metrics) follows every point.
+    """
+    points = [p if p.seed is not None else dataclasses.replace(p, seed=index) for index, p in enumerate(points)]
+    done = load_checkpoint(checkpoint)
+    results = [done.get(_point_key(params)) for params in points]
+    pending = [index for index, metrics in enumerate(results) if metrics is None]
+    finished = len(points) - len(pending)
+
+    log = open(checkpoint, "a") if checkpoint is not None else None
+    try:
+        def record(index, metrics):
+            nonlocal finished
+            results[index] = metrics
+            finished += 1
+            if log is not None:
+                log.write(json.dumps({"params": dataclasses.asdict(points[index]), "metrics": metrics}) + "\n")
+                log.flush()
+            if callback is not None:
+                callback(finished, len(points), points[index], metrics)
+
+        if workers is None:
+            workers = os.cpu_count() or 1
+        if workers <= 1 or len(pending) <= 1:
+            for index in pending:
+                record(*_evaluate(index, points[index]))
+        else:
+            blocks, shared = _share_geometries([points[index] for index in pending])
+            try:
+                with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(shared,)) as pool:
+                    futures = [pool.submit(_evaluate, index, points[index]) for index in pending]
+                    for future in as_completed(futures):
+                        record(*future.result())
+            finally:
+                release(blocks)
+    finally:
+        if log is not None:
+            log.close()
+    return SweepTable.from_records(zip(points, results))
@@ -1,74 +1,120 @@
 import matplotlib.pyplot as plt
 import numpy as np
+from matplotlib.collections import LineCollection
+from matplotlib.colors import to_rgba_array
+from matplotlib.lines import Line2D
 from mpl_toolkits.mplot3d import Axes3D
+from mpl_toolkits.mplot3d.art3d import Line3DCollection
+from neighbors import find_bonds
 
-def plot_2d_lattice(ax, x, y, a, b, title="2D Lattice", colors=None, marker_sizes=50, elements="Unknown", bond_threshold=2.0):
-    """Plots a 2D lattice on the given Matplotlib axes."""
+def _flatten_groups(coord_groups, colors, marker_sizes):
+    """Merges per-group coordinate lists into flat coordinate, RGBA and size arrays."""
+    counts = [np.size(group[0]) for group in zip(*coord_groups)]
+    flat = [np.concatenate([np.ravel(g) for g in axis]) for axis in coord_groups]
+    rgba = np.repeat(np.vstack([to_rgba_array(col)[:1] for col in colors]), counts, axis=0)
+    sizes = np.repeat(np.broadcast_to(marker_sizes, (len(counts),)), counts)
+    return flat, rgba, sizes
+
+def draw_element_legend(ax, elements, element_colors):
+    """Adds one legend entry per element using proxy markers."""
+    if element_colors is None:
+        return
+    if isinstance(elements, str):
+        elements = [elements]
+        element_colors = [element_colors]
+    handles = []
+    seen = set()
+    for element, color in zip(elements, element_colors):
+        if (element, color) in seen:
+            continue
+        seen.add((element, color))
+        handles.append(Line2D([], [], linestyle="", marker="o", color=color, label=f"{element} ({color})"))
+    ax.legend(handles=handles)
+
+def plot_2d_lattice(ax, x, y, a, b, title="2D Lattice", colors=None, marker_sizes=50, elements="Unknown", bond_threshold=2.0, element_colors=None, bonds=None):
+    """Plots a 2D lattice on the given Matplotlib axes.
+
+    bonds may hold a precomputed (M, 2) bond array to skip the neighbor search.
+    Returns the atom scatter and bond collection artists.
+    """
     ax.clear()  # Clear the axes before plotting
 
     if colors is None:
         colors = ['blue'] * len(x) if isinstance(x, list) else 'blue'
 
     if isinstance(x, list) and isinstance(y, list):
-        for i, (x_i, y_i) in enumerate(zip(x, y)):
-            ax.scatter(x_i, y_i, c=colors[i], s=marker_sizes[i], label=f"{elements[i]} ({colors[i]})")
-            draw_2d_bonds(ax, x_i, y_i, bond_threshold)
+        (x, y), colors, marker_sizes = _flatten_groups((x, y), colors, marker_sizes)
     else:
-        ax.scatter(x, y, c=colors, s=marker_sizes, label=f"{elements} ({colors})")
-        draw_2d_bonds(ax, x, y, bond_threshold)
+        x, y = np.ravel(x), np.ravel(y)
+
+    # One scatter artist for every atom, colors and sizes given per point
+    atoms = ax.scatter(x, y, c=colors, s=marker_sizes)
+    bond_lines = draw_2d_bonds(ax, x, y, bond_threshold, bonds)
 
     ax.set_title(title)
     ax.set_xlabel("X")
     ax.set_ylabel("Y")
-    ax.legend()
+    draw_element_legend(ax, elements, element_colors)
     plt.tight_layout()
+    return atoms, bond_lines
 
-def draw_2d_bonds(ax, x, y, bond_threshold):
+def draw_2d_bonds(ax, x, y, bond_threshold, bonds=None):
     """Draws bonds between atoms in a 2D lattice that are within the bond_threshold distance."""
     if len(x) == 0 or len(y) == 0:
-        return  # No atoms to bond
+        return None  # No atoms to bond
 
-    coords = np.column_stack((x.ravel(), y.ravel()))
-    dist_mat = np.linalg.norm(coords[:, None] - coords, axis=-1)
+    coords = np.column_stack((np.ravel(x), np.ravel(y)))
+    if bonds is None:
+        bonds = find_bonds(coords, bond_threshold)
 
-    for i in range(len(coords)):
-        for j in range(i + 1, len(coords)):
-            distance = dist_mat[i, j]
-            if distance <= bond_threshold:
-                ax.plot([coords[i, 0], coords[j, 0]], [coords[i, 1], coords[j, 1]], 'k-', lw=1)
+    # All bonds go into a single artist built from an (M, 2, 2) segment array
+    segments = coords[bonds]
+    collection = LineCollection(segments, colors='k', linewidths=1)
+    ax.add_collection(collection)
+    return collection
 
-def plot_3d_lattice(ax, x, y, z, a, b, c, title="3D Lattice", colors=None, marker_sizes=50, elements="Unknown", bond_threshold=2.0):
-    """Plots a 3D lattice on the given Matplotlib 3D axes."""
+def plot_3d_lattice(ax, x, y, z, a, b, c, title="3D Lattice", colors=None, marker_sizes=50, elements="Unknown", bond_threshold=2.0, element_colors=None, bonds=None):
+    """Plots a 3D lattice on the given Matplotlib 3D axes.
+
+    bonds may hold a precomputed (M, 2) bond array to skip the neighbor search.
+    Returns the atom scatter and bond collection artists.
+    """
     ax.clear()  # Clear the axes before plotting
 
     if colors is None:
         colors = ['blue'] * len(x) if isinstance(x, list) else 'blue'
 
     if isinstance(x, list) and isinstance(y, list) and isinstance(z, list):
-        for i, (x_i, y_i, z_i) in enumerate(zip(x, y, z)):
-            ax.scatter(x_i, y_i, z_i, c=colors[i], s=marker_sizes[i], label=f"{elements[i]} ({colors[i]})")
-            draw_3d_bonds(ax, x_i, y_i, z_i, bond_threshold)
+        (x, y, z), colors, marker_sizes = _flatten_groups((x, y, z), colors, marker_sizes)
     else:
-        ax.scatter(x, y, z, c=colors, s=marker_sizes, label=f"{elements} ({colors})")
-        draw_3d_bonds(ax, x, y, z, bond_threshold)
+        x, y, z = np.ravel(x), np.ravel(y), np.ravel(z)
+
+    # One scatter artist for every atom, colors and sizes given per point
+    atoms = ax.scatter(x, y, z, c=colors, s=marker_sizes)
+    bond_lines = draw_3d_bonds(ax, x, y, z, bond_threshold, bonds)
 
     ax.set_title(title)
     ax.set_xlabel("X")
     ax.set_ylabel("Y")
     ax.set_zlabel("Z")
-    ax.legend()
+    draw_element_legend(ax, elements, element_colors)
     plt.tight_layout()
+    return atoms, bond_lines
 
-def draw_3d_bonds(ax, x, y, z, bond_threshold):
+def draw_3d_bonds(ax, x, y, z, bond_threshold, bonds=None):
     """Draws bonds between atoms in a 3D lattice that are within the bond_threshold distance."""
     if len(x) == 0 or len(y) == 0 or len(z) == 0:
-        return  # No atoms to bond
+        return None  # No atoms to bond
+
+    coords = np.column_stack((np.ravel(x), np.ravel(y), np.ravel(z)))
+    if bonds is None:
+        bonds = find_bonds(coords, bond_threshold)
 
-    coords = np.column_stack((x.ravel(), y.ravel(), z.ravel()))
-    dist_mat = np.linalg.norm(coords[:, None] - coords, axis=-1)
+    if len(bonds) == 0:
+        return None  # 3D collections cannot be empty
 
-    for i in range(len(coords)):
-        for j in range(i + 1, len(coords)):
-            distance = dist_mat[i, j]
-            if distance <= bond_threshold:
-                ax.plot([coords[i, 0], coords[j, 0]], [coords[i, 1], coords[j, 1]], [coords[i, 2], coords[j, 2]], 'k-', lw=1)
+    # All bonds go into a single artist built from an (M, 2, 3) segment array
+    segments = coords[bonds]
+    collection = Line3DCollection(segments, colors='k', linewidths=1)
+    ax.add_collection3d(collection)
+    return collection